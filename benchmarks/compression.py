@@ -0,0 +1,167 @@
+"""
+CPU cost versus bytes saved for each response compression codec and level.
+
+Renders real FeedView responses (the same view, serializer and renderer the
+API uses) for a user from the configured database, then compresses every
+page with gzip, brotli and zstd (when installed) at a range of levels and
+reports the compressed size, ratio and compression/decompression time.
+
+Without --user, a synthetic user who follows --authors accounts with
+--posts posts each is created inside a transaction that is rolled back at
+the end, so nothing is left in the database.
+
+    python benchmarks/compression.py --pages 5 --page-size 20
+    python benchmarks/compression.py --user 3f1c...  # an existing account
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unilink.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from social.models import Comment, Follower, Post  # noqa: E402
+from social.views import FeedView  # noqa: E402
+from unilink.compression import CODECS  # noqa: E402
+from users.models import User  # noqa: E402
+
+LEVELS = {"gzip": [1, 3, 6, 9], "br": [1, 3, 4, 5, 7, 9, 11], "zstd": [1, 3, 6, 9, 12, 19]}
+
+WORDS = (
+    "exam campus library project deadline lab semester hostel fest placement "
+    "internship lecture notes canteen cricket club hackathon seminar assignment"
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(authors, posts, seed_value):
+    rng = random.Random(seed_value)
+    reader = _user("bench_reader", rng)
+    for a in range(authors):
+        author = _user(f"bench_author_{a}", rng)
+        Follower.objects.create(user=author, follower=reader)
+        for _ in range(posts):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60)))
+            post = Post.objects.create(
+                user=author,
+                text=text,
+                image_url=f"https://cloud.appwrite.io/v1/storage/buckets/media/files/{rng.getrandbits(64):x}/view",
+            )
+            for _ in range(rng.randint(0, 6)):
+                Comment.objects.create(post=post, user=author, text=" ".join(rng.sample(WORDS, 5)))
+    return reader
+
+
+def _user(name, rng):
+    return User.objects.create(
+        email=f"{name}@bench.invalid",
+        username=name,
+        full_name=name.replace("_", " ").title(),
+        institute_name="Benchmark Institute of Technology",
+        dob=datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randint(0, 2000)),
+        dept_course="Computer Science",
+        gender=rng.choice(["male", "female"]),
+        register_number=name,
+    )
+
+
+def render_pages(user, pages, page_size):
+    factory = APIRequestFactory()
+    view = FeedView.as_view()
+    bodies = []
+    for page in range(1, pages + 1):
+        request = factory.get("/api/social/feed/", {"page": page, "page_size": page_size})
+        force_authenticate(request, user=user)
+        response = view(request)
+        if response.status_code != 200:
+            break
+        bodies.append(response.render().content)
+    return bodies
+
+
+def decompressor(name):
+    if name == "gzip":
+        return lambda data: zlib.decompress(data, 31)
+    if name == "br":
+        import brotli
+
+        return brotli.decompress
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress
+
+
+def measure(bodies, repeat):
+    raw = sum(len(body) for body in bodies)
+    print(f"{len(bodies)} pages, {raw / len(bodies) / 1024:.1f} KiB per page on average\n")
+    print(f"{'codec':<6}{'level':>6}{'bytes/page':>12}{'ratio':>8}{'compress us':>13}{'MB/s':>8}{'decompress us':>15}")
+    for name, levels in LEVELS.items():
+        for level in levels:
+            try:
+                codec = CODECS[name](level)
+            except ImportError:
+                print(f"{name:<6}  (not installed)")
+                break
+            decompress = decompressor(name)
+            compressed = [codec.compress(body) for body in bodies]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for body in bodies:
+                    codec.compress(body)
+            compress_time = (time.perf_counter() - started) / (repeat * len(bodies))
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for data in compressed:
+                    decompress(data)
+            decompress_time = (time.perf_counter() - started) / (repeat * len(bodies))
+            size = sum(len(data) for data in compressed) / len(bodies)
+            print(
+                f"{name:<6}{level:>6}{size:>12.0f}{raw / len(bodies) / size:>8.2f}"
+                f"{compress_time * 1e6:>13.0f}{raw / len(bodies) / compress_time / 1e6:>8.0f}"
+                f"{decompress_time * 1e6:>15.0f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="id of an existing user whose feed is rendered")
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.user:
+        bodies = render_pages(User.objects.get(pk=args.user), args.pages, args.page_size)
+    else:
+        try:
+            with transaction.atomic():
+                reader = seed(args.authors, args.posts, args.seed)
+                bodies = render_pages(reader, args.pages, args.page_size)
+                raise Rollback
+        except Rollback:
+            pass
+    if not bodies:
+        sys.exit("The feed is empty")
+    measure(bodies, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Memory footprint and query latency of the in-process follow graph.
+
+Builds social.graph.FollowGraph from a synthetic follow graph (no database
+access) with a skewed in-degree, like real follower counts, and reports the
+memory retained per edge (measured with tracemalloc), split into the
+adjacency arrays and the UUID index, plus the time taken by follow checks and
+neighbour lookups.
+
+    python benchmarks/follow_graph.py --users 100000 --edges 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unilink.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from social.graph import FollowGraph  # noqa: E402
+
+
+def synthetic_edges(users, edges, seed):
+    rng = random.Random(seed)
+    ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(users)]
+    seen = set()
+    while len(seen) < edges:
+        # Popular accounts attract most follows
+        user = min(int(rng.paretovariate(1.2)) - 1, users - 1)
+        follower = rng.randrange(users)
+        if user != follower:
+            seen.add((user, follower))
+    return ids, [(ids[user], ids[follower]) for user, follower in seen]
+
+
+def timed(fn, calls):
+    started = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ids, edges = synthetic_edges(args.users, args.edges, args.seed)
+
+    started = time.perf_counter()
+    FollowGraph.from_edges(edges)
+    build_seconds = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    # Fresh UUID objects, as rows loaded from the database would be, so the
+    # index is charged for the ids it keeps
+    graph = FollowGraph.from_edges((uuid.UUID(int=user.int), uuid.UUID(int=follower.int)) for user, follower in edges)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    array_bytes = sum(sys.getsizeof(values) for values in graph._following + graph._followers)
+    index_bytes = retained - array_bytes
+
+    print(f"{len(graph._users)} users, {graph.edges} edges, built in {build_seconds:.2f}s")
+    print(f"retained   {retained / 2**20:8.1f} MB  {retained / graph.edges:6.1f} bytes/edge")
+    print(f"  arrays   {array_bytes / 2**20:8.1f} MB  {array_bytes / graph.edges:6.1f} bytes/edge")
+    print(f"  index    {index_bytes / 2**20:8.1f} MB  {index_bytes / graph.edges:6.1f} bytes/edge")
+    print(f"peak build {peak / 2**20:8.1f} MB")
+
+    rng = random.Random(args.seed)
+    hits = [(follower, user) for user, follower in rng.sample(edges, min(args.lookups, len(edges)))]
+    misses = [(rng.choice(ids), rng.choice(ids)) for _ in range(args.lookups)]
+    users = [(rng.choice(ids),) for _ in range(args.lookups // 10)]
+    print(f"is_following (hit)   {timed(graph.is_following, hits):6.2f} us")
+    print(f"is_following (miss)  {timed(graph.is_following, misses):6.2f} us")
+    print(f"following()          {timed(graph.following, users):6.2f} us  (avg {graph.edges / len(ids):.0f} ids)")
+    print(f"followers_count()    {timed(graph.followers_count, users):6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Database queries under a hot-key read workload, with and without request
+coalescing.
+
+--threads threads read the same post (PostDetailView) and its author's
+profile (UserProfileView) as fast as they can for --seconds, through the
+real views, and every query that reaches the database is counted. This is
+repeated with:
+
+    uncached     HOT_CACHE_TTL = 0, every request hits the database
+    cache-aside  cached for --ttl seconds, no single flight, no early refresh:
+                 every thread that sees the entry missing or expired recomputes it
+    coalesced    single flight + probabilistic early refresh (the defaults)
+
+A short --ttl makes entries expire many times during a run, which is where a
+stampede shows. The post, its author, comments and reactions are created
+for the run (committed, since each thread has its own connection) and
+deleted at the end.
+
+    python benchmarks/hot_reads.py --threads 32 --seconds 5 --ttl 0.5
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unilink.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from social.models import Comment, Post, PostReaction  # noqa: E402
+from social.views import PostDetailView, UserProfileView  # noqa: E402
+from users.models import User  # noqa: E402
+
+MODES = {
+    "uncached": {"HOT_CACHE_TTL": 0},
+    "cache-aside": {"HOT_CACHE_SINGLE_FLIGHT": False, "HOT_CACHE_BETA": 0},
+    "coalesced": {"HOT_CACHE_SINGLE_FLIGHT": True, "HOT_CACHE_BETA": 1.0},
+}
+
+
+def seed(fans):
+    author = _user("hot_author")
+    post = Post.objects.create(user=author, text="This post is going viral")
+    for i in range(fans):
+        fan = _user(f"hot_fan_{i}")
+        PostReaction.objects.create(user=fan, post=post, reaction_type="like")
+        if i % 3 == 0:
+            Comment.objects.create(user=fan, post=post, text=f"Comment {i}")
+    return author, post
+
+
+def _user(name):
+    return User.objects.create(
+        email=f"{name}@bench.invalid",
+        username=name,
+        full_name=name.replace("_", " ").title(),
+        institute_name="Benchmark Institute of Technology",
+        dob=datetime.date(2000, 1, 1),
+        dept_course="Computer Science",
+        gender="female",
+        register_number=name,
+    )
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run(author, post, threads, seconds):
+    factory = APIRequestFactory()
+    detail, profile = PostDetailView.as_view(), UserProfileView.as_view()
+    counter = QueryCounter()
+    latencies = []
+    latency_lock = threading.Lock()
+    start, stop = threading.Barrier(threads + 1), threading.Event()
+
+    def worker(index):
+        timings = []
+        with connection.execute_wrapper(counter):
+            start.wait()
+            i = index
+            while not stop.is_set():
+                began = time.perf_counter()
+                if i % 2:
+                    response = detail(factory.get(f"/api/social/posts/{post.id}/"), id=post.id)
+                else:
+                    response = profile(factory.get(f"/api/social/users/{author.id}/profile/"), id=author.id)
+                response.render()
+                assert response.status_code == 200, response.status_code
+                timings.append(time.perf_counter() - began)
+                i += 1
+        connection.close()
+        with latency_lock:
+            latencies.extend(timings)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return counter.count, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--ttl", type=float, default=0.5, help="HOT_CACHE_TTL for the cached runs")
+    parser.add_argument("--fans", type=int, default=30, help="users reacting to / commenting on the post")
+    args = parser.parse_args()
+
+    author, post = seed(args.fans)
+    try:
+        print(f"{args.threads} threads, {args.seconds:g} s per mode, ttl {args.ttl:g} s, {connection.vendor}\n")
+        print(f"{'mode':<13}{'requests':>10}{'req/s':>9}{'queries':>10}{'queries/req':>13}{'p50 ms':>9}{'p99 ms':>9}")
+        for mode, overrides in MODES.items():
+            cache.clear()
+            for name, value in {"HOT_CACHE_TTL": args.ttl, **overrides}.items():
+                setattr(settings, name, value)
+            queries, latencies = run(author, post, args.threads, args.seconds)
+            latencies.sort()
+            requests = len(latencies)
+            print(
+                f"{mode:<13}{requests:>10}{requests / args.seconds:>9.0f}{queries:>10}{queries / requests:>13.3f}"
+                f"{statistics.median(latencies) * 1000:>9.2f}{latencies[int(len(latencies) * 0.99)] * 1000:>9.2f}"
+            )
+    finally:
+        User.objects.filter(email__endswith="@bench.invalid").delete()
+        cache.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Worker cold-start benchmark based on ``python -X importtime``.
+
+Measures the import cost of booting the WSGI application and loading the
+URLconf (what a fresh worker does before serving its first request), prints
+the slowest top-level imports, and compares against importtime_budget.json:
+
+    python benchmarks/importtime.py            # report and check the budget
+    python benchmarks/importtime.py --update   # record the current numbers as the new budget
+
+Exits non-zero if boot time exceeds the budget by more than its tolerance, or
+if a module listed under "deferred" is imported at boot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "importtime_budget.json"
+
+BOOT_SNIPPET = (
+    "import unilink.wsgi\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def measure():
+    """Run one cold boot and return {module: cumulative_us} for top-level imports, plus all imported names."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "unilink.settings", "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    top_level, imported = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        module = name.rstrip()
+        imported.add(module.strip())
+        if not module.startswith("  "):  # depth 0: not already counted by a parent
+            top_level[module.strip()] = int(cumulative)
+    return top_level, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--update", action="store_true", help="write the measured median as the new budget")
+    args = parser.parse_args()
+
+    totals, imported = [], set()
+    for _ in range(args.runs):
+        top_level, imported = measure()
+        totals.append(sum(top_level.values()) / 1000)
+    boot_ms = statistics.median(totals)
+
+    print(f"boot + URLconf import time: median {boot_ms:.1f} ms over {args.runs} runs (min {min(totals):.1f} ms)")
+    print(f"slowest top-level imports (last run):")
+    for module, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {module}")
+
+    budget = json.loads(BUDGET_FILE.read_text()) if BUDGET_FILE.exists() else {}
+    if args.update:
+        budget["boot_ms"] = round(boot_ms, 1)
+        budget.setdefault("tolerance", 0.25)
+        budget.setdefault("deferred", [])
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"budget updated: {BUDGET_FILE.name}")
+        return 0
+
+    failures = []
+    eager = sorted(m for m in budget.get("deferred", []) if m in imported)
+    if eager:
+        failures.append(f"modules that should load lazily were imported at boot: {', '.join(eager)}")
+    if budget.get("boot_ms"):
+        limit = budget["boot_ms"] * (1 + budget.get("tolerance", 0.25))
+        if boot_ms > limit:
+            failures.append(f"boot time {boot_ms:.1f} ms exceeds budget {budget['boot_ms']} ms (+{budget.get('tolerance', 0.25):.0%})")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
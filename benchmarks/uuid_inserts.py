@@ -0,0 +1,106 @@
+"""
+Insert throughput and primary-key index size: uuid4 vs uuid7.
+
+Creates scratch tables shaped like social_post (uuid primary key, user id,
+text, timestamp) in the configured PostgreSQL database, inserts the same
+number of rows into each in batches, and reports rows/s, table size, primary
+key index size and (if the pgstattuple extension is available) index leaf
+density. The scratch tables are dropped afterwards.
+
+    python benchmarks/uuid_inserts.py --rows 1000000 --batch 1000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unilink.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+
+from social.ids import uuid7  # noqa: E402
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def run(name, generate, rows, batch):
+    table = f"bench_ids_{name}"
+    user_id = uuid.uuid4()
+    raw = connection.connection
+    with raw.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"CREATE TABLE {table} (id uuid PRIMARY KEY, user_id uuid NOT NULL, "
+            f"text text, created_at timestamptz NOT NULL DEFAULT now())"
+        )
+        raw.commit()
+
+        started = time.perf_counter()
+        for offset in range(0, rows, batch):
+            values = [(str(generate()), str(user_id), "benchmark post") for _ in range(min(batch, rows - offset))]
+            execute_values(cursor, f"INSERT INTO {table} (id, user_id, text) VALUES %s", values)
+            raw.commit()
+        elapsed = time.perf_counter() - started
+
+        cursor.execute(
+            "SELECT pg_relation_size(%s), pg_relation_size(%s)",
+            [table, f"{table}_pkey"],
+        )
+        table_bytes, index_bytes = cursor.fetchone()
+
+        density = None
+        try:
+            cursor.execute("SELECT avg_leaf_density FROM pgstatindex(%s)", [f"{table}_pkey"])
+            density = cursor.fetchone()[0]
+        except Exception:
+            raw.rollback()
+
+        cursor.execute(f"DROP TABLE {table}")
+        raw.commit()
+
+    return {
+        "rows_per_s": rows / elapsed,
+        "seconds": elapsed,
+        "table_mb": table_bytes / 2**20,
+        "index_mb": index_bytes / 2**20,
+        "leaf_density": density,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        sys.exit("This benchmark needs the PostgreSQL database configured in settings.DATABASES")
+    connection.ensure_connection()
+    with connection.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pgstattuple")
+            connection.connection.commit()
+        except Exception:
+            connection.connection.rollback()
+
+    print(f"{args.rows} rows, batches of {args.batch}")
+    print(f"{'key':<6} {'rows/s':>10} {'seconds':>8} {'table MB':>9} {'pk index MB':>12} {'leaf density':>13}")
+    for name, generate in GENERATORS.items():
+        result = run(name, generate, args.rows, args.batch)
+        density = f"{result['leaf_density']:.1f}%" if result["leaf_density"] is not None else "n/a"
+        print(
+            f"{name:<6} {result['rows_per_s']:>10.0f} {result['seconds']:>8.2f} "
+            f"{result['table_mb']:>9.1f} {result['index_mb']:>12.1f} {density:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Engagement rollups.
+
+Posts, comments, reactions, follows gained and daily/hourly active posters
+are counted into EngagementRollup rows per hour and per day, split by the
+institute and department of the user concerned (the author, commenter or
+reactor; for follows, the user being followed). ``manage.py
+rollup_engagement`` runs on a schedule and folds in only rows created since
+the watermark, in windows of at most ANALYTICS_MAX_WINDOW seconds, each a
+short GROUP BY over an indexed created_at range. Reports then read a handful
+of rollup rows instead of scanning the source tables.
+
+Rows are folded in once they are ANALYTICS_LAG seconds old, so rows from
+transactions that commit a little after their created_at are not skipped.
+Follows and reactions made before created_at was recorded on them have no
+timestamp and are not counted.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import ActivePoster, Comment, EngagementRollup, Follower, Post, PostReaction, RollupWatermark
+
+WATERMARK = "engagement"
+METRICS = ["posts", "comments", "reactions", "follows", "active_posters"]
+
+# (metric, model, user whose institute/department the row counts towards)
+SOURCES = [
+    ("posts", Post, "user"),
+    ("comments", Comment, "user"),
+    ("reactions", PostReaction, "user"),
+    ("follows", Follower, "user"),
+]
+
+
+def floor(moment, granularity):
+    """Start of the hour or (local) day containing `moment`."""
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == "day" else moment
+
+
+def _hourly(model, user_field, start, end, *extra):
+    return (
+        model.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(hour=TruncHour("created_at"))
+        .values("hour", f"{user_field}__institute_name", f"{user_field}__dept_course", *extra)
+    )
+
+
+def collect(start, end):
+    """Counts for rows created in [start, end): {(granularity, bucket, institute, dept): Counter}."""
+    counts = defaultdict(Counter)
+    for metric, model, user_field in SOURCES:
+        rows = _hourly(model, user_field, start, end).annotate(total=Count("pk"))
+        for row in rows:
+            dimension = (row[f"{user_field}__institute_name"], row[f"{user_field}__dept_course"])
+            for granularity in ("hour", "day"):
+                counts[(granularity, floor(row["hour"], granularity), *dimension)][metric] += row["total"]
+
+    # Active posters are distinct per bucket, so a poster already seen in an
+    # earlier window of the same bucket must not be counted again
+    posters = list(_hourly(Post, "user", start, end, "user_id").distinct())
+    for granularity in ("hour", "day"):
+        seen = {}
+        for row in posters:
+            key = (floor(row["hour"], granularity), row["user_id"])
+            seen[key] = (row["user__institute_name"], row["user__dept_course"])
+        if not seen:
+            continue
+        existing = set(
+            ActivePoster.objects.filter(
+                granularity=granularity,
+                bucket__in={bucket for bucket, _ in seen},
+                user_id__in={user_id for _, user_id in seen},
+            ).values_list("bucket", "user_id")
+        )
+        new = [key for key in seen if key not in existing]
+        ActivePoster.objects.bulk_create(
+            ActivePoster(granularity=granularity, bucket=bucket, user_id=user_id) for bucket, user_id in new
+        )
+        for bucket, user_id in new:
+            counts[(granularity, bucket, *seen[(bucket, user_id)])]["active_posters"] += 1
+    return counts
+
+
+def apply(counts):
+    """Add `counts` to the rollup rows, creating the missing ones."""
+    if not counts:
+        return
+    rows = {}
+    for granularity in ("hour", "day"):
+        buckets = {key[1] for key in counts if key[0] == granularity}
+        for row in EngagementRollup.objects.filter(granularity=granularity, bucket__in=buckets):
+            rows[(row.granularity, row.bucket, row.institute_name, row.dept_course)] = row
+
+    created, updated = [], []
+    for key, metrics in counts.items():
+        row = rows.get(key)
+        if row is None:
+            granularity, bucket, institute_name, dept_course = key
+            row = EngagementRollup(
+                granularity=granularity, bucket=bucket, institute_name=institute_name, dept_course=dept_course
+            )
+            created.append(row)
+        else:
+            updated.append(row)
+        for metric, value in metrics.items():
+            setattr(row, metric, getattr(row, metric) + value)
+    EngagementRollup.objects.bulk_create(created)
+    EngagementRollup.objects.bulk_update(updated, METRICS)
+
+
+def _first_row_time():
+    firsts = [model.objects.aggregate(first=Min("created_at"))["first"] for _, model, _ in SOURCES]
+    firsts = [first for first in firsts if first is not None]
+    return min(firsts) if firsts else None
+
+
+def step(now=None):
+    """
+    Fold in the next window of new rows. Returns the new watermark, or None
+    when there was nothing to do.
+    """
+    until = (now or timezone.now()) - timedelta(seconds=settings.ANALYTICS_LAG)
+    with transaction.atomic():
+        # The row lock keeps concurrent runs from counting a window twice
+        watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        if watermark is None:
+            first = _first_row_time()
+            if first is None:
+                return None
+            watermark = RollupWatermark.objects.create(name=WATERMARK, processed_until=floor(first, "hour"))
+
+        start = watermark.processed_until
+        end = min(until, start + timedelta(seconds=settings.ANALYTICS_MAX_WINDOW))
+        if end <= start:
+            return None
+        apply(collect(start, end))
+        watermark.processed_until = end
+        watermark.save(update_fields=["processed_until"])
+
+        # Buckets that ended before the watermark get no more rows
+        for granularity in ("hour", "day"):
+            ActivePoster.objects.filter(granularity=granularity, bucket__lt=floor(end, granularity)).delete()
+    return end
+
+
+def run(now=None):
+    """Catch up to now; returns how many windows were processed."""
+    now = now or timezone.now()
+    windows = 0
+    while step(now) is not None:
+        windows += 1
+    return windows
+
+
+def rebuild():
+    """Forget every rollup; the next run recounts from the oldest row."""
+    with transaction.atomic():
+        EngagementRollup.objects.all().delete()
+        ActivePoster.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+
+
+def processed_until():
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return watermark.processed_until if watermark else None
+
+
+def report(granularity, since, until, group_by=None, **filters):
+    """
+    Rollup rows for [since, until), one entry per bucket (and per group_by
+    value), summed over the other dimensions. Reads only rollup rows.
+    """
+    keys = ["bucket"] + ([group_by] if group_by else [])
+    rows = (
+        EngagementRollup.objects.filter(granularity=granularity, bucket__gte=since, bucket__lt=until, **filters)
+        .values(*keys)
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by(*keys)
+    )
+    return list(rows)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SocialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social'
+
+    def ready(self):
+        from . import archive, graph
+
+        graph.connect_signals()
+        archive.connect_signals()
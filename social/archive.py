@@ -0,0 +1,327 @@
+"""
+Cold storage for old posts.
+
+``manage.py archive_posts`` moves posts older than ARCHIVE_AFTER_DAYS out of
+the live tables, oldest first and ARCHIVE_BATCH_SIZE at a time, each batch
+in its own transaction. A post, its comments and its reactions become one
+ArchivedPost row holding a gzipped JSON document, so years of threads no
+longer weigh on the indexes the feed and profile pages use. Notifications
+and trending scores of archived posts are deleted with them.
+
+Archived posts stay readable. PostDetailView and UserPostsView fall back to
+the archive (``load`` and ``with_archived``), which rebuilds unsaved Post
+instances that serialize like live ones: comment count, comment preview and
+reaction count included, plus ``archived: true``. They can no longer be
+liked or commented on; ``restore`` moves a post back into the live tables.
+
+The comments and reactions left on an archived post live on inside its
+document. ArchivedPostParticipant indexes who they are, so the
+data export still includes them (``archived_activity``) and deleting an
+account removes them from the documents too (``scrub_user``), replies to
+its comments included, as the live tables' cascades would.
+"""
+import gzip
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from unilink.hotcache import invalidate
+from users.models import User
+
+from .models import ArchivedPost, ArchivedPostParticipant, Comment, Post, PostReaction
+from .partitions import since_ids
+
+FORMAT = 1
+POST_FIELDS = ["id", "user_id", "text", "image_url", "image_variants", "video_url", "created_at"]
+COMMENT_FIELDS = ["id", "user_id", "parent_id", "text", "created_at"]
+REACTION_FIELDS = ["id", "user_id", "reaction_type", "created_at"]
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def encode(document):
+    return gzip.compress(encoder.encode(document).encode(), compresslevel=6)
+
+
+def decode(data):
+    # BinaryField values come back as memoryview on PostgreSQL
+    return json.loads(gzip.decompress(bytes(data)))
+
+
+# ------------------- Archiving -------------------
+def archive_cutoff(now=None):
+    return (now or timezone.now()) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+
+def participants(document):
+    """Ids (str) of the users with comments or reactions in an archived post's document."""
+    return {str(row["user_id"]) for row in document["comments"] + document["reactions"]}
+
+
+def _by_post(rows):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.pop("post_id")].append(row)
+    return grouped
+
+
+def archive_batch(before, size):
+    """Archive up to `size` of the oldest posts created before `before`; returns how many were moved."""
+    with transaction.atomic():
+        # Locked until the delete: comment and reaction writers take a share lock
+        # on their post first (partitions.share_rows), so none lands after the snapshot
+        ids = list(
+            Post.objects.select_for_update()
+            .filter(created_at__lt=before)
+            .order_by("created_at")
+            .values_list("id", flat=True)[:size]
+        )
+        if not ids:
+            return 0
+        posts = Post.objects.filter(id__in=ids).values(*POST_FIELDS)
+        comments = Comment.objects.filter(post_id__in=ids)
+        since = since_ids(ids)
+        if since:
+            comments = comments.filter(created_at__gte=since)
+        comments = _by_post(comments.order_by("created_at").values("post_id", *COMMENT_FIELDS))
+        reactions = _by_post(PostReaction.objects.filter(post_id__in=ids).order_by("id").values("post_id", *REACTION_FIELDS))
+
+        documents = {
+            post["id"]: {
+                "format": FORMAT,
+                "post": post,
+                "comments": comments[post["id"]],
+                "reactions": reactions[post["id"]],
+            }
+            for post in posts
+        }
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=post_id,
+                user_id=document["post"]["user_id"],
+                created_at=document["post"]["created_at"],
+                comments_count=len(document["comments"]),
+                reactions_count=len(document["reactions"]),
+                data=encode(document),
+            )
+            for post_id, document in documents.items()
+        )
+        ArchivedPostParticipant.objects.bulk_create(
+            ArchivedPostParticipant(archived_post_id=post_id, user_id=user_id)
+            for post_id, document in documents.items()
+            for user_id in participants(document)
+        )
+        # Cascades to the comments, reactions, notifications and trending scores
+        Post.objects.filter(id__in=ids).delete()
+    for post_id in ids:
+        invalidate("post", post_id)
+    return len(ids)
+
+
+def archive(before=None, batch_size=None):
+    """Archive every post created before `before` (default: ARCHIVE_AFTER_DAYS ago); returns the count."""
+    before = before or archive_cutoff()
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def _dated(row):
+    return {**row, "created_at": parse_datetime(row["created_at"]) if row["created_at"] else None}
+
+
+def restore(post_id):
+    """Move an archived post back into the live tables; returns the post, or None if it isn't archived."""
+    with transaction.atomic():
+        archived = ArchivedPost.objects.select_for_update().filter(pk=post_id).first()
+        if archived is None:
+            return None
+        document = decode(archived.data)
+        post = Post(**_dated(document["post"]))
+        comments = [Comment(post_id=post.id, **_dated(row)) for row in document["comments"]]
+        reactions = [PostReaction(post_id=post.id, **_dated(row)) for row in document["reactions"]]
+        # Comments and reactions by users deleted since are dropped
+        users = User.objects.filter(id__in={row.user_id for row in comments + reactions}).values_list("id", flat=True)
+        users = {str(user_id) for user_id in users}
+        comments = [row for row in comments if row.user_id in users]
+        reactions = [row for row in reactions if row.user_id in users]
+
+        for model, rows in ((Post, [post]), (Comment, comments), (PostReaction, reactions)):
+            # created_at is auto_now_add, which bulk_create overwrites with the current time
+            created = [row.created_at for row in rows]
+            model.objects.bulk_create(rows)
+            for row, created_at in zip(rows, created):
+                row.created_at = created_at
+            model.objects.bulk_update(rows, ["created_at"], batch_size=500)
+        archived.delete()
+    invalidate("post", post.pk)
+    return Post.objects.get(pk=post.pk)
+
+
+# ------------------- Reading -------------------
+def hydrate(archived_posts):
+    """Unsaved Post instances, ready for PostSerializer, for ArchivedPost rows (with their user loaded)."""
+    archived_posts = list(archived_posts)
+    documents = {archived.pk: decode(archived.data) for archived in archived_posts}
+    previews = {
+        post_id: sorted(
+            (row for row in document["comments"] if row["parent_id"] is None),
+            key=lambda row: row["created_at"],
+            reverse=True,
+        )[:settings.COMMENT_PREVIEW_SIZE]
+        for post_id, document in documents.items()
+    }
+    authors = User.objects.only("id", "username", "full_name").in_bulk(
+        {row["user_id"] for rows in previews.values() for row in rows}
+    )
+    authors = {str(user_id): user for user_id, user in authors.items()}
+
+    posts = []
+    for archived in archived_posts:
+        fields = _dated(documents[archived.pk]["post"])
+        fields.pop("user_id")
+        post = Post(**fields, user=archived.user)
+        post.archived = True
+        post.comments_count = archived.comments_count
+        post.reactions_count = archived.reactions_count
+        # Comments of users deleted since are left out of the preview
+        post.comment_preview = [
+            Comment(**_dated({key: row[key] for key in ("id", "text", "created_at")}), post=post, user=authors[row["user_id"]])
+            for row in previews[archived.pk] if row["user_id"] in authors
+        ]
+        posts.append(post)
+    return posts
+
+
+def load(post_id):
+    """The archived post `post_id` as a Post instance, or None."""
+    archived = ArchivedPost.objects.select_related("user").filter(pk=post_id).first()
+    return hydrate([archived])[0] if archived else None
+
+
+class PostTimeline:
+    """
+    A user's live posts followed by their archived ones, newest first.
+    Everything archived is older than everything live, so the two lists
+    simply follow each other; the archive is only read for pages that reach
+    past the live posts. Sliceable and countable like a queryset, for the
+    paginator.
+    """
+
+    def __init__(self, live, archived):
+        self.live = live
+        self.archived = archived
+        self._live_count = None
+        self._count = None
+
+    def live_count(self):
+        if self._live_count is None:
+            self._live_count = self.live.count()
+        return self._live_count
+
+    def count(self):
+        if self._count is None:
+            self._count = self.live_count() + self.archived.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop if index.stop is not None else self.count()
+        live_count = self.live_count()
+        page = list(self.live[start:stop]) if start < live_count else []
+        if stop > live_count:
+            page += hydrate(self.archived[max(start - live_count, 0):stop - live_count])
+        return page
+
+
+def with_archived(live, user_id):
+    """`live` (a user's posts, newest first) continued by the user's archived posts."""
+    archived = ArchivedPost.objects.filter(user_id=user_id).select_related("user").order_by("-created_at")
+    return PostTimeline(live, archived)
+
+
+def archived_posts(user):
+    """The user's archived posts as dicts of post fields, oldest first (for the data export)."""
+    rows = ArchivedPost.objects.filter(user=user).order_by("created_at").values_list("data", flat=True)
+    for data in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield decode(data)["post"]
+
+
+def archived_activity(user):
+    """
+    (record type, fields) for the user's comments and reactions on archived
+    posts, one post at a time (for the data export).
+    """
+    user_id = str(user.pk)
+    rows = (
+        ArchivedPost.objects.filter(participants__user=user)
+        .order_by("created_at")
+        .values_list("id", "data")
+    )
+    for post_id, data in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        document = decode(data)
+        for row in document["comments"]:
+            if row["user_id"] == user_id:
+                yield "archived_comment", {"post_id": post_id, **_without_user(row)}
+        for row in document["reactions"]:
+            if row["user_id"] == user_id:
+                yield "archived_reaction", {"post_id": post_id, **_without_user(row)}
+
+
+def _without_user(row):
+    return {key: value for key, value in row.items() if key != "user_id"}
+
+
+# ------------------- Account deletion -------------------
+def scrub_user(user_id):
+    """
+    Remove the user's comments (and the replies to them) and reactions from
+    other users' archived posts; returns how many posts were rewritten.
+    """
+    user_id = str(user_id)
+    with transaction.atomic():
+        rows = list(
+            ArchivedPost.objects.select_for_update()
+            .filter(participants__user_id=user_id)
+            .exclude(user_id=user_id)
+        )
+        for archived in rows:
+            document = decode(archived.data)
+            removed = set()
+            # Comments are in created_at order, so a reply comes after its parent
+            for row in document["comments"]:
+                if row["user_id"] == user_id or row["parent_id"] in removed:
+                    removed.add(row["id"])
+            document["comments"] = [row for row in document["comments"] if row["id"] not in removed]
+            document["reactions"] = [row for row in document["reactions"] if row["user_id"] != user_id]
+            archived.data = encode(document)
+            archived.comments_count = len(document["comments"])
+            archived.reactions_count = len(document["reactions"])
+            archived.save(update_fields=["data", "comments_count", "reactions_count"])
+        ArchivedPostParticipant.objects.filter(user_id=user_id).delete()
+    for archived in rows:
+        invalidate("post", archived.pk)
+    return len(rows)
+
+
+def user_deleted(sender, instance, **kwargs):
+    scrub_user(instance.pk)
+
+
+def connect_signals():
+    pre_delete.connect(user_deleted, sender=User, dispatch_uid="archive_scrub_user")
@@ -0,0 +1,116 @@
+"""
+In-memory write buffer that hands pending items to a flush function in
+batches, so bursts of small writes become a few bulk statements.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBuffer:
+    """
+    Collect items keyed by ``key`` and pass them to ``flush(items)`` either
+    when ``max_size`` keys are pending or every ``interval`` seconds from a
+    background thread. Adding an item under a key that is already pending
+    replaces it with ``merge(old, new)`` (by default the newer item wins).
+
+    An ``interval`` of 0 disables the background thread and flushes on every
+    add, which keeps tests and management commands deterministic.
+
+    A batch being flushed stays visible to ``pending`` until ``flush``
+    returns. If it raises, the batch is put back (merged under any newer
+    items) and retried with the next flush; an item that failed
+    ``max_attempts`` times is dropped and logged.
+    """
+
+    def __init__(self, flush, interval, max_size, merge=None, name="buffer", max_attempts=3):
+        self._flush = flush
+        self.interval = interval
+        self.max_size = max_size
+        self._merge = merge or (lambda old, new: new)
+        self.name = name
+        self.max_attempts = max_attempts
+        self._items = {}
+        self._inflight = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, key, item):
+        with self._lock:
+            if key in self._items:
+                item = self._merge(self._items[key], item)
+            self._items[key] = item
+            full = len(self._items) >= self.max_size
+
+        if not self.interval:
+            self.flush()
+            return
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def pending(self, key, default=None):
+        """Return the not-yet-written item for key, including one whose flush has not finished."""
+        with self._lock:
+            if key in self._inflight:
+                if key in self._items:
+                    return self._merge(self._inflight[key], self._items[key])
+                return self._inflight[key]
+            return self._items.get(key, default)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, {}
+                self._inflight = items
+            if not items:
+                return
+            try:
+                self._flush(list(items.values()))
+            except Exception:
+                self._requeue(items)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = {}
+            for key in items:
+                self._attempts.pop(key, None)
+
+    def _requeue(self, items):
+        with self._lock:
+            for key, item in items.items():
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    logger.error("Dropping %s item %r after %d failed flushes", self.name, key, attempts)
+                    continue
+                self._attempts[key] = attempts
+                # Items added during the flush are newer
+                self._items[key] = self._merge(item, self._items[key]) if key in self._items else item
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception("Flushing %s failed", self.name)
@@ -0,0 +1,75 @@
+"""
+Comment previews for post payloads.
+
+A post carries its comment count and its COMMENT_PREVIEW_SIZE most recent
+top-level comments, never the whole thread. Both are loaded for every post
+being serialized at once: the previews with one windowed query
+(ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY created_at DESC), which is
+what Django emits for a sliced Prefetch) and the counts with one grouped
+query. Full threads are paged through PostCommentsView and
+CommentRepliesView. Both queries are bounded by the oldest post's creation
+time, so only the comment partitions from then on are read.
+"""
+from django.conf import settings
+from django.db.models import Count, OuterRef, Prefetch, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
+
+from .models import Comment
+from .partitions import since_ids
+
+
+def load_comment_summaries(posts, previews=True):
+    """Set `comments_count` (and `comment_preview`, newest first) on each post."""
+    posts = [post for post in posts if not hasattr(post, "comments_count")]
+    if not posts:
+        return
+
+    comments = Comment.objects.all()
+    since = since_ids(post.pk for post in posts)
+    if since:
+        comments = comments.filter(created_at__gte=since)
+
+    counts = dict(
+        comments.filter(post__in=posts)
+        .values("post")
+        .annotate(total=Count("id"))
+        .values_list("post", "total")
+    )
+    for post in posts:
+        post.comments_count = counts.get(post.pk, 0)
+
+    if not previews:
+        return
+    # Posts without comments need no preview query
+    commented = []
+    for post in posts:
+        if post.comments_count:
+            commented.append(post)
+        else:
+            post.comment_preview = []
+    if commented:
+        recent = (
+            comments.filter(parent__isnull=True)
+            .select_related("user")
+            .order_by("-created_at")[:settings.COMMENT_PREVIEW_SIZE]
+        )
+        prefetch_related_objects(commented, Prefetch("comments", queryset=recent, to_attr="comment_preview"))
+
+
+def replies_count():
+    """
+    Number of direct replies, as an annotation for a comment queryset.
+
+    A correlated count rather than Count("subcomments"): that groups by the
+    comment's id alone, which PostgreSQL rejects once the primary key is
+    (id, created_at). Replies are never older than their comment, so each
+    count reads only the partitions from the comment's month on.
+    """
+    replies = (
+        Comment.objects.filter(parent=OuterRef("pk"), created_at__gte=OuterRef("created_at"))
+        .order_by()
+        .values("parent")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(replies), 0)
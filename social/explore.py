@@ -0,0 +1,130 @@
+"""
+Precomputed explore feed.
+
+Explore blends trending, recent and same-institute posts for users who follow
+nobody yet and for anonymous clients. One ordered id list is built per
+``institute_name`` segment (plus a global one for anonymous users) by
+``manage.py refresh_explore`` on a schedule, or lazily for a segment whose
+list has gone stale, and stored packed in the cache. Serving a page then costs
+one cache read and one ``id__in`` query, however many posts exist. As with
+trending, a stale list is rebuilt by one request at a time per segment (a
+``cache.add`` lock) while the others go on serving it.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import trending
+from .ids import pack_ids, unpack_ids
+from .models import Post, PostScore
+
+GLOBAL_SEGMENT = ""
+
+
+def cache_key(segment):
+    # Institute names are free text; hash them into a valid cache key
+    return "explore:v2:" + hashlib.md5(segment.encode()).hexdigest()  # (packed ids, fresh until)
+
+
+def lock_key(segment):
+    return "explore:building:" + hashlib.md5(segment.encode()).hexdigest()
+
+
+def _recent_ids(limit, **filters):
+    since = timezone.now() - timedelta(days=settings.EXPLORE_WINDOW_DAYS)
+    return list(
+        Post.objects.filter(created_at__gte=since, **filters)
+        .order_by("-created_at")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def _institute_ids(segment, limit):
+    """Posts from the segment's institute: trending ones first, then the newest."""
+    ranked = list(
+        PostScore.objects.filter(post__user__institute_name=segment)
+        .order_by("-score")
+        .values_list("post_id", flat=True)[:limit]
+    )
+    return ranked + _recent_ids(limit, user__institute_name=segment)
+
+
+def _blend(sources):
+    """Interleave the sources according to EXPLORE_MIX, skipping duplicates."""
+    iterators = {name: iter(ids) for name, ids in sources.items()}
+    seen = set()
+    blended = []
+    while iterators and len(blended) < settings.EXPLORE_SIZE:
+        for name, share in settings.EXPLORE_MIX:
+            iterator = iterators.get(name)
+            if iterator is None:
+                continue
+            taken = 0
+            for post_id in iterator:
+                if post_id not in seen:
+                    seen.add(post_id)
+                    blended.append(post_id)
+                    taken += 1
+                    if taken == share:
+                        break
+            if taken < share:
+                del iterators[name]
+    return blended[:settings.EXPLORE_SIZE]
+
+
+def _compute(segment):
+    limit = settings.EXPLORE_SIZE
+    sources = {
+        "trending": list(islice(trending.top_ids(), limit)),
+        "recent": _recent_ids(limit),
+    }
+    if segment:
+        sources["institute"] = _institute_ids(segment, limit)
+
+    return _blend(sources)
+
+
+def build(segment=GLOBAL_SEGMENT):
+    """Compute and cache the explore list for one segment."""
+    ids = _compute(segment)
+    interval = settings.EXPLORE_REFRESH_INTERVAL
+    cache.set(cache_key(segment), (pack_ids(ids), time.time() + interval), interval * trending.STALE_FACTOR)
+    return ids
+
+
+def segments():
+    """The global segment plus every institute that posted within the window."""
+    since = timezone.now() - timedelta(days=settings.EXPLORE_WINDOW_DAYS)
+    institutes = (
+        Post.objects.filter(created_at__gte=since)
+        .values_list("user__institute_name", flat=True)
+        .distinct()
+    )
+    return [GLOBAL_SEGMENT, *sorted(institutes)]
+
+
+def refresh_all():
+    """Rebuild every segment; returns {segment: number of posts}."""
+    return {segment: len(build(segment)) for segment in segments()}
+
+
+def explore_ids(segment=GLOBAL_SEGMENT):
+    """Explore post ids for a segment, best first."""
+    segment = segment or GLOBAL_SEGMENT
+    entry = cache.get(cache_key(segment))
+    if entry is not None:
+        packed, fresh_until = entry
+        if time.time() < fresh_until:
+            return unpack_ids(packed)
+    # Whoever gets the lock rebuilds; the others serve the stale list (or, with none cached, compute it without caching)
+    if not cache.add(lock_key(segment), True, settings.EXPLORE_REFRESH_INTERVAL):
+        return unpack_ids(entry[0]) if entry is not None else _compute(segment)
+    try:
+        return build(segment)
+    finally:
+        cache.delete(lock_key(segment))
@@ -0,0 +1,102 @@
+"""
+Personal data export.
+
+Everything stored about a user (profile, posts, comments, reactions, follow
+edges, notifications, archived posts, and comments and reactions on
+archived posts) as NDJSON: one {"type": ..., "data": {...}} object
+per line, starting with a {"type": "export", ...} header. Each table is read
+with iterator(chunk_size=EXPORT_CHUNK_SIZE), which uses a server-side cursor
+on PostgreSQL, and rows are written out as they arrive, so memory use does
+not grow with the size of the account. Used by ExportView (streamed to the
+client) and ``manage.py export_user_data``.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from unilink.compression import Gzip
+from users.models import User
+
+from .archive import archived_activity, archived_posts
+from .models import Comment, Follower, Notification, Post, PostReaction
+
+PROFILE_FIELDS = [
+    "id", "email", "username", "full_name", "bio", "profile_photo", "profile_photo_variants",
+    "institute_name", "dob", "dept_course", "gender", "register_number", "date_joined", "last_login",
+]
+
+# (record type, rows for a user); rows are read lazily, one table at a time
+SECTIONS = [
+    ("post", lambda user: Post.objects.filter(user=user).order_by("created_at").values(
+        "id", "text", "image_url", "image_variants", "video_url", "created_at",
+    )),
+    ("comment", lambda user: Comment.objects.filter(user=user).order_by("created_at").values(
+        "id", "post_id", "parent_id", "text", "created_at",
+    )),
+    ("reaction", lambda user: PostReaction.objects.filter(user=user).order_by("id").values(
+        "id", "post_id", "reaction_type", "created_at",
+    )),
+    ("following", lambda user: Follower.objects.filter(follower=user).order_by("user__username").values(
+        "user_id", "user__username", "created_at",
+    )),
+    ("follower", lambda user: Follower.objects.filter(user=user).order_by("follower__username").values(
+        "follower_id", "follower__username", "created_at",
+    )),
+    ("notification", lambda user: Notification.objects.filter(recipient=user).order_by("created_at").values(
+        "id", "verb", "actor_id", "post_id", "comment_id", "actor_count", "is_read", "created_at", "updated_at",
+    )),
+]
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _line(record_type, data):
+    return (encoder.encode({"type": record_type, "data": data}) + "\n").encode()
+
+
+def export_records(user):
+    """Yield the user's data as NDJSON lines (bytes)."""
+    yield _line("export", {"user_id": user.id, "created_at": timezone.now(), "format": 1})
+    profile = User.objects.filter(pk=user.pk).values(*PROFILE_FIELDS).get()
+    yield _line("profile", profile)
+    for record_type, rows in SECTIONS:
+        for row in rows(user).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield _line(record_type, row)
+    for post in archived_posts(user):
+        yield _line("archived_post", post)
+    for record_type, row in archived_activity(user):
+        yield _line(record_type, row)
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly; zlib emits output whenever its window fills."""
+    stream = Gzip(level).compressobj()
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.flush()
+
+
+def batched(lines, size):
+    """Join lines into chunks of about `size` bytes, so a stream isn't written one short line at a time."""
+    buffer, buffered = [], 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def export_stream(user, compress=False):
+    """The export as a stream of byte chunks, optionally gzipped."""
+    chunks = batched(export_records(user), settings.EXPORT_WRITE_SIZE)
+    return gzip_stream(chunks) if compress else chunks
+
+
+def export_filename(user, compress=False):
+    return f"unilink-export-{user.username}-{timezone.now():%Y%m%d}.ndjson" + (".gz" if compress else "")
+
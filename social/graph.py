@@ -0,0 +1,248 @@
+"""
+In-process follow graph.
+
+With FOLLOW_GRAPH_ENABLED, each process keeps the whole Follower table in
+memory as sorted adjacency arrays of compact integer ids (one ``array('I')``
+per user and direction, 4 bytes per entry), so follow checks are a binary
+search and neighbour lists need no query.
+
+The graph is loaded from Follower on first use (or at startup through
+``warm()``). Every follow and unfollow is also appended to the FollowChange
+log in the same transaction; processes replay the log at most every
+FOLLOW_GRAPH_SYNC_INTERVAL seconds, so writes made by other workers show up
+within that interval. Writes made by the current process are applied as soon
+as they commit.
+
+FollowChange ids come from a sequence and are assigned at INSERT, not at
+commit, so a lower id can become visible after a higher one has been
+replayed. ``sync`` remembers every id it skipped over and reads them again
+on each sync until they show up or FOLLOW_GRAPH_GAP_TIMEOUT seconds have
+passed (ids of rolled back transactions never show up). Replaying a change
+twice is harmless: adding an existing edge or removing a missing one does
+nothing.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import Follower, FollowChange
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = array("I")
+
+# Ids skipped by one jump that are waited for: far more than the follow
+# transactions ever in flight at once, without tracking a whole pruned log
+MAX_GAP = 1000
+
+
+def _contains(values, item):
+    i = bisect_left(values, item)
+    return i < len(values) and values[i] == item
+
+
+class FollowGraph:
+    def __init__(self):
+        self._index = {}        # user UUID -> compact id
+        self._users = []        # compact id -> user UUID
+        self._following = []    # compact id -> sorted array of compact ids it follows
+        self._followers = []    # compact id -> sorted array of compact ids following it
+        self._lock = threading.Lock()
+        self.edges = 0
+        self.last_change = 0    # highest FollowChange id applied
+        self.gaps = {}          # FollowChange ids below last_change not seen yet -> monotonic deadline
+        self._sync_lock = threading.Lock()
+        self.synced_at = 0.0
+
+    # Building
+
+    def _intern(self, user_id):
+        index = self._index.get(user_id)
+        if index is None:
+            index = self._index[user_id] = len(self._users)
+            self._users.append(user_id)
+            self._following.append(_EMPTY)
+            self._followers.append(_EMPTY)
+        return index
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Build from (user_id, follower_id) pairs, i.e. follower_id follows user_id."""
+        graph = cls()
+        following, followers = {}, {}
+        for user_id, follower_id in edges:
+            user, follower = graph._intern(user_id), graph._intern(follower_id)
+            following.setdefault(follower, []).append(user)
+            followers.setdefault(user, []).append(follower)
+            graph.edges += 1
+        for index, targets in following.items():
+            graph._following[index] = array("I", sorted(targets))
+        for index, sources in followers.items():
+            graph._followers[index] = array("I", sorted(sources))
+        return graph
+
+    @classmethod
+    def load(cls):
+        # Changes still uncommitted may hold any id, so start the replay from
+        # changes older than the longest transaction we wait for
+        cutoff = timezone.now() - timedelta(seconds=settings.FOLLOW_GRAPH_GAP_TIMEOUT)
+        last_change = FollowChange.objects.filter(created_at__lt=cutoff).aggregate(last=Max("id"))["last"] or 0
+        edges = Follower.objects.values_list("user_id", "follower_id").iterator(chunk_size=10000)
+        graph = cls.from_edges(edges)
+        graph.last_change = last_change
+        # Replay anything committed since, including while the edges were being read
+        graph.sync(force=True)
+        return graph
+
+    # Updates
+
+    def add(self, user_id, follower_id):
+        with self._lock:
+            user, follower = self._intern(user_id), self._intern(follower_id)
+            if _contains(self._following[follower], user):
+                return
+            for table, key, value in ((self._following, follower, user), (self._followers, user, follower)):
+                values = table[key]
+                if values is _EMPTY:
+                    values = table[key] = array("I")
+                values.insert(bisect_left(values, value), value)
+            self.edges += 1
+
+    def remove(self, user_id, follower_id):
+        with self._lock:
+            user, follower = self._index.get(user_id), self._index.get(follower_id)
+            if user is None or follower is None or not _contains(self._following[follower], user):
+                return
+            for table, key, value in ((self._following, follower, user), (self._followers, user, follower)):
+                values = table[key]
+                del values[bisect_left(values, value)]
+            self.edges -= 1
+
+    def sync(self, force=False):
+        """Replay FollowChange rows committed since the last sync."""
+        if not force and time.monotonic() - self.synced_at < settings.FOLLOW_GRAPH_SYNC_INTERVAL:
+            return
+        # One replay at a time; other readers go on with the graph as it is
+        if not self._sync_lock.acquire(blocking=force):
+            return
+        try:
+            now = self.synced_at = time.monotonic()
+            self.gaps = {change_id: deadline for change_id, deadline in self.gaps.items() if deadline > now}
+            since = min(self.gaps, default=self.last_change + 1) - 1
+            changes = (
+                FollowChange.objects.filter(id__gt=since)
+                .order_by("id")
+                .values_list("id", "user_id", "follower_id", "added")
+            )
+            for change_id, user_id, follower_id, added in changes:
+                if change_id <= self.last_change:
+                    if self.gaps.pop(change_id, None) is None:
+                        continue  # applied already
+                else:
+                    deadline = now + settings.FOLLOW_GRAPH_GAP_TIMEOUT
+                    self.gaps.update(dict.fromkeys(range(max(self.last_change + 1, change_id - MAX_GAP), change_id), deadline))
+                    self.last_change = change_id
+                (self.add if added else self.remove)(user_id, follower_id)
+        finally:
+            self._sync_lock.release()
+
+    # Queries
+
+    def is_following(self, follower_id, user_id):
+        follower, user = self._index.get(follower_id), self._index.get(user_id)
+        if follower is None or user is None:
+            return False
+        return _contains(self._following[follower], user)
+
+    def following(self, user_id):
+        """UUIDs of the users `user_id` follows."""
+        index = self._index.get(user_id)
+        if index is None:
+            return []
+        return [self._users[i] for i in self._following[index]]
+
+    def followers(self, user_id):
+        """UUIDs of the users following `user_id`."""
+        index = self._index.get(user_id)
+        if index is None:
+            return []
+        return [self._users[i] for i in self._followers[index]]
+
+    def following_count(self, user_id):
+        index = self._index.get(user_id)
+        return 0 if index is None else len(self._following[index])
+
+    def followers_count(self, user_id):
+        index = self._index.get(user_id)
+        return 0 if index is None else len(self._followers[index])
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The process-wide graph, loaded on first use; None when disabled."""
+    global _graph
+    if not settings.FOLLOW_GRAPH_ENABLED:
+        return None
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = FollowGraph.load()
+        return _graph
+    # Unsynced for longer than the change log is kept: changes may have been pruned
+    if time.monotonic() - _graph.synced_at > settings.FOLLOW_GRAPH_CHANGE_RETENTION:
+        with _graph_lock:
+            _graph = FollowGraph.load()
+        return _graph
+    _graph.sync()
+    return _graph
+
+
+def warm():
+    """Load the graph at process startup instead of on the first request."""
+    try:
+        get_graph()
+    except DatabaseError:
+        # Not fatal: retried on first use
+        logger.warning("Could not build the follow graph at startup", exc_info=True)
+
+
+def prune_changes():
+    """Delete change log rows older than FOLLOW_GRAPH_CHANGE_RETENTION seconds."""
+    cutoff = timezone.now() - timedelta(seconds=settings.FOLLOW_GRAPH_CHANGE_RETENTION)
+    deleted, _ = FollowChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _record(instance, added):
+    if not settings.FOLLOW_GRAPH_ENABLED:
+        return
+    FollowChange.objects.create(user_id=instance.user_id, follower_id=instance.follower_id, added=added)
+    if _graph is not None:
+        apply = _graph.add if added else _graph.remove
+        transaction.on_commit(lambda: apply(instance.user_id, instance.follower_id))
+
+
+def follower_saved(sender, instance, created, **kwargs):
+    if created:
+        _record(instance, added=True)
+
+
+def follower_deleted(sender, instance, **kwargs):
+    _record(instance, added=False)
+
+
+def connect_signals():
+    post_save.connect(follower_saved, sender=Follower, dispatch_uid="follow_graph_saved")
+    post_delete.connect(follower_deleted, sender=Follower, dispatch_uid="follow_graph_deleted")
@@ -0,0 +1,63 @@
+"""
+Time-ordered identifiers.
+
+Random (version 4) UUID primary keys scatter inserts across the whole
+B-tree. Version 7 UUIDs (RFC 9562) start with a 48-bit millisecond Unix
+timestamp, so new rows land at the right-hand edge of the index and ids sort
+in creation order.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+_last = (0, 0)
+_lock = threading.Lock()
+
+
+def uuid7(at=None):
+    """
+    Return a version 7 UUID for the current time (or ``at``, a datetime).
+
+    Ids generated in the same millisecond by this process are strictly
+    increasing: the 12-bit ``rand_a`` field is used as a counter seeded with
+    random bits (RFC 9562, method 1).
+    """
+    global _last
+    ms = int(at.timestamp() * 1000) if at is not None else time.time_ns() // 1_000_000
+    rand_b = int.from_bytes(os.urandom(8), "big") & 0x3FFF_FFFF_FFFF_FFFF
+
+    if at is None:
+        with _lock:
+            last_ms, last_seq = _last
+            if ms <= last_ms:
+                ms, seq = last_ms, last_seq + 1
+                if seq > 0xFFF:  # counter exhausted, borrow the next millisecond
+                    ms, seq = ms + 1, int.from_bytes(os.urandom(1), "big")
+            else:
+                seq = int.from_bytes(os.urandom(2), "big") & 0x7FF
+            _last = (ms, seq)
+    else:
+        seq = int.from_bytes(os.urandom(2), "big") & 0xFFF
+
+    value = (ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
+def uuid7_time(value):
+    """Creation time embedded in a version 7 UUID, or None for other versions (e.g. legacy uuid4 ids)."""
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+
+
+def pack_ids(ids):
+    """Serialize UUIDs as 16 bytes each (compact cache values)."""
+    return b"".join(value.bytes for value in ids)
+
+
+def unpack_ids(data):
+    return [uuid.UUID(bytes=data[i:i + 16]) for i in range(0, len(data), 16)]
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from social import archive, partitions
+
+
+class Command(BaseCommand):
+    help = "Move posts older than ARCHIVE_AFTER_DAYS, with their comments and reactions, to the archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help="archive posts older than this many days (default: ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--restore", metavar="POST_ID", help="move one archived post back instead")
+
+    def handle(self, *args, **options):
+        if options["restore"]:
+            post = archive.restore(options["restore"])
+            if post is None:
+                raise CommandError(f"Post {options['restore']} is not archived")
+            self.stdout.write(self.style.SUCCESS(f"Restored post {post.id}"))
+            return
+
+        before = timezone.now() - timedelta(days=options["days"])
+        moved = archive.archive(before, options["batch_size"])
+        # Months emptied by the archive no longer need a partition
+        dropped = []
+        with connection.cursor() as cursor, transaction.atomic():
+            for table in partitions.TABLES:
+                if partitions.is_partitioned(table, cursor):
+                    dropped += partitions.drop_empty_partitions(table, before, cursor)
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} posts archived (created before {before:%Y-%m-%d})"
+            + (f", empty partitions dropped: {', '.join(dropped)}" if dropped else "")
+        ))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from social import partitions
+
+
+class Command(BaseCommand):
+    help = "Create the monthly post and comment partitions for the coming months"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", type=int, default=settings.PARTITION_MONTHS_AHEAD,
+            help="months beyond the current one to create (default: PARTITION_MONTHS_AHEAD)",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        created = []
+        with connection.cursor() as cursor:
+            for table in partitions.TABLES:
+                if not partitions.is_partitioned(table, cursor):
+                    self.stdout.write(f"{table} is not partitioned, skipped")
+                    continue
+                with transaction.atomic():
+                    created += partitions.create_partitions(table, options["months"], now, cursor)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created)} partitions created" + (f": {', '.join(created)}" if created else "")
+        ))
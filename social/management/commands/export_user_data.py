@@ -0,0 +1,39 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from social.export import export_stream
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Write a user's personal data export (NDJSON, see social.export) to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("user", help="user id, username or email")
+        parser.add_argument("--output", "-o", help="file to write (default: stdout)")
+        parser.add_argument("--gzip", action="store_true", help="gzip the output")
+
+    def handle(self, *args, **options):
+        lookup = Q(username=options["user"]) | Q(email=options["user"])
+        try:
+            lookup |= Q(pk=User._meta.pk.to_python(options["user"]))
+        except ValidationError:
+            pass
+        user = User.objects.filter(lookup).first()
+        if user is None:
+            raise CommandError(f"No user matches {options['user']!r}")
+
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in export_stream(user, compress=options["gzip"]):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"{written} bytes written to {options['output']}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from unilink.schema import write_artifact
+
+
+class Command(BaseCommand):
+    help = "Render the OpenAPI schema served at /swagger.json and /swagger.yaml"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate even if the URL configuration is unchanged")
+
+    def handle(self, *args, **options):
+        if write_artifact(force=options["force"]):
+            self.stdout.write(self.style.SUCCESS("Schema generated"))
+        else:
+            self.stdout.write("Schema is up to date")
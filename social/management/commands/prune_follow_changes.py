@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social.graph import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete follow change log entries older than FOLLOW_GRAPH_CHANGE_RETENTION"
+
+    def handle(self, *args, **options):
+        deleted = prune_changes()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} follow changes pruned"))
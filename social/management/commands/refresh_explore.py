@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social.explore import refresh_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cached explore feed for every institute (run every EXPLORE_REFRESH_INTERVAL seconds)"
+
+    def handle(self, *args, **options):
+        built = refresh_all()
+        self.stdout.write(self.style.SUCCESS(f"{len(built)} explore segments cached"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from social.trending import prune_scores, refresh_top
+
+
+class Command(BaseCommand):
+    help = (
+        "Prune decayed trending scores and recompute the cached list of trending posts "
+        "(run every TRENDING_REFRESH_INTERVAL seconds)"
+    )
+
+    def handle(self, *args, **options):
+        pruned = prune_scores()
+        ids = refresh_top()
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} trending posts cached, {pruned} decayed scores pruned"))
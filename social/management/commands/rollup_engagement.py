@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from social import analytics
+
+
+class Command(BaseCommand):
+    help = "Fold posts, comments, reactions and follows created since the last run into the engagement rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="drop the rollups and recount from the oldest row")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            analytics.rebuild()
+        windows = analytics.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"{windows} windows processed, rollups complete up to {analytics.processed_until()}"
+        ))
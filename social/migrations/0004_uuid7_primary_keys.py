@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:51
+
+import social.ids
+from django.db import migrations, models
+
+# Only the default changes: existing uuid4 ids stay as they are and keep
+# resolving, new rows get time-ordered uuid7 ids.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0003_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='id',
+            field=models.UUIDField(default=social.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='id',
+            field=models.UUIDField(default=social.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='postreaction',
+            name='id',
+            field=models.UUIDField(default=social.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
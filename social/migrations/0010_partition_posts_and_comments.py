@@ -0,0 +1,71 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from social import partitions
+
+# The foreign keys to posts and comments are dropped first: a partitioned
+# table cannot be referenced by one. On PostgreSQL each table is then
+# rebuilt as a partitioned table and its rows copied across, which holds an
+# exclusive lock on it for the duration; run this during a maintenance
+# window on large databases. Other databases only get the state changes.
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in partitions.TABLES:
+            partitions.partition_table(table, settings.PARTITION_MONTHS_AHEAD, timezone.now(), cursor)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in partitions.TABLES:
+            partitions.unpartition_table(table, cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0009_engagement_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subcomments', to='social.comment'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='social.post'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='comment',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='social.comment'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='post',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='social.post'),
+        ),
+        migrations.AlterField(
+            model_name='postreaction',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='social.post'),
+        ),
+        migrations.AlterField(
+            model_name='postscore',
+            name='post',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='social.post'),
+        ),
+        migrations.RunPython(partition, unpartition),
+    ]
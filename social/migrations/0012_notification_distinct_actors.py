@@ -0,0 +1,67 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+# Existing rows start with their latest actor as the only known one. Unread
+# duplicates (possible when two processes flushed the same group) are folded
+# into the newest row before the constraints are added: the others are
+# marked read and the unread counters lowered to match.
+
+
+def fold_unread_duplicates(apps, schema_editor):
+    Notification = apps.get_model("social", "Notification")
+    NotificationCounter = apps.get_model("social", "NotificationCounter")
+    if schema_editor.connection.vendor == "postgresql":
+        # Deferred foreign key checks left pending by these updates would block the CREATE INDEX below
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    for row in Notification.objects.filter(actor_ids=[]).only("id", "actor_id").iterator():
+        Notification.objects.filter(pk=row.pk).update(actor_ids=[str(row.actor_id)])
+
+    groups = (
+        Notification.objects.filter(is_read=False)
+        .values("recipient_id", "verb", "post_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in groups:
+        rows = list(
+            Notification.objects.filter(
+                is_read=False, recipient_id=group["recipient_id"], verb=group["verb"], post_id=group["post_id"],
+            ).order_by("-updated_at")
+        )
+        keep, folded = rows[0], rows[1:]
+        actors = list(dict.fromkeys(actor for row in rows for actor in row.actor_ids))
+        keep.actor_ids = actors
+        keep.actor_count = max(sum(row.actor_count for row in rows), len(actors))
+        keep.save(update_fields=["actor_ids", "actor_count"])
+        Notification.objects.filter(pk__in=[row.pk for row in folded]).update(is_read=True)
+        NotificationCounter.objects.filter(user_id=group["recipient_id"], unread__gte=len(folded)).update(
+            unread=F("unread") - len(folded)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0011_archived_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fold_unread_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False)), fields=('recipient', 'verb', 'post'), name='notification_unread_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), ('post__isnull', True)), fields=('recipient', 'verb'), name='notification_unread_nopost_uniq'),
+        ),
+    ]
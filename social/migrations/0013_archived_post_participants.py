@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:45
+
+import gzip
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Index the commenters and reactors of posts archived so far. The documents
+# are read as archive format 1 wrote them, independently of social.archive.
+
+
+def participants(data):
+    # gzipped JSON; BinaryField values come back as memoryview on PostgreSQL
+    document = json.loads(gzip.decompress(bytes(data)))
+    return {str(row["user_id"]) for row in document["comments"] + document["reactions"]}
+
+
+def index_participants(apps, schema_editor):
+    ArchivedPost = apps.get_model("social", "ArchivedPost")
+    ArchivedPostParticipant = apps.get_model("social", "ArchivedPostParticipant")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    for archived in ArchivedPost.objects.only("id", "data").iterator(chunk_size=500):
+        user_ids = participants(archived.data)
+        user_ids = User.objects.filter(id__in=user_ids).values_list("id", flat=True)
+        ArchivedPostParticipant.objects.bulk_create(
+            [ArchivedPostParticipant(archived_post_id=archived.id, user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0012_notification_distinct_actors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPostParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='social.archivedpost')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='archivedpostparticipant',
+            constraint=models.UniqueConstraint(fields=('user', 'archived_post'), name='archived_participant_uniq'),
+        ),
+        migrations.RunPython(index_participants, migrations.RunPython.noop),
+    ]
@@ -2,29 +2,43 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from .ids import uuid7
+
 User = settings.AUTH_USER_MODEL
 
 # ------------------- Post -------------------
+# Post and Comment are partitioned by month on created_at in PostgreSQL (see social.partitions)
 class Post(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)  # time-ordered, see social.ids
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     text = models.TextField(blank=True, null=True)
     image_url = models.URLField(blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True)  # resized copies of image_url, see users.media
     video_url = models.URLField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"Post by {self.user}"
 
 # ------------------- Comment -------------------
 class Comment(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)  # time-ordered, see social.ids
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
-    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name="subcomments")
+    # Posts and comments are partitioned tables, which cannot be referenced by foreign key
+    # constraints (see social.partitions); deletes still cascade through Django
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments", db_constraint=False)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name="subcomments", db_constraint=False)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Comment previews and paginated threads
+            models.Index(fields=['post', 'created_at'], name='comment_thread_idx'),
+            models.Index(fields=['parent', 'created_at'], name='comment_replies_idx'),
+            models.Index(fields=['created_at'], name='comment_created_idx'),  # analytics rollups
+        ]
+
     def __str__(self):
         return f"Comment by {self.user} on Post {self.post.id}"
 
@@ -33,6 +47,7 @@ class Follower(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="followers")  # being followed
     follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name="following")  # who follows
+    created_at = models.DateTimeField(auto_now_add=True, null=True, db_index=True)  # null for follows made before it was tracked
 
     class Meta:
         unique_together = ('user', 'follower')
@@ -40,19 +55,174 @@ class Follower(models.Model):
     def __str__(self):
         return f"{self.follower} follows {self.user}"
 
+class FollowChange(models.Model):
+    """Append-only log of follows/unfollows, replayed by the in-process graph (social.graph)."""
+    # Plain UUIDs rather than foreign keys: removals must outlive deleted users
+    user_id = models.UUIDField()
+    follower_id = models.UUIDField()
+    added = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
 # ------------------- Post Reaction -------------------
 class PostReaction(models.Model):
     REACTION_CHOICES = [
         ('like', 'Like'),
         ('comment', 'Comment')  # optional
     ]
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)  # time-ordered, see social.ids
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="post_reactions")
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="reactions")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="reactions", db_constraint=False)  # see Comment.post
     reaction_type = models.CharField(max_length=10, choices=REACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, null=True, db_index=True)  # null for reactions made before it was tracked
 
     class Meta:
         unique_together = ('user', 'post', 'reaction_type')
 
     def __str__(self):
         return f"{self.user} reacted {self.reaction_type} on {self.post.id}"
+
+# ------------------- Notification -------------------
+class Notification(models.Model):
+    """
+    One inbox row per (recipient, verb, post) while unread. Later events of the
+    same kind are folded into it, so a burst of likes reads as
+    "X and 40 others liked your post".
+    """
+    VERB_CHOICES = [
+        ('follow', 'Follow'),
+        ('like', 'Like'),
+        ('comment', 'Comment'),
+        ('reply', 'Reply'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")  # most recent actor
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name="+", db_constraint=False)  # see Comment.post
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True, related_name="+", db_constraint=False)
+    actor_count = models.PositiveIntegerField(default=1)  # distinct actors
+    actor_ids = models.JSONField(default=list, blank=True)  # the most recent distinct actors, capped (see social.notifications)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at'], name='notification_inbox_idx'),
+        ]
+        constraints = [
+            # At most one unread row per group, whichever process flushes it
+            models.UniqueConstraint(
+                fields=['recipient', 'verb', 'post'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_uniq',
+            ),
+            # NULLs never collide in a unique index, so groups without a post (follows) need their own
+            models.UniqueConstraint(
+                fields=['recipient', 'verb'],
+                condition=models.Q(is_read=False, post__isnull=True),
+                name='notification_unread_nopost_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.actor} {self.verb} -> {self.recipient}"
+
+
+class NotificationCounter(models.Model):
+    """Number of unread notification rows, kept alongside the inbox."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter")
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user}: {self.unread} unread"
+
+# ------------------- Trending Score -------------------
+class PostScore(models.Model):
+    """
+    Time-decayed engagement score of a post, kept in log2 space relative to a
+    fixed epoch (see social.trending). Scores of different posts compare
+    directly, so the top-K is an index scan on `score`.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="trending_score", db_constraint=False)  # see Comment.post
+    score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.post_id}: {self.score:.3f}"
+
+# ------------------- Archive -------------------
+class ArchivedPost(models.Model):
+    """
+    A post moved out of the live tables by social.archive, together with its
+    comments and reactions, as one gzipped JSON document. Read-only.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)  # the post's id, unchanged
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_posts")
+    created_at = models.DateTimeField()
+    comments_count = models.PositiveIntegerField(default=0)
+    reactions_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_post_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived post by {self.user}"
+
+
+class ArchivedPostParticipant(models.Model):
+    """A user whose comments or reactions are inside an ArchivedPost's document."""
+    archived_post = models.ForeignKey(ArchivedPost, on_delete=models.CASCADE, related_name="participants")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'archived_post'], name='archived_participant_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.archived_post_id}"
+
+# ------------------- Analytics -------------------
+class EngagementRollup(models.Model):
+    """
+    Engagement counts per hour or day and per (institute, department) of the
+    acting user, maintained incrementally by social.analytics.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()  # start of the hour or day
+    institute_name = models.CharField(max_length=200)
+    dept_course = models.CharField(max_length=200)
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    reactions = models.PositiveIntegerField(default=0)
+    follows = models.PositiveIntegerField(default=0)  # follows gained by users of this institute/department
+    active_posters = models.PositiveIntegerField(default=0)  # distinct users who posted in the bucket
+
+    class Meta:
+        unique_together = ('granularity', 'bucket', 'institute_name', 'dept_course')
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='rollup_range_idx'),
+        ]
+
+class ActivePoster(models.Model):
+    """Who already counts as active in a bucket that is still being filled; pruned once it is closed."""
+    granularity = models.CharField(max_length=4)
+    bucket = models.DateTimeField()
+    user_id = models.UUIDField()
+
+    class Meta:
+        unique_together = ('granularity', 'bucket', 'user_id')
+
+class RollupWatermark(models.Model):
+    """Rows created before `processed_until` have been folded into the rollups."""
+    name = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField()
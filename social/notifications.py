@@ -0,0 +1,157 @@
+"""
+Notification fan-out.
+
+Views call ``notify`` after a follow, like, comment or reply. Events are
+coalesced in memory and written in batches: each batch folds into the
+recipients' existing unread rows with one bulk update, creates the rest with
+one bulk insert and bumps the unread counters.
+
+actor_count counts distinct actors. Events carry the ids of their actors and
+rows keep the ACTORS_KEPT most recent ones, so an actor who likes, unlikes
+and likes again is counted once. Only an actor who dropped out of that list
+can be counted twice. A conditional unique constraint allows one unread row
+per group; a batch that loses a race with another process's flush fails,
+is queued again and then folds into the row the other process created.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from users.models import User
+
+from .buffering import BatchBuffer
+from .models import Notification, NotificationCounter
+
+ACTORS_KEPT = 100
+
+
+def notify(recipient_id, verb, actor_id, post_id=None, comment_id=None):
+    """Queue a notification for recipient_id once the current transaction commits."""
+    if str(recipient_id) == str(actor_id):
+        return
+    event = {
+        "recipient_id": recipient_id,
+        "verb": verb,
+        "actor_id": actor_id,
+        "post_id": post_id,
+        "comment_id": comment_id,
+        "actors": [str(actor_id)],
+        "at": timezone.now(),
+    }
+    key = _group_key(recipient_id, verb, post_id)
+    transaction.on_commit(lambda: get_buffer().add(key, event))
+
+
+def _group_key(recipient_id, verb, post_id):
+    return (str(recipient_id), verb, str(post_id) if post_id else None)
+
+
+def _union(old, new):
+    """Distinct actor ids of both lists, most recent last."""
+    return [actor for actor in old if actor not in new] + new
+
+
+def _merge(old, new):
+    # Latest actor and comment win; repeat events by the same actor are not recounted
+    return {**new, "actors": _union(old["actors"], new["actors"])}
+
+
+def write_notifications(events):
+    """Fold a batch of coalesced events into the notification tables."""
+    # Recipients and actors may have deleted their account since the event
+    user_ids = {event["recipient_id"] for event in events} | {actor for event in events for actor in event["actors"]}
+    users = {str(user_id) for user_id in User.objects.filter(id__in=user_ids).values_list("id", flat=True)}
+    events = [
+        {**event, "actors": [actor for actor in event["actors"] if actor in users]}
+        for event in events if str(event["recipient_id"]) in users
+    ]
+    events = [{**event, "actor_id": event["actors"][-1]} for event in events if event["actors"]]
+    if not events:
+        return
+
+    with transaction.atomic():
+        lookup = Q()
+        for event in events:
+            lookup |= Q(recipient_id=event["recipient_id"], verb=event["verb"], post_id=event["post_id"])
+        existing = {
+            _group_key(row.recipient_id, row.verb, row.post_id): row
+            for row in Notification.objects.select_for_update().filter(lookup, is_read=False)
+        }
+
+        updated, created = [], []
+        for event in events:
+            row = existing.get(_group_key(event["recipient_id"], event["verb"], event["post_id"]))
+            if row is None:
+                created.append(Notification(
+                    recipient_id=event["recipient_id"],
+                    actor_id=event["actor_id"],
+                    verb=event["verb"],
+                    post_id=event["post_id"],
+                    comment_id=event["comment_id"],
+                    actor_count=len(event["actors"]),
+                    actor_ids=event["actors"][-ACTORS_KEPT:],
+                    updated_at=event["at"],
+                ))
+                continue
+            known = row.actor_ids or [str(row.actor_id)]
+            row.actor_count += sum(actor not in known for actor in event["actors"])
+            row.actor_ids = _union(known, event["actors"])[-ACTORS_KEPT:]
+            row.actor_id = event["actor_id"]
+            row.comment_id = event["comment_id"] or row.comment_id
+            row.updated_at = event["at"]
+            updated.append(row)
+
+        if updated:
+            Notification.objects.bulk_update(updated, ["actor", "comment", "actor_count", "actor_ids", "updated_at"])
+        if created:
+            Notification.objects.bulk_create(created)
+            increments = Counter(row.recipient_id for row in created)
+            NotificationCounter.objects.bulk_create(
+                [NotificationCounter(user_id=user_id) for user_id in increments],
+                ignore_conflicts=True,
+            )
+            for user_id, n in increments.items():
+                NotificationCounter.objects.filter(user_id=user_id).update(unread=F("unread") + n)
+
+
+def mark_read(user, ids=None):
+    """Mark the user's notifications (or just ``ids``) as read and adjust the counter."""
+    with transaction.atomic():
+        unread = Notification.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        marked = unread.update(is_read=True)
+        if ids is None:
+            NotificationCounter.objects.filter(user=user).update(unread=0)
+        elif marked:
+            NotificationCounter.objects.filter(user=user).update(unread=Greatest(F("unread") - marked, 0))
+    return marked
+
+
+def unread_count(user):
+    counter = NotificationCounter.objects.filter(user=user).values_list("unread", flat=True).first()
+    return counter or 0
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BatchBuffer(
+                    write_notifications,
+                    interval=settings.NOTIFICATIONS_FLUSH_INTERVAL,
+                    max_size=settings.NOTIFICATIONS_BATCH_SIZE,
+                    merge=_merge,
+                    name="notifications",
+                )
+    return _buffer
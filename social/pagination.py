@@ -1,5 +1,5 @@
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
 from django.core.paginator import Paginator
 from django.utils import timezone
@@ -51,3 +51,24 @@ class TimestampBasedPagination(PageNumberPagination):
             'previous': previous_url,
             'results': data
         })
+
+class NotificationCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the notification inbox (newest activity first).
+    Pages are fetched with ?cursor=..., so deep pages cost the same as the first.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-updated_at'
+
+
+class CommentCursorPagination(CursorPagination):
+    """
+    Keyset pagination for comment threads, oldest first, so paging through a
+    post with thousands of comments never uses OFFSET.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'created_at'
@@ -0,0 +1,265 @@
+"""
+Monthly range partitioning of the post and comment tables (PostgreSQL).
+
+social_post and social_comment are partitioned by RANGE (created_at), one
+partition per calendar month (UTC) named <table>_pYYYYMM, plus a
+<table>_default partition that catches rows outside every month created so
+far. ``manage.py create_partitions`` runs on a schedule and keeps
+PARTITION_MONTHS_AHEAD months ready; rows that reached the default partition
+in the meantime are moved into their month when it is created.
+
+The primary key of a partitioned table has to contain the partition key, so
+it is (id, created_at). Ids stay unique (they are UUIDs) and lookups by id
+still use the key's index, but nothing can reference the tables with a
+foreign key any more: the relations to posts and comments are declared with
+db_constraint=False and deletes cascade through Django's collector, as they
+always did.
+
+The planner skips a partition only when the query bounds created_at. Rows
+that belong to a post or comment (its comments, its replies) are never older
+than it, and its uuid7 id carries its creation time, so ``since_id`` turns
+an id into a lower bound without another query. Legacy uuid4 ids give no
+bound and those queries visit every partition, as before.
+
+Without the foreign keys nothing stops a comment or reaction from being
+inserted while its post is deleted. Writers take the lock the key check
+would have taken with ``share_rows``.
+
+On SQLite (development) nothing is partitioned and these functions are not
+used; the bounds are harmless there.
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+
+from .ids import uuid7_time
+
+TABLES = ["social_post", "social_comment"]
+KEY = "created_at"
+
+# created_at is set when the row is saved, a moment after its id is minted
+# on the same clock; the margin also covers rows saved with a created_at
+# backdated a little
+ID_TIME_MARGIN = timedelta(days=1)
+
+
+# ------------------- Query bounds -------------------
+def since_id(object_id):
+    """Earliest created_at of rows created after the row with this id, or None for legacy ids."""
+    try:
+        created = uuid7_time(object_id)
+    except ValueError:
+        return None
+    return created - ID_TIME_MARGIN if created else None
+
+
+def prune_by_id(queryset, object_id):
+    """Restrict `queryset` to rows created after the row `object_id`, so older partitions are skipped."""
+    since = since_id(object_id)
+    return queryset.filter(created_at__gte=since) if since else queryset
+
+
+def since_ids(object_ids):
+    """The earliest bound for a set of ids, or None if any of them gives none."""
+    bounds = [since_id(object_id) for object_id in object_ids]
+    if not bounds or None in bounds:
+        return None
+    return min(bounds)
+
+
+# ------------------- Standing in for foreign keys -------------------
+def share_rows(model, object_ids):
+    """
+    Lock the rows of `model` (posts, comments) with these ids against being
+    deleted until the transaction ends, the way a foreign key check would,
+    and return the ids that still exist. Call it inside the transaction that
+    inserts rows pointing at them: a delete that locks them first
+    (``archive.archive_batch``) then waits for that transaction, and one that
+    got there first leaves nothing to point at.
+    """
+    queryset = model.objects.filter(pk__in=object_ids)
+    since = since_ids(object_ids)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    queryset = queryset.values_list("pk", flat=True)
+    if connection.vendor != "postgresql":
+        return set(queryset)
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} FOR KEY SHARE", params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+# ------------------- Partition management -------------------
+def month_start(moment):
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition(table):
+    return f"{table}_default"
+
+
+def _literal(moment):
+    # Partition bounds must be constants in the DDL itself
+    return f"'{moment.isoformat()}'"
+
+
+def is_partitioned(table, cursor):
+    if connection.vendor != "postgresql":
+        return False
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [table],
+    )
+    return cursor.fetchone() is not None
+
+
+def partitions(table, cursor):
+    """Names of the partitions of `table`."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+        [table],
+    )
+    return [name for (name,) in cursor.fetchall()]
+
+
+def create_partition(table, month, cursor):
+    """
+    Create the partition of `table` for `month` unless it exists; returns
+    whether it was created. Rows of that month already in the default
+    partition are moved into it before it is attached.
+    """
+    name = partition_name(table, month)
+    if name in partitions(table, cursor):
+        return False
+    qn = connection.ops.quote_name
+    start, end = month, add_months(month, 1)
+    cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    default = default_partition(table)
+    if default in partitions(table, cursor):
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(default)} WHERE {KEY} >= %s AND {KEY} < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [start, end],
+        )
+    # Attaching builds the partition's copy of every index of the table
+    cursor.execute(
+        f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} "
+        f"FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})"
+    )
+    return True
+
+
+def create_partitions(table, months_ahead, now, cursor, since=None):
+    """Make sure every month from `since` (default: this month) to `months_ahead` months out has a partition."""
+    month = month_start(since or now)
+    last = add_months(month_start(now), months_ahead)
+    created = []
+    while month <= last:
+        if create_partition(table, month, cursor):
+            created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_empty_partitions(table, before, cursor):
+    """
+    Drop the monthly partitions of `table` that end by `before` and hold no
+    rows (e.g. emptied by social.archive); returns their names. Rows that
+    later arrive for those months go to the default partition.
+    """
+    qn = connection.ops.quote_name
+    dropped = []
+    for name in partitions(table, cursor):
+        match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+        if not match:
+            continue
+        end = add_months(datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc), 1)
+        if end > before:
+            continue
+        cursor.execute(f"SELECT 1 FROM {qn(name)} LIMIT 1")
+        if cursor.fetchone() is None:
+            cursor.execute(f"DROP TABLE {qn(name)}")
+            dropped.append(name)
+    return dropped
+
+
+# ------------------- Conversion (used by migration 0010) -------------------
+def _indexes(table, cursor):
+    """CREATE INDEX statements of `table`'s indexes, except those backing its primary key and unique constraints."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND schemaname = current_schema() "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+        [table, table],
+    )
+    return [definition for (definition,) in cursor.fetchall()]
+
+
+def _foreign_keys(table, cursor):
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _rebuild(table, cursor, create, primary_key, after_create=None):
+    """
+    Replace `table` by a new one made by `create` (SQL with a {table} and
+    {old} placeholder), copying the rows across and recreating its indexes
+    (under their old names), foreign keys and primary key.
+    """
+    qn = connection.ops.quote_name
+    old = f"{table}_old"
+    indexes = _indexes(table, cursor)
+    foreign_keys = _foreign_keys(table, cursor)
+    cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+    cursor.execute(create.format(table=qn(table), old=qn(old)))
+    if after_create:
+        after_create(cursor)
+    cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+    cursor.execute(f"DROP TABLE {qn(old)}")
+
+    cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY ({primary_key})")
+    for definition in indexes:
+        # "CREATE INDEX name ON public.<old> USING ..." names the renamed table
+        cursor.execute(re.sub(r" ON (ONLY )?(\S+\.)?\S+ USING ", f" ON {qn(table)} USING ", definition, count=1))
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+
+def partition_table(table, months_ahead, now, cursor):
+    """Turn a plain table into a partitioned one holding the same rows."""
+    cursor.execute(f"SELECT min({KEY}) FROM {connection.ops.quote_name(table)}")
+    (oldest,) = cursor.fetchone()
+
+    def add_partitions(cursor):
+        qn = connection.ops.quote_name
+        cursor.execute(f"CREATE TABLE {qn(default_partition(table))} PARTITION OF {qn(table)} DEFAULT")
+        create_partitions(table, months_ahead, now, cursor, since=oldest)
+
+    _rebuild(
+        table,
+        cursor,
+        "CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%s)" % KEY,
+        f"id, {KEY}",
+        add_partitions,
+    )
+
+
+def unpartition_table(table, cursor):
+    """Turn a partitioned table back into a plain one."""
+    _rebuild(table, cursor, "CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)", "id")
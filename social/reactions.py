@@ -0,0 +1,165 @@
+"""
+Write-behind reactions.
+
+A viral post gets thousands of likes a second, and writing each one in its
+own request makes them queue up on the same index pages and score row.
+Instead, PostReactionView only records the wanted state of a reaction
+(added or removed) in a BatchBuffer keyed by (user, post, reaction type).
+Liking, unliking and liking again collapse into the last state. Every
+REACTIONS_FLUSH_INTERVAL seconds, or once REACTIONS_BATCH_SIZE reactions are
+pending, the buffer is written out:
+
+- one DELETE for every removed reaction;
+- one INSERT ... ON CONFLICT DO NOTHING RETURNING for every added one. The
+  rows it returns are the reactions that are really new. Only those bump the
+  trending score (one upsert per post and type) and notify the author.
+
+A pending reaction lives in this process's memory until the flush, so a
+crash loses at most one interval of reactions. The requester's own reads
+served by this process already include it (``pending_delta``,
+``pending_state``), also while its batch is being written; a batch whose
+write fails is queued again. Other processes see it after the flush.
+"""
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+
+from . import trending
+from .buffering import BatchBuffer
+from .ids import uuid7
+from .models import Post, PostReaction
+from .notifications import notify
+from .partitions import share_rows
+
+REACTION_TYPES = {value for value, _ in PostReaction.REACTION_CHOICES}
+INSERT_CHUNK = 1000  # rows per INSERT statement, well below the databases' parameter limits
+
+
+def _key(user_id, post_id, reaction_type):
+    return (str(user_id), str(post_id), reaction_type)
+
+
+def _merge(old, new):
+    # Whether the row existed is only known for the first state queued
+    return {**new, "existed": old["existed"]}
+
+
+def react(user_id, post_id, reaction_type, on):
+    """
+    Queue a reaction being added (`on`) or removed. Returns whether it was
+    there before, counting reactions that are still pending.
+    """
+    key = _key(user_id, post_id, reaction_type)
+    buffer = get_buffer()
+    item = buffer.pending(key)
+    if item is not None:
+        current = item["on"]
+    else:
+        current = PostReaction.objects.filter(user_id=user_id, post_id=post_id, reaction_type=reaction_type).exists()
+    if current != on:
+        buffer.add(key, {
+            "user_id": user_id,
+            "post_id": post_id,
+            "reaction_type": reaction_type,
+            "on": on,
+            "existed": current,
+            "at": timezone.now(),
+        })
+    return current
+
+
+def pending_state(user_id, post_id, reaction_type):
+    """True (added) or False (removed) while a reaction is waiting to be written, otherwise None."""
+    item = get_buffer().pending(_key(user_id, post_id, reaction_type))
+    return item["on"] if item else None
+
+
+def pending_delta(user_id, post_id):
+    """How much the user's pending reactions will change the post's reaction count."""
+    delta = 0
+    for reaction_type in REACTION_TYPES:
+        item = get_buffer().pending(_key(user_id, post_id, reaction_type))
+        if item:
+            delta += item["on"] - item["existed"]
+    return delta
+
+
+def _insert(items):
+    """INSERT ... ON CONFLICT DO NOTHING; returns the (post_id, reaction_type, user_id) of the rows inserted."""
+    meta = PostReaction._meta
+    fields = [meta.get_field(name) for name in ("id", "user", "post", "reaction_type", "created_at")]
+    rows, params = [], []
+    for item in items:
+        values = [uuid7(), item["user_id"], item["post_id"], item["reaction_type"], item["at"]]
+        params += [field.get_db_prep_value(value, connection) for field, value in zip(fields, values)]
+        rows.append("(%s)" % ", ".join(["%s"] * len(fields)))
+    qn = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(field.column) for field in fields)}) "
+        f"VALUES {', '.join(rows)} "
+        f"ON CONFLICT ({qn('user_id')}, {qn('post_id')}, {qn('reaction_type')}) DO NOTHING "
+        f"RETURNING {qn('post_id')}, {qn('reaction_type')}, {qn('user_id')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(uuid.UUID(str(post_id)), reaction_type, uuid.UUID(str(user_id))) for post_id, reaction_type, user_id in cursor.fetchall()]
+
+
+def write_reactions(items):
+    """Apply a batch of pending reaction states."""
+    added = [item for item in items if item["on"]]
+    removed = [item for item in items if not item["on"]]
+    inserted = []
+    with transaction.atomic():
+        if removed:
+            lookup = Q()
+            for item in removed:
+                lookup |= Q(user_id=item["user_id"], post_id=item["post_id"], reaction_type=item["reaction_type"])
+            PostReaction.objects.filter(lookup).delete()
+        if added:
+            # Posts deleted or archived since the reaction was queued take no more reactions;
+            # the others are locked so archiving waits for these rows
+            live = share_rows(Post, {item["post_id"] for item in added})
+            # ... and neither do users who deleted their account
+            users = set(User.objects.filter(id__in={item["user_id"] for item in added}).values_list("id", flat=True))
+            added = [
+                item for item in added
+                if uuid.UUID(str(item["post_id"])) in live and uuid.UUID(str(item["user_id"])) in users
+            ]
+            for start in range(0, len(added), INSERT_CHUNK):
+                inserted += _insert(added[start:start + INSERT_CHUNK])
+
+    now = timezone.now()
+    for (post_id, reaction_type), count in Counter((post_id, kind) for post_id, kind, _ in inserted).items():
+        trending.record(post_id, reaction_type, at=now, count=count)
+    if any(kind == "like" for _, kind, _ in inserted):
+        authors = dict(Post.objects.filter(id__in={post_id for post_id, _, _ in inserted}).values_list("id", "user_id"))
+        for post_id, kind, user_id in inserted:
+            if kind == "like":
+                notify(authors[post_id], "like", user_id, post_id=post_id)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BatchBuffer(
+                    write_reactions,
+                    interval=settings.REACTIONS_FLUSH_INTERVAL,
+                    max_size=settings.REACTIONS_BATCH_SIZE,
+                    merge=_merge,
+                    name="reactions",
+                )
+    return _buffer
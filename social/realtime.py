@@ -0,0 +1,232 @@
+"""
+Live feed updates pushed over Server-Sent Events.
+
+New posts are handed to a broker; every worker process owns a FeedHub that
+receives broker messages and fans them out to the SSE connections it holds.
+The default LocalBroker only reaches connections in the same process; set
+FEED_STREAM_BROKER to a class with the same interface (e.g. one backed by
+Redis pub/sub) to reach connections held by other workers.
+
+A stream unsubscribes when its generator is closed. Django cancels the
+response's generator when the client disconnects since 5.0, hence the
+Django>=5.0 requirement: on 4.2 every closed connection would stay
+registered with the hub.
+
+Broker callbacks only queue the message: the hub's dispatch thread looks up
+the followers and hands the post to their streams, so neither the publishing
+request nor a broker's listener thread waits on the database.
+
+EventSource cannot send an Authorization header, so a client first exchanges
+its access token for a StreamToken, which only opens the stream and expires
+after FEED_STREAM_TOKEN_LIFETIME seconds, and passes that in the URL.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import Token
+
+from .models import Follower
+
+logger = logging.getLogger(__name__)
+
+# Posts resolved to their recipients with one follower query
+DISPATCH_BATCH = 100
+
+
+class StreamToken(Token):
+    """Short-lived JWT that only authenticates FeedStreamView (rejected everywhere else)."""
+
+    token_type = "feed_stream"
+    lifetime = timedelta(seconds=settings.FEED_STREAM_TOKEN_LIFETIME)
+
+
+class LocalBroker:
+    """
+    In-process broker. Messages are delivered synchronously to every
+    callback registered in this process.
+
+    A custom broker must provide the same two methods: ``subscribe(callback)``
+    to register a function called with each message dict, and
+    ``publish(message)`` to send a JSON-serializable dict to all subscribers.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def publish(self, message):
+        for callback in list(self._callbacks):
+            callback(message)
+
+
+class FeedSubscriber:
+    """
+    One open stream. Events are queued on the connection's event loop; when a
+    slow client lets the queue fill up, further post ids are dropped and only
+    counted, so memory per connection stays bounded.
+    """
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, event):
+        # Always called on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def events(self, heartbeat):
+        """Yield SSE frames until the client disconnects."""
+        yield "retry: 5000\n\n"
+        burst = 0
+        while True:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing idle connections
+                yield ": keepalive\n\n"
+                continue
+
+            burst += 1
+            yield format_event("post", event)
+
+            if self.queue.empty():
+                yield format_event("new_posts", {"count": burst + self.dropped})
+                burst = 0
+                self.dropped = 0
+
+
+class FeedHub:
+    """
+    Tracks the open streams of this process and routes published posts to
+    the connected followers of the author (and to the author themselves).
+    """
+
+    def __init__(self, broker=None):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=settings.FEED_STREAM_DISPATCH_QUEUE_SIZE)
+        self._worker = threading.Thread(target=self._run, name="feed-hub-dispatch", daemon=True)
+        self._worker.start()
+        self.broker = broker or import_string(settings.FEED_STREAM_BROKER)()
+        self.broker.subscribe(self._enqueue)
+
+    def subscribe(self, user_id):
+        """Register a stream for user_id. Must be called from its event loop."""
+        subscriber = FeedSubscriber(
+            str(user_id), asyncio.get_running_loop(), settings.FEED_STREAM_QUEUE_SIZE
+        )
+        with self._lock:
+            self._subscribers[subscriber.user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            streams = self._subscribers.get(subscriber.user_id)
+            if streams is not None:
+                streams.discard(subscriber)
+                if not streams:
+                    del self._subscribers[subscriber.user_id]
+
+    def publish(self, post):
+        self.broker.publish({
+            "id": str(post.id),
+            "user_id": str(post.user_id),
+            "created_at": post.created_at.isoformat(),
+        })
+
+    def _enqueue(self, message):
+        # Broker callback, possibly on the publishing request's thread: never block it
+        try:
+            self._pending.put_nowait(message)
+        except queue.Full:
+            logger.warning("Feed stream dispatch queue is full, dropping post %s", message["id"])
+
+    def _run(self):
+        while True:
+            messages = [self._pending.get()]
+            while len(messages) < DISPATCH_BATCH:
+                try:
+                    messages.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            close_old_connections()
+            try:
+                self._dispatch(messages)
+            except Exception:
+                logger.exception("Failed to dispatch %d posts to feed streams", len(messages))
+            finally:
+                close_old_connections()
+
+    def _dispatch(self, messages):
+        with self._lock:
+            connected = set(self._subscribers)
+        if not connected:
+            return
+
+        # Only look up the followers that actually hold a stream in this process
+        followers = defaultdict(set)
+        for author_id, follower_id in Follower.objects.filter(
+            user_id__in={message["user_id"] for message in messages}, follower_id__in=connected
+        ).values_list("user_id", "follower_id"):
+            followers[str(author_id)].add(str(follower_id))
+
+        deliveries = []
+        with self._lock:
+            for message in messages:
+                author_id = message["user_id"]
+                recipients = followers[author_id] | ({author_id} & connected)
+                deliveries.extend(
+                    (subscriber, message)
+                    for user_id in recipients
+                    for subscriber in self._subscribers.get(user_id, ())
+                )
+        for subscriber, message in deliveries:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, message)
+            except RuntimeError:
+                # The stream's event loop has closed; it unsubscribes on its way out
+                pass
+
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = FeedHub()
+    return _hub
+
+
+def stream_token_for(user):
+    return StreamToken.for_user(user)
+
+
+def publish_post(post):
+    """Announce a newly created post. Never raises into the request."""
+    try:
+        get_hub().publish(post)
+    except Exception:
+        logger.exception("Failed to publish post %s to the feed stream", post.id)
@@ -1,33 +1,98 @@
 from rest_framework import serializers
-from .models import Post, Comment, Follower, PostReaction
-from users.serializers import UserSerializer
+from .models import Post, Comment, Follower, PostReaction, Notification
+from users.serializers import UserSerializer, UserListSerializer
 from users.models import User
+from users.media import variants_for_url
+from .graph import get_graph
+from .comments import load_comment_summaries
+from .reactions import pending_delta
+from unilink.serializers import SparseFieldsMixin
 
 # Recursive Comment Serializer
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     subcomments = serializers.SerializerMethodField()
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = Comment
         fields = ["id", "user", "post", "parent", "text", "created_at", "subcomments"]
+        expandable_fields = ["user"]
+        sparse_sources = {"subcomments": []}
 
     def get_subcomments(self, obj):
         serializer = CommentSerializer(obj.subcomments.all(), many=True)
         return serializer.data
 
+# Comment in a paginated thread: replies are counted, not embedded
+class CommentThreadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+    replies_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ["id", "user", "post", "parent", "text", "created_at", "replies_count"]
+        expandable_fields = ["user"]
+        sparse_sources = {"replies_count": []}
+
+# Comment as previewed inside a post
+class CommentPreviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = UserListSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ["id", "user", "text", "created_at"]
+        expandable_fields = ["user"]
+
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        fields = self.child.fields
+        if "comments" in fields or "comments_count" in fields:
+            load_comment_summaries(posts, previews="comments" in fields)
+        return super().to_representation(posts)
+
 # Post Serializer
-class PostSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, read_only=True)
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    comments = CommentPreviewSerializer(many=True, read_only=True, source="comment_preview")
+    comments_count = serializers.IntegerField(read_only=True)
     reactions_count = serializers.SerializerMethodField()
+    archived = serializers.BooleanField(read_only=True, default=False)  # set on posts read from social.archive
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = Post
-        fields = ["id", "user", "text", "image_url", "video_url", "created_at", "comments", "reactions_count"]
+        fields = [
+            "id", "user", "text", "image_url", "image_variants", "video_url", "created_at",
+            "comments_count", "comments", "reactions_count", "archived",
+        ]
+        read_only_fields = ["image_variants"]
+        list_serializer_class = PostListSerializer
+        expandable_fields = ["user", "comments"]
+        # comments and comments_count are loaded by load_comment_summaries, not the queryset
+        sparse_sources = {"reactions_count": [], "comments": [], "comments_count": [], "archived": []}
+
+    def to_representation(self, instance):
+        # Single posts (detail, create); lists load their summaries in one go
+        if "comments" in self.fields or "comments_count" in self.fields:
+            load_comment_summaries([instance], previews="comments" in self.fields)
+        return super().to_representation(instance)
 
     def get_reactions_count(self, obj):
-        return obj.reactions.count()
+        # Archived posts carry their count
+        if hasattr(obj, "reactions_count"):
+            return obj.reactions_count
+        count = obj.reactions.count()
+        # The requester's own reactions count before they are written (added
+        # by the view instead when the data is shared, see unilink.hotcache)
+        request = self.context.get("request")
+        if request is not None and request.user.is_authenticated and not self.context.get("shared"):
+            count += pending_delta(request.user.id, obj.pk)
+        return count
+
+    def create(self, validated_data):
+        if "image_variants" not in validated_data:
+            validated_data["image_variants"] = variants_for_url(validated_data.get("image_url"))
+        return super().create(validated_data)
 
 # Follower Serializer
 class FollowerSerializer(serializers.ModelSerializer):
@@ -41,8 +106,38 @@ class PostReactionSerializer(serializers.ModelSerializer):
         model = PostReaction
         fields = ["id", "user", "post", "reaction_type"]
 
+# Notification Serializer
+class NotificationSerializer(serializers.ModelSerializer):
+    actor = UserListSerializer(read_only=True)
+    others_count = serializers.SerializerMethodField()
+    message = serializers.SerializerMethodField()
+
+    VERB_MESSAGES = {
+        "follow": "started following you",
+        "like": "liked your post",
+        "comment": "commented on your post",
+        "reply": "replied to your comment",
+    }
+
+    class Meta:
+        model = Notification
+        fields = ["id", "verb", "actor", "others_count", "message", "post", "comment", "is_read", "updated_at"]
+
+    def get_others_count(self, obj):
+        return obj.actor_count - 1
+
+    def get_message(self, obj):
+        # e.g. "alice and 40 others liked your post"
+        others = obj.actor_count - 1
+        who = obj.actor.username
+        if others == 1:
+            who = f"{who} and 1 other"
+        elif others > 1:
+            who = f"{who} and {others} others"
+        return f"{who} {self.VERB_MESSAGES[obj.verb]}"
+
 # User Profile Serializer
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     followers_count = serializers.SerializerMethodField()
     following_count = serializers.SerializerMethodField()
     posts_count = serializers.SerializerMethodField()
@@ -51,19 +146,23 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
-            "id", "email", "username", "full_name", "bio", "profile_photo",
+            "id", "email", "username", "full_name", "bio", "profile_photo", "profile_photo_variants",
             "institute_name", "dob", "dept_course", "gender", "register_number",
             "date_joined", "followers_count", "following_count", "posts_count", "age"
         ]
+        sparse_sources = {"followers_count": [], "following_count": [], "posts_count": [], "age": ["dob"]}
 
     def get_followers_count(self, obj):
-        return obj.followers.count()
+        graph = get_graph()
+        return graph.followers_count(obj.id) if graph else obj.followers.count()
 
     def get_following_count(self, obj):
-        return obj.following.count()
+        graph = get_graph()
+        return graph.following_count(obj.id) if graph else obj.following.count()
 
     def get_posts_count(self, obj):
-        return obj.posts.count()
+        # Archived posts still appear in the user's post list (see social.archive)
+        return obj.posts.count() + obj.archived_posts.count()
 
     def get_age(self, obj):
         """Calculate age from date of birth"""
@@ -1,3 +1,193 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import queue
+import threading
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from . import archive
+from .ids import uuid7
+from .models import ArchivedPost, Comment, Follower, Post
+from .realtime import FeedHub, FeedSubscriber, LocalBroker
+
+
+def make_user(name):
+    return User.objects.create_user(
+        email=f"{name}@example.com",
+        username=name,
+        full_name=name.title(),
+        institute_name="Test Institute",
+        dob=datetime.date(2000, 1, 1),
+        dept_course="Computer Science",
+        gender="female",
+        register_number=name,
+        password="password",
+    )
+
+
+@skipUnless(connection.vendor == "postgresql", "row locks need PostgreSQL")
+class ArchiveRaceTests(TransactionTestCase):
+    """A comment written while its post is being archived is never lost."""
+
+    def setUp(self):
+        self.author = make_user("author")
+        self.commenter = make_user("commenter")
+        created = timezone.now() - datetime.timedelta(days=30)
+        self.post = Post.objects.create(id=uuid7(created), user=self.author, text="Old news")
+        Post.objects.filter(pk=self.post.pk).update(created_at=created)
+
+    def comment(self):
+        client = APIClient()
+        client.force_authenticate(self.commenter)
+        try:
+            return client.post("/api/social/comments/", {"post": str(self.post.pk), "text": "Late reply"})
+        finally:
+            connection.close()
+
+    def test_comment_during_archive_waits_and_is_rejected(self):
+        snapshotted, proceed = threading.Event(), threading.Event()
+        encode = archive.encode
+
+        def slow_encode(document):
+            snapshotted.set()
+            proceed.wait(5)
+            return encode(document)
+
+        def run_archive():
+            try:
+                archive.archive_batch(timezone.now(), 10)
+            finally:
+                connection.close()
+
+        responses = []
+        with mock.patch.object(archive, "encode", slow_encode):
+            archiver = threading.Thread(target=run_archive)
+            archiver.start()
+            self.assertTrue(snapshotted.wait(5))
+            commenter = threading.Thread(target=lambda: responses.append(self.comment()))
+            commenter.start()
+            # The comment blocks on the post lock instead of slipping in before the delete
+            commenter.join(0.5)
+            self.assertTrue(commenter.is_alive())
+            proceed.set()
+            archiver.join(5)
+            commenter.join(5)
+
+        self.assertEqual(responses[0].status_code, 400)
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(ArchivedPost.objects.filter(pk=self.post.pk).exists())
+
+    def test_comment_before_archive_is_archived(self):
+        commenting, proceed = threading.Event(), threading.Event()
+        save = Comment.save
+
+        def slow_save(comment, *args, **kwargs):
+            save(comment, *args, **kwargs)
+            commenting.set()
+            proceed.wait(5)
+
+        responses = []
+        with mock.patch.object(Comment, "save", slow_save):
+            commenter = threading.Thread(target=lambda: responses.append(self.comment()))
+            commenter.start()
+            self.assertTrue(commenting.wait(5))
+            archiver = threading.Thread(target=lambda: (archive.archive_batch(timezone.now(), 10), connection.close()))
+            archiver.start()
+            # Archiving waits for the comment's transaction to commit
+            archiver.join(0.5)
+            self.assertTrue(archiver.is_alive())
+            proceed.set()
+            commenter.join(5)
+            archiver.join(5)
+
+        self.assertEqual(responses[0].status_code, 201)
+        document = archive.decode(ArchivedPost.objects.get(pk=self.post.pk).data)
+        self.assertEqual([row["text"] for row in document["comments"]], ["Late reply"])
+        self.assertFalse(Comment.objects.exists())
+
+
+class FeedSubscriberTests(SimpleTestCase):
+    def test_full_queue_drops_posts_and_counts_them(self):
+        async def run():
+            subscriber = FeedSubscriber("reader", asyncio.get_running_loop(), maxsize=2)
+            for number in range(5):
+                subscriber.push({"id": str(number)})
+            self.assertEqual(subscriber.queue.qsize(), 2)
+            self.assertEqual(subscriber.dropped, 3)
+
+            events = subscriber.events(heartbeat=1)
+            frames = [await events.__anext__() for _ in range(4)]
+            await events.aclose()
+            return frames
+
+        frames = asyncio.run(run())
+        self.assertEqual(frames[0], "retry: 5000\n\n")
+        self.assertIn('"id": "0"', frames[1])
+        self.assertIn('"id": "1"', frames[2])
+        # Both delivered posts and the three dropped ones are counted
+        self.assertEqual(frames[3], 'event: new_posts\ndata: {"count": 5}\n\n')
+
+
+class FeedHubTests(TestCase):
+    def setUp(self):
+        self.hub = FeedHub(broker=LocalBroker())
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def subscribe(self, user):
+        async def subscribe():
+            return self.hub.subscribe(user.pk)
+        return self.loop.run_until_complete(subscribe())
+
+    def test_subscribe_and_unsubscribe(self):
+        user = make_user("reader")
+        first, second = self.subscribe(user), self.subscribe(user)
+        self.assertEqual(self.hub._subscribers[str(user.pk)], {first, second})
+
+        self.hub.unsubscribe(first)
+        self.assertEqual(self.hub._subscribers[str(user.pk)], {second})
+        self.hub.unsubscribe(second)
+        self.assertNotIn(str(user.pk), self.hub._subscribers)
+        # A second unsubscribe (the stream closing twice) is harmless
+        self.hub.unsubscribe(second)
+
+    def test_dispatch_reaches_connected_followers_and_author(self):
+        author, follower, stranger = make_user("author"), make_user("follower"), make_user("stranger")
+        Follower.objects.create(user=author, follower=follower)
+        streams = {user.username: self.subscribe(user) for user in (author, follower, stranger)}
+
+        message = {"id": "post", "user_id": str(author.pk), "created_at": "2024-01-15T10:30:00+00:00"}
+        self.hub._dispatch([message])
+        # Deliveries are scheduled on the streams' loop
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+        self.assertEqual(streams["author"].queue.qsize(), 1)
+        self.assertEqual(streams["follower"].queue.qsize(), 1)
+        self.assertEqual(streams["stranger"].queue.qsize(), 0)
+
+    def test_dispatch_skips_closed_streams(self):
+        author, follower = make_user("author"), make_user("follower")
+        Follower.objects.create(user=author, follower=follower)
+        stream = self.subscribe(follower)
+        closed_loop = asyncio.new_event_loop()
+        closed_loop.close()
+        gone = FeedSubscriber(str(author.pk), closed_loop, maxsize=1)
+        self.hub._subscribers[gone.user_id].add(gone)
+
+        self.hub._dispatch([{"id": "post", "user_id": str(author.pk), "created_at": ""}])
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(stream.queue.qsize(), 1)
+
+    def test_full_dispatch_queue_drops_with_a_warning(self):
+        with mock.patch.object(self.hub._pending, "put_nowait", side_effect=queue.Full), \
+                self.assertLogs("social.realtime", "WARNING") as logs:
+            self.hub._enqueue({"id": "post", "user_id": "author"})
+        self.assertIn("dropping post post", logs.output[0])
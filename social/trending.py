@@ -0,0 +1,125 @@
+"""
+Incremental trending scores.
+
+A post's trending score is the sum of its engagement events, each decayed by
+half every TRENDING_HALF_LIFE_HOURS:
+
+    score(now) = sum(weight_i * 2 ** -((now - t_i) / half_life))
+
+Instead of decaying every score over time, PostScore.score stores
+log2(sum(weight_i * 2 ** ((t_i - EPOCH) / half_life))). Ranking by that value
+is the same as ranking by score(now) at any moment, and a new event is folded
+in with a single upsert (a log-space addition), so nothing is ever rescanned.
+
+The top TRENDING_TOP_K post ids are read off the score index periodically
+(``manage.py refresh_trending``, or lazily when the cached list is stale) and
+stored as a packed id list in the cache, so serving a page costs O(page).
+A stale list is refreshed by one request at a time (a ``cache.add`` lock);
+the others go on serving it meanwhile. Decayed scores are only pruned by the
+command, never on a read.
+"""
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .ids import pack_ids, unpack_ids
+from .models import PostScore
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+CACHE_KEY = "trending:top:v2"  # (packed ids, fresh until)
+LOCK_KEY = "trending:refreshing"
+STALE_FACTOR = 10  # a stale list is kept this many refresh intervals, to serve while it is refreshed
+
+# Beyond this gap the smaller term contributes less than 2**-60 and is dropped
+# (also keeps PostgreSQL's power() from underflowing).
+MAX_GAP = 60.0
+
+UPSERT_SQL = f"""
+    INSERT INTO {PostScore._meta.db_table} AS t (post_id, score, updated_at)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (post_id) DO UPDATE SET
+        score = GREATEST(t.score, EXCLUDED.score) + CASE
+            WHEN ABS(t.score - EXCLUDED.score) > {MAX_GAP} THEN 0
+            ELSE LN(1 + POWER(2.0, -ABS(t.score - EXCLUDED.score))) / LN(2)
+        END,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def half_life():
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def clock(at=None):
+    """Half-lives elapsed since EPOCH; the log2 score of a weight-1 event at `at`."""
+    return ((at or timezone.now()) - EPOCH).total_seconds() / half_life()
+
+
+def log2_add(a, b):
+    """log2(2**a + 2**b) without overflow."""
+    high, low = max(a, b), min(a, b)
+    if high - low > MAX_GAP:
+        return high
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def record(post_id, kind, at=None, count=1):
+    """Fold `count` engagement events (a key of TRENDING_WEIGHTS) at the same time into the post's score."""
+    weight = settings.TRENDING_WEIGHTS.get(kind)
+    if not weight or count < 1:
+        return
+    at = at or timezone.now()
+    event = math.log2(weight * count) + clock(at)
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_SQL, [post_id, event, at])
+        return
+
+    with transaction.atomic():
+        row, created = PostScore.objects.select_for_update().get_or_create(
+            post_id=post_id, defaults={"score": event}
+        )
+        if not created:
+            row.score = log2_add(row.score, event)
+            row.save(update_fields=["score", "updated_at"])
+
+
+def prune_scores():
+    """Delete scores that have decayed below TRENDING_MIN_SCORE; returns how many."""
+    floor = clock() + math.log2(settings.TRENDING_MIN_SCORE)
+    deleted, _ = PostScore.objects.filter(score__lt=floor).delete()
+    return deleted
+
+
+def _top():
+    return list(PostScore.objects.order_by("-score").values_list("post_id", flat=True)[:settings.TRENDING_TOP_K])
+
+
+def refresh_top():
+    """Recompute and cache the top-K post ids."""
+    ids = _top()
+    interval = settings.TRENDING_REFRESH_INTERVAL
+    cache.set(CACHE_KEY, (pack_ids(ids), time.time() + interval), interval * STALE_FACTOR)
+    return ids
+
+
+def top_ids():
+    """Current trending post ids, best first."""
+    entry = cache.get(CACHE_KEY)
+    if entry is not None:
+        packed, fresh_until = entry
+        if time.time() < fresh_until:
+            return unpack_ids(packed)
+    # Whoever gets the lock refreshes; the others serve the stale list (or, with none cached, read it without caching)
+    if not cache.add(LOCK_KEY, True, settings.TRENDING_REFRESH_INTERVAL):
+        return unpack_ids(entry[0]) if entry is not None else _top()
+    try:
+        return refresh_top()
+    finally:
+        cache.delete(LOCK_KEY)
@@ -1,9 +1,10 @@
 from django.urls import path
 from .views import (
     PostListCreateView, PostDeleteView, CommentCreateView, FollowerView, FollowStatusView, PostReactionView,
-    UserPostsView, FeedView, PostDetailView, PostCommentsView, CommentRepliesView,
-    FollowersListView, FollowingListView, CurrentUserFollowingListView, PostLikesListView, UserProfileView,
-    SearchPostsView, SearchUsersView
+    UserPostsView, FeedView, FeedStreamView, FeedStreamTokenView, TrendingPostsView, ExploreView, PostDetailView, PostCommentsView, CommentRepliesView,
+    FollowersListView, FollowingListView, MutualConnectionsView, CurrentUserFollowingListView, PostLikesListView, UserProfileView,
+    SearchPostsView, SearchUsersView, NotificationListView, NotificationUnreadCountView,
+    NotificationMarkReadView, ExportView, EngagementAnalyticsView
 )
 
 """
@@ -89,6 +90,30 @@ urlpatterns = [
     # Response: Paginated list of posts from followed users and self
     path("feed/", FeedView.as_view()),
     
+    # FEED STREAM
+    # GET /feed/stream/ - Server-Sent Events stream of new posts for the feed (replaces polling ?type=new)
+    # Authentication: Required (Bearer header or ?token=<stream token>)
+    # Events: "post" {"id", "user_id", "created_at"}, "new_posts" {"count"}
+    # Response: text/event-stream (ASGI deployments only)
+    path("feed/stream/", FeedStreamView.as_view()),
+    
+    # POST /feed/stream/token/ - Short-lived token for ?token= on the feed stream
+    # Authentication: Required
+    # Response: {"token", "expires_in"}
+    path("feed/stream/token/", FeedStreamTokenView.as_view()),
+    
+    # TRENDING
+    # GET /trending/ - Get posts ranked by time-decayed engagement (likes, comments)
+    # Authentication: Not required
+    # Response: Paginated list of posts (top 500, refreshed every minute)
+    path("trending/", TrendingPostsView.as_view()),
+    
+    # EXPLORE
+    # GET /explore/ - Get a blend of trending, recent and same-institute posts
+    # Authentication: Optional (anonymous users get the global blend)
+    # Response: Paginated list of posts (refreshed every few minutes per institute)
+    path("explore/", ExploreView.as_view()),
+    
     # POST DETAILS
     # GET /posts/{id}/ - Get details of a specific post
     # Authentication: Not required
@@ -100,14 +125,14 @@ urlpatterns = [
     # GET /posts/{post_id}/comments/ - Get all top-level comments for a post
     # Authentication: Not required
     # Parameters: post_id (UUID) in URL path
-    # Response: Paginated list of comments (excludes replies)
+    # Response: Cursor-paginated list of comments with replies_count (excludes replies)
     path("posts/<uuid:post_id>/comments/", PostCommentsView.as_view()),
     
     # COMMENT REPLIES
     # GET /comments/{comment_id}/replies/ - Get all replies to a specific comment
     # Authentication: Not required
     # Parameters: comment_id (UUID) in URL path
-    # Response: Paginated list of comment replies
+    # Response: Cursor-paginated list of comment replies
     path("comments/<uuid:comment_id>/replies/", CommentRepliesView.as_view()),
 
     # ==================== FOLLOWERS & FOLLOWING ====================
@@ -126,6 +151,13 @@ urlpatterns = [
     # Response: Paginated list of user profiles that the specified user follows
     path("users/<uuid:user_id>/following/", FollowingListView.as_view()),
     
+    # MUTUAL CONNECTIONS
+    # GET /users/{user_id}/mutual/ - Get connections shared with a specific user
+    # Authentication: Required (Bearer token)
+    # Parameters: type ('followers' or 'following'), limit (user cards, max 10)
+    # Response: Mutual count, first few user cards and a display summary
+    path("users/<uuid:user_id>/mutual/", MutualConnectionsView.as_view()),
+    
     # CURRENT USER FOLLOWING LIST
     # GET /following/ - Get list of users that the current user is following
     # Authentication: Required
@@ -146,6 +178,46 @@ urlpatterns = [
     # Response: User profile object with detailed information
     path("users/<uuid:id>/profile/", UserProfileView.as_view()),
 
+    # ==================== NOTIFICATIONS ====================
+    
+    # NOTIFICATION INBOX
+    # GET /notifications/ - List the current user's notifications (newest activity first)
+    # Authentication: Required
+    # Query Parameters: ?cursor=<opaque cursor from "next">
+    # Response: Cursor-paginated list; bursts are grouped ("alice and 40 others liked your post")
+    path("notifications/", NotificationListView.as_view()),
+    
+    # UNREAD COUNT
+    # GET /notifications/unread-count/ - Number of unread notifications
+    # Authentication: Required
+    # Response: {"unread": 3}
+    path("notifications/unread-count/", NotificationUnreadCountView.as_view()),
+    
+    # MARK AS READ
+    # POST /notifications/read/ - Mark notifications as read
+    # Authentication: Required
+    # Request Body: {"ids": ["uuid", ...]} (optional, omit to mark all)
+    # Response: {"marked": 2, "unread": 0}
+    path("notifications/read/", NotificationMarkReadView.as_view()),
+
+    # ==================== DATA EXPORT ====================
+
+    # EXPORT MY DATA
+    # GET /export/ - Download everything stored about the current user
+    # Authentication: Required
+    # Query Parameters: ?compress=gzip for a .ndjson.gz file
+    # Response: Streamed NDJSON, one {"type": ..., "data": {...}} object per line
+    path("export/", ExportView.as_view()),
+
+    # ==================== ANALYTICS ====================
+
+    # ENGAGEMENT REPORT
+    # GET /analytics/engagement/ - Posts, comments, reactions, follows and active posters per hour/day
+    # Authentication: Required (staff only)
+    # Query Parameters: ?granularity=day|hour&since=&until=&institute_name=&dept_course=&group_by=
+    # Response: {"granularity", "since", "until", "processed_until", "series": [...]}
+    path("analytics/engagement/", EngagementAnalyticsView.as_view()),
+
     # ==================== SEARCH FUNCTIONALITY ====================
     
     # SEARCH POSTS
@@ -3,25 +3,78 @@ from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q, Count
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from django.db import transaction
+from django.db.models import Q, Count, Window
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from unilink.apidoc import swagger_schema
 from rest_framework.permissions import AllowAny
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.utils import timezone
 import random
 
 
-from .models import Post, Comment, Follower, PostReaction
+from .models import Post, Comment, Follower, PostReaction, Notification
 from .serializers import (
-    PostSerializer, CommentSerializer, FollowerSerializer, 
-    PostReactionSerializer, UserProfileSerializer
+    PostSerializer, CommentSerializer, CommentThreadSerializer, FollowerSerializer,
+    PostReactionSerializer, UserProfileSerializer, NotificationSerializer
 )
 from users.models import User
-from .pagination import StandardResultsSetPagination, TimestampBasedPagination
+from users.serializers import UserListSerializer
+from users.media import (
+    read_upload, find_duplicate, upload_media, save_asset, get_upload_executor, discard_media, public_variants, InvalidImage,
+)
+from .pagination import (
+    StandardResultsSetPagination, TimestampBasedPagination, NotificationCursorPagination, CommentCursorPagination,
+)
+from .comments import replies_count
+from .notifications import notify, mark_read, unread_count
+from . import analytics, archive, explore, reactions, trending
+from .export import export_filename, export_stream
+from .partitions import prune_by_id, share_rows
+from unilink.db_router import ReplicaReadMixin
+from unilink.hotcache import HotCacheMixin, invalidate
+from unilink.streaming import iterate_async
+from unilink.serializers import SparseQuerysetMixin, narrow_queryset
+from .realtime import StreamToken, get_hub, publish_post, stream_token_for
+from .graph import get_graph
 
 # ------------------- Posts -------------------
-class PostListCreateView(generics.ListCreateAPIView):
+class PostIdListMixin:
+    """
+    List view over a precomputed, ordered list of post ids (trending, explore).
+    Only the ids of the requested page are hydrated, with a single id__in
+    query (narrowed to ?fields=/?expand=).
+
+    Set ``post_ids`` to a callable returning the ordered ids, or override
+    ``get_post_ids()`` when they depend on the request.
+    """
+    post_ids = None
+
+    def get_post_ids(self):
+        assert self.post_ids is not None, (
+            f"'{self.__class__.__name__}' should either include a `post_ids` attribute, "
+            "or override the `get_post_ids()` method."
+        )
+        return self.post_ids()
+
+    def list(self, request, *args, **kwargs):
+        page_ids = self.paginate_queryset(self.get_post_ids())
+        posts = Post.objects.select_related("user")
+        posts = narrow_queryset(posts, self.get_serializer_class(), request).in_bulk(page_ids)
+        page = [posts[post_id] for post_id in page_ids if post_id in posts]
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PostListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     List all posts or create a new post.
     
@@ -32,9 +85,59 @@ class PostListCreateView(generics.ListCreateAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    # Files accepted in multipart requests, and the post field each one fills
+    media_fields = {"image": "image_url", "video": "video_url"}
+
+    def create(self, request, *args, **kwargs):
+        files = {field: request.FILES[field] for field in self.media_fields if field in request.FILES}
+        if not files:
+            return super().create(request, *args, **kwargs)
+
+        # Start sending the media to storage, then validate the post while it uploads
+        assets, uploads = {}, {}
+        for field, uploaded_file in files.items():
+            data, sha256 = read_upload(uploaded_file)
+            assets[field] = find_duplicate(sha256, len(data))
+            if assets[field] is None:
+                uploads[field] = get_upload_executor().submit(
+                    upload_media, data, uploaded_file.name, uploaded_file.content_type, sha256
+                )
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            fields = {key: value for key, value in request.data.items() if key not in self.media_fields}
+            serializer = self.get_serializer(data=fields)
+            serializer.is_valid(raise_exception=True)
+            for field, upload in uploads.items():
+                try:
+                    assets[field] = upload.result()
+                except InvalidImage as e:
+                    raise ValidationError({field: [f"Invalid image: {e}"]})
+
+            with transaction.atomic():
+                for field in uploads:
+                    assets[field], _ = save_asset(assets[field])
+                media = {self.media_fields[field]: asset.url for field, asset in assets.items()}
+                if "image" in assets:
+                    media["image_variants"] = public_variants(assets["image"].variants)
+                self.perform_create(serializer, **media)
+        except Exception:
+            # The post was not created: remove the files stored for it
+            for upload in uploads.values():
+                if upload.cancel():
+                    continue
+                try:
+                    discard_media(upload.result())
+                except Exception:
+                    pass
+            raise
+
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_create(self, serializer, **media):
+        post = serializer.save(user=self.request.user, **media)
+        transaction.on_commit(lambda: publish_post(post))
 
 
 class PostDeleteView(generics.DestroyAPIView):
@@ -51,11 +154,16 @@ class PostDeleteView(generics.DestroyAPIView):
         # Only allow users to delete their own posts
         return Post.objects.filter(user=self.request.user)
 
-class UserPostsView(generics.ListAPIView):
+    def perform_destroy(self, instance):
+        post_id = instance.pk  # delete() clears it
+        super().perform_destroy(instance)
+        invalidate("post", post_id)
+
+class UserPostsView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Get all posts by a specific user.
     
-    GET: Retrieve a paginated list of posts created by the specified user
+    GET: Retrieve a paginated list of posts created by the specified user (archived posts follow the live ones)
     """
     serializer_class = PostSerializer
     pagination_class = StandardResultsSetPagination
@@ -66,7 +174,14 @@ class UserPostsView(generics.ListAPIView):
     def get_queryset(self):
         return Post.objects.filter(user_id=self.kwargs["user_id"]).order_by('-created_at')
 
-class FeedView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        # The archive is only read by pages that go past the live posts
+        posts = archive.with_archived(self.filter_queryset(self.get_queryset()), self.kwargs["user_id"])
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class FeedView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Get personalized feed for authenticated user with timestamp-based pagination and gender distribution.
     
@@ -81,7 +196,11 @@ class FeedView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        following_ids = user.following.values_list("user_id", flat=True)
+        graph = get_graph()
+        if graph:
+            following_ids = graph.following(user.id)
+        else:
+            following_ids = user.following.values_list("user_id", flat=True)
         
         # Base queryset: posts from followed users + own posts
         base_queryset = Post.objects.filter(Q(user__in=following_ids) | Q(user=user))
@@ -162,16 +281,141 @@ class FeedView(generics.ListAPIView):
             # Not enough female posts, return all available posts
             return all_posts
 
-class PostDetailView(generics.RetrieveAPIView):
+class FeedStreamView(View):
+    """
+    Stream new feed posts as Server-Sent Events instead of polling FeedView.
+
+    GET: Open an event stream (requires the ASGI server)
+    Events:
+    - post: {"id", "user_id", "created_at"} for each new post by a followed user or yourself
+    - new_posts: {"count"} once a burst of posts has been delivered
+    Authentication: "Authorization: Bearer <token>" header, or ?token=<stream token>
+    from FeedStreamTokenView for EventSource clients that cannot set headers.
+    Access tokens are not accepted in the URL, where they would end up in logs.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Streaming requires the ASGI server"}, status=501)
+
+        try:
+            user = await sync_to_async(self._authenticate)(request)
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            user = None
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        response = StreamingHttpResponse(self._stream(user.id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _authenticate(self, request):
+        auth = JWTAuthentication()
+        raw_token = request.GET.get("token")
+        if raw_token:
+            return auth.get_user(StreamToken(raw_token))
+        result = auth.authenticate(request)
+        return result[0] if result else None
+
+    async def _stream(self, user_id):
+        hub = get_hub()
+        subscriber = hub.subscribe(user_id)
+        try:
+            async for frame in subscriber.events(settings.FEED_STREAM_HEARTBEAT):
+                yield frame
+        finally:
+            hub.unsubscribe(subscriber)
+
+class FeedStreamTokenView(APIView):
+    """
+    Issue a token for opening the feed stream.
+
+    POST: Exchange the access token for a stream token valid for
+    FEED_STREAM_TOKEN_LIFETIME seconds, to pass as ?token= to FeedStreamView
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Get a short-lived token for ?token= on the feed stream (EventSource cannot send headers)",
+        responses={
+            200: openapi.Response('Stream token', examples={
+                'application/json': {
+                    'token': 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...',
+                    'expires_in': 60
+                }
+            }),
+            401: 'Authentication required'
+        }
+    ))
+    def post(self, request):
+        response = Response({
+            "token": str(stream_token_for(request.user)),
+            "expires_in": settings.FEED_STREAM_TOKEN_LIFETIME,
+        })
+        response["Cache-Control"] = "no-store"
+        return response
+
+class TrendingPostsView(PostIdListMixin, generics.ListAPIView):
+    """
+    Get trending posts.
+    
+    GET: Retrieve a paginated list of posts ranked by time-decayed likes and comments
+    """
+    serializer_class = PostSerializer
+    pagination_class = StandardResultsSetPagination
+    permission_classes = [AllowAny]
+    post_ids = staticmethod(trending.top_ids)
+
+class ExploreView(PostIdListMixin, generics.ListAPIView):
+    """
+    Get the explore feed.
+    
+    GET: Retrieve a paginated blend of trending, recent and same-institute posts.
+    Anonymous users get the global blend.
+    """
+    serializer_class = PostSerializer
+    pagination_class = StandardResultsSetPagination
+    permission_classes = [AllowAny]
+
+    def get_post_ids(self):
+        user = self.request.user
+        segment = user.institute_name if user.is_authenticated else explore.GLOBAL_SEGMENT
+        return explore.explore_ids(segment)
+
+class PostDetailView(HotCacheMixin, SparseQuerysetMixin, ReplicaReadMixin, generics.RetrieveAPIView):
     """
     Get details of a specific post.
     
-    GET: Retrieve detailed information about a single post
+    GET: Retrieve detailed information about a single post (cached for HOT_CACHE_TTL seconds)
     """
     serializer_class = PostSerializer
     queryset = Post.objects.all()
     permission_classes = [AllowAny]
     lookup_field = "id"
+    hot_cache_namespace = "post"
+
+    def personalize(self, request, data):
+        # Your own reactions count before they are written
+        if request.user.is_authenticated and "reactions_count" in data and not data.get("archived"):
+            delta = reactions.pending_delta(request.user.id, self.kwargs["id"])
+            if delta:
+                return {**data, "reactions_count": data["reactions_count"] + delta}
+        return data
+
+    def get_queryset(self):
+        # Only the partitions from the post's month on are searched
+        return prune_by_id(super().get_queryset(), self.kwargs["id"])
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Old posts are moved to the archive (see social.archive)
+            post = archive.load(self.kwargs["id"])
+            if post is None:
+                raise
+            return post
 
 # ------------------- Comments -------------------
 class CommentCreateView(generics.CreateAPIView):
@@ -186,35 +430,53 @@ class CommentCreateView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
-class PostCommentsView(generics.ListAPIView):
+        with transaction.atomic():
+            # Hold the post so it can't be archived between validation and the insert
+            if not share_rows(Post, [serializer.validated_data["post"].pk]):
+                raise ValidationError({"post": ["This post can no longer be commented on."]})
+            comment = serializer.save(user=self.request.user)
+        post = comment.post
+        trending.record(post.id, "comment")
+        if comment.parent_id:
+            notify(comment.parent.user_id, "reply", comment.user_id, post_id=post.id, comment_id=comment.id)
+        if not comment.parent_id or comment.parent.user_id != post.user_id:
+            notify(post.user_id, "comment", comment.user_id, post_id=post.id, comment_id=comment.id)
+
+class PostCommentsView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Get all top-level comments for a specific post.
     
-    GET: Retrieve a paginated list of comments for a post (excludes replies)
+    GET: Retrieve a cursor-paginated list of comments for a post (excludes replies, which are counted)
     """
-    serializer_class = CommentSerializer
-    pagination_class = StandardResultsSetPagination
+    serializer_class = CommentThreadSerializer
+    pagination_class = CommentCursorPagination
 
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        return Comment.objects.filter(post_id=self.kwargs["post_id"], parent__isnull=True).order_by("created_at")
+        return (
+            prune_by_id(Comment.objects.filter(post_id=self.kwargs["post_id"], parent__isnull=True), self.kwargs["post_id"])
+            .select_related("user")
+            .annotate(replies_count=replies_count())
+        )
 
-class CommentRepliesView(generics.ListAPIView):
+class CommentRepliesView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Get all replies to a specific comment.
     
-    GET: Retrieve a paginated list of replies to a comment
+    GET: Retrieve a cursor-paginated list of replies to a comment
     """
-    serializer_class = CommentSerializer
-    pagination_class = StandardResultsSetPagination
+    serializer_class = CommentThreadSerializer
+    pagination_class = CommentCursorPagination
 
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        return Comment.objects.filter(parent_id=self.kwargs["comment_id"]).order_by("created_at")
+        return (
+            prune_by_id(Comment.objects.filter(parent_id=self.kwargs["comment_id"]), self.kwargs["comment_id"])
+            .select_related("user")
+            .annotate(replies_count=replies_count())
+        )
 
 # ------------------- Followers -------------------
 class FollowerView(APIView):
@@ -226,7 +488,7 @@ class FollowerView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Follow a user",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -240,19 +502,21 @@ class FollowerView(APIView):
             400: openapi.Response('Bad Request', examples={'application/json': {'error': 'Cannot follow yourself'}}),
             404: openapi.Response('Not Found', examples={'application/json': {'error': 'User not found'}})
         }
-    )
+    ))
     def post(self, request):
         user_id = request.data.get("user_id")
         try:
             user_to_follow = User.objects.get(id=user_id)
             if user_to_follow == request.user:
                 return Response({"error": "Cannot follow yourself"}, status=400)
-            Follower.objects.get_or_create(user=user_to_follow, follower=request.user)
+            _, created = Follower.objects.get_or_create(user=user_to_follow, follower=request.user)
+            if created:
+                notify(user_to_follow.id, "follow", request.user.id)
             return Response({"status": f"Now following {user_to_follow.username}"})
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Unfollow a user",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -265,7 +529,7 @@ class FollowerView(APIView):
             200: openapi.Response('Success', examples={'application/json': {'status': 'Unfollowed username'}}),
             404: openapi.Response('Not Found', examples={'application/json': {'error': 'User not found'}})
         }
-    )
+    ))
     def delete(self, request):
         user_id = request.data.get("user_id")
         try:
@@ -284,7 +548,7 @@ class FollowStatusView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Check if current user is following a specific user",
         manual_parameters=[
             openapi.Parameter(
@@ -314,7 +578,7 @@ class FollowStatusView(APIView):
                 'application/json': {'detail': 'Authentication credentials were not provided.'}
             })
         }
-    )
+    ))
     def get(self, request):
         user_id = request.GET.get('user_id')
         
@@ -325,10 +589,14 @@ class FollowStatusView(APIView):
             target_user = User.objects.get(id=user_id)
             
             # Check if current user is following the target user
-            is_following = Follower.objects.filter(
-                user=target_user,
-                follower=request.user
-            ).exists()
+            graph = get_graph()
+            if graph:
+                is_following = graph.is_following(request.user.id, target_user.id)
+            else:
+                is_following = Follower.objects.filter(
+                    user=target_user,
+                    follower=request.user
+                ).exists()
             
             return Response({
                 "is_following": is_following,
@@ -341,7 +609,7 @@ class FollowStatusView(APIView):
             return Response({"error": "User not found"}, status=404)
 
 
-class FollowersListView(generics.ListAPIView):
+class FollowersListView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Get list of users following a specific user.
     
@@ -355,7 +623,7 @@ class FollowersListView(generics.ListAPIView):
     def get_queryset(self):
         return User.objects.filter(following__user_id=self.kwargs["user_id"])
 
-class FollowingListView(generics.ListAPIView):
+class FollowingListView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Get list of users that a specific user follows.
     
@@ -370,7 +638,7 @@ class FollowingListView(generics.ListAPIView):
         return User.objects.filter(followers__follower_id=self.kwargs["user_id"])
 
 
-class CurrentUserFollowingListView(generics.ListAPIView):
+class CurrentUserFollowingListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     Get list of users that the current authenticated user is following.
     
@@ -383,6 +651,96 @@ class CurrentUserFollowingListView(generics.ListAPIView):
     def get_queryset(self):
         return User.objects.filter(followers__follower_id=self.request.user.id)
 
+class MutualConnectionsView(APIView):
+    """
+    Get the connections the current user shares with another user.
+    
+    GET: Count and first few cards of mutual connections
+    Query Parameters:
+    - type: 'followers' (people you follow who follow them, the default) or
+      'following' (people you both follow)
+    - limit: number of user cards to return (default 3, max 10)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 3
+    max_limit = 10
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Mutual followers or mutual following between the current user and another user",
+        manual_parameters=[
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['followers', 'following']),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response('Mutual Connections', examples={
+                'application/json': {
+                    'type': 'followers',
+                    'count': 14,
+                    'users': [
+                        {'id': '123e4567-e89b-12d3-a456-426614174000', 'username': 'alice', 'full_name': 'Alice'},
+                        {'id': '456e7890-e89b-12d3-a456-426614174000', 'username': 'bob', 'full_name': 'Bob'}
+                    ],
+                    'summary': 'Followed by alice, bob and 12 others you know'
+                }
+            }),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': "type must be 'followers' or 'following'"}
+            }),
+            404: openapi.Response('Not Found', examples={
+                'application/json': {'error': 'User not found'}
+            })
+        }
+    ))
+    def get(self, request, user_id):
+        connection_type = request.query_params.get('type', 'followers')
+        if connection_type not in ('followers', 'following'):
+            return Response({"error": "type must be 'followers' or 'following'"}, status=400)
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+
+        if not User.objects.filter(id=user_id).exists():
+            return Response({"error": "User not found"}, status=404)
+
+        # Intersection in a single query: the target's connections that the
+        # current user follows. The window count gives the full size of the
+        # intersection alongside the first `limit` rows.
+        my_following = Follower.objects.filter(follower=request.user).values("user_id")
+        if connection_type == 'followers':
+            mutual = User.objects.filter(following__user_id=user_id, id__in=my_following)
+        else:
+            mutual = User.objects.filter(followers__follower_id=user_id, id__in=my_following)
+        users = list(
+            mutual.annotate(total=Window(Count("id")))
+            .order_by("username")
+            .only("id", "username", "full_name")[:limit]
+        )
+        count = users[0].total if users else 0
+
+        return Response({
+            "type": connection_type,
+            "count": count,
+            "users": UserListSerializer(users, many=True).data,
+            "summary": self.summarize(connection_type, users, count),
+        })
+
+    @staticmethod
+    def summarize(connection_type, users, count):
+        # e.g. "Followed by alice, bob and 12 others you know"
+        if not users:
+            return ""
+        names = [user.username for user in users]
+        others = count - len(names)
+        if others == 1:
+            names.append("1 other")
+        elif others > 1:
+            names.append(f"{others} others")
+        listed = names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+        prefix = "Followed by" if connection_type == 'followers' else "Follows"
+        suffix = " you know" if connection_type == 'followers' else " you also follow"
+        return f"{prefix} {listed}{suffix}"
+
 # ------------------- Post Reactions -------------------
 class PostReactionView(APIView):
     """
@@ -393,7 +751,7 @@ class PostReactionView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Add a reaction to a post",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -407,20 +765,19 @@ class PostReactionView(APIView):
             200: openapi.Response('Success', examples={'application/json': {'status': 'like added'}}),
             404: openapi.Response('Not Found', examples={'application/json': {'error': 'Post not found'}})
         }
-    )
+    ))
     def post(self, request):
         post_id = request.data.get("post_id")
         reaction_type = request.data.get("reaction_type")
-        try:
-            post = Post.objects.get(id=post_id)
-            reaction, created = PostReaction.objects.get_or_create(
-                user=request.user, post=post, reaction_type=reaction_type
-            )
-            return Response({"status": f"{reaction_type} added" if created else f"{reaction_type} already exists"})
-        except Post.DoesNotExist:
+        if reaction_type not in reactions.REACTION_TYPES:
+            return Response({"error": "Invalid reaction type"}, status=400)
+        if not prune_by_id(Post.objects.filter(id=post_id), post_id).exists():
             return Response({"error": "Post not found"}, status=404)
+        # Written in batches (see social.reactions); trending and notifications follow the write
+        existed = reactions.react(request.user.id, post_id, reaction_type, on=True)
+        return Response({"status": f"{reaction_type} already exists" if existed else f"{reaction_type} added"})
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Remove a reaction from a post",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -433,14 +790,15 @@ class PostReactionView(APIView):
         responses={
             200: openapi.Response('Success', examples={'application/json': {'status': 'like removed'}})
         }
-    )
+    ))
     def delete(self, request):
         post_id = request.data.get("post_id")
         reaction_type = request.data.get("reaction_type")
-        PostReaction.objects.filter(user=request.user, post_id=post_id, reaction_type=reaction_type).delete()
+        if reaction_type in reactions.REACTION_TYPES:
+            reactions.react(request.user.id, post_id, reaction_type, on=False)
         return Response({"status": f"{reaction_type} removed"})
 
-class PostLikesListView(generics.ListAPIView):
+class PostLikesListView(ReplicaReadMixin, generics.ListAPIView):
     """
     Get list of users who liked a specific post.
     
@@ -454,22 +812,171 @@ class PostLikesListView(generics.ListAPIView):
     def get_queryset(self):
         post_id = self.kwargs["post_id"]
         user_ids = PostReaction.objects.filter(post_id=post_id, reaction_type='like').values_list("user_id", flat=True)
-        return User.objects.filter(id__in=user_ids)
+        likers = Q(id__in=user_ids)
+        # Your own like or unlike shows before it is written
+        if self.request.user.is_authenticated:
+            pending = reactions.pending_state(self.request.user.id, post_id, "like")
+            if pending is True:
+                likers |= Q(id=self.request.user.id)
+            elif pending is False:
+                likers &= ~Q(id=self.request.user.id)
+        return User.objects.filter(likers)
+
+# ------------------- Notifications -------------------
+class NotificationListView(generics.ListAPIView):
+    """
+    Get the current user's notifications, newest activity first.
+    
+    GET: Retrieve notifications with keyset (cursor) pagination
+    """
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(recipient=self.request.user).select_related("actor")
+
+
+class NotificationUnreadCountView(APIView):
+    """
+    Get the number of unread notifications.
+    
+    GET: Read the unread counter (no scan of the inbox)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Get the number of unread notifications",
+        responses={
+            200: openapi.Response('Unread Count', examples={'application/json': {'unread': 3}})
+        }
+    ))
+    def get(self, request):
+        return Response({"unread": unread_count(request.user)})
+
+
+class NotificationMarkReadView(APIView):
+    """
+    Mark notifications as read.
+    
+    POST: Mark the given notification ids as read, or all of them when no ids are sent
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Mark notifications as read (all of them if 'ids' is omitted)",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                    description='Notification ids to mark as read'
+                )
+            }
+        ),
+        responses={
+            200: openapi.Response('Success', examples={'application/json': {'marked': 2, 'unread': 0}}),
+            400: openapi.Response('Bad Request', examples={'application/json': {'error': 'ids must be a list'}})
+        }
+    ))
+    def post(self, request):
+        ids = request.data.get("ids")
+        if ids is not None and not isinstance(ids, list):
+            return Response({"error": "ids must be a list"}, status=400)
+        marked = mark_read(request.user, ids)
+        return Response({"marked": marked, "unread": unread_count(request.user)})
 
 # ------------------- Profiles -------------------
-class UserProfileView(generics.RetrieveAPIView):
+class UserProfileView(HotCacheMixin, SparseQuerysetMixin, ReplicaReadMixin, generics.RetrieveAPIView):
     """
     Get detailed profile information for a user.
     
-    GET: Retrieve detailed profile information for the specified user
+    GET: Retrieve detailed profile information for the specified user (cached for HOT_CACHE_TTL seconds)
     """
     serializer_class = UserProfileSerializer
     queryset = User.objects.all()
     permission_classes = [AllowAny]
     lookup_field = "id"
+    hot_cache_namespace = "user"
+
+# ------------------- Data Export -------------------
+class ExportView(APIView):
+    """
+    Download everything stored about the current user.
+
+    GET: Stream the export as NDJSON (one {"type", "data"} object per line)
+    Query Parameters:
+    - compress: 'gzip' to download a .ndjson.gz file
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        compress = request.query_params.get("compress") == "gzip"
+        stream = export_stream(request.user, compress=compress)
+        if isinstance(request._request, ASGIRequest):
+            # Otherwise Django would build the whole export in memory first
+            stream = iterate_async(stream)
+        response = StreamingHttpResponse(
+            stream,
+            content_type="application/gzip" if compress else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(request.user, compress)}"'
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+# ------------------- Analytics -------------------
+class EngagementAnalyticsView(APIView):
+    """
+    Engagement report for staff, read from the precomputed rollups.
+
+    GET: Posts, comments, reactions, follows gained and active posters per bucket
+    Query Parameters:
+    - granularity: 'day' (default) or 'hour'
+    - since, until: ISO timestamps (default: the last 30 days, or 48 hours for 'hour')
+    - institute_name, dept_course: restrict to one institute / department
+    - group_by: 'institute_name' or 'dept_course' to split each bucket
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    DEFAULT_SPAN = {"day": timedelta(days=30), "hour": timedelta(hours=48)}
+    MAX_SPAN = {"day": timedelta(days=366), "hour": timedelta(days=31)}
+    DIMENSIONS = ("institute_name", "dept_course")
+
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get("granularity", "day")
+        if granularity not in self.DEFAULT_SPAN:
+            return Response({"error": "granularity must be 'day' or 'hour'"}, status=400)
+        group_by = params.get("group_by") or None
+        if group_by is not None and group_by not in self.DIMENSIONS:
+            return Response({"error": "group_by must be 'institute_name' or 'dept_course'"}, status=400)
+        try:
+            until = self._parse_time(params.get("until")) or timezone.now()
+            since = self._parse_time(params.get("since")) or until - self.DEFAULT_SPAN[granularity]
+        except ValueError:
+            return Response({"error": "since and until must be ISO timestamps"}, status=400)
+        if until - since > self.MAX_SPAN[granularity]:
+            return Response({"error": f"At most {self.MAX_SPAN[granularity].days} days per request"}, status=400)
+
+        filters = {name: params[name] for name in self.DIMENSIONS if params.get(name)}
+        return Response({
+            "granularity": granularity,
+            "since": since,
+            "until": until,
+            "processed_until": analytics.processed_until(),
+            "series": analytics.report(granularity, since, until, group_by, **filters),
+        })
+
+    @staticmethod
+    def _parse_time(value):
+        if not value:
+            return None
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
 
 # ------------------- Search -------------------
-class SearchPostsView(generics.ListAPIView):
+class SearchPostsView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Search for posts by text content.
     
@@ -487,7 +994,7 @@ class SearchPostsView(generics.ListAPIView):
         q = self.request.query_params.get("q", "")
         return Post.objects.filter(text__icontains=q).order_by('-created_at')[:20]
 
-class SearchUsersView(generics.ListAPIView):
+class SearchUsersView(SparseQuerysetMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Search for users by username or full name.
     
@@ -0,0 +1,61 @@
+"""
+Import-time-cheap API documentation helpers.
+
+drf_yasg and its openapi objects are only needed when the schema is
+generated, not when a worker boots. ``swagger_schema`` stores a factory on
+the view method instead of building openapi objects at import time;
+unilink.generators.LazySchemaGenerator calls it (through drf_yasg's own
+swagger_auto_schema) only while generating the schema.
+"""
+
+
+def swagger_schema(factory):
+    """
+    Deferred ``swagger_auto_schema``. ``factory`` receives the
+    ``drf_yasg.openapi`` module and returns the keyword arguments for
+    ``swagger_auto_schema``::
+
+        @swagger_schema(lambda openapi: dict(
+            operation_description="Follow a user",
+            responses={200: openapi.Response('Success')},
+        ))
+        def post(self, request):
+            ...
+    """
+    def decorator(view_method):
+        view_method._swagger_schema_factory = factory
+        return view_method
+    return decorator
+
+
+def get_api_info():
+    from .generators import api_info
+
+    return api_info
+
+
+def schema_ui_view(renderer):
+    """
+    Swagger UI / ReDoc page, with drf_yasg imported on the first request
+    instead of when the URLconf loads.
+    """
+    view = None
+
+    def lazy_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from drf_yasg.views import get_schema_view
+            from rest_framework import permissions
+
+            # No patterns: the page is only a shell that loads /swagger.json
+            schema_view = get_schema_view(
+                get_api_info(),
+                public=True,
+                permission_classes=(permissions.AllowAny,),
+                patterns=[],
+            )
+            view = schema_view.with_ui(renderer, cache_timeout=0)
+        return view(request, *args, **kwargs)
+
+    lazy_view.csrf_exempt = True
+    return lazy_view
@@ -0,0 +1,160 @@
+"""
+Batched GET requests.
+
+A screen that needs several endpoints sends them to ``POST /api/batch/`` as
+one request:
+
+    {"requests": [{"id": "profile", "path": "/api/social/users/<id>/profile/"},
+                  {"id": "posts", "path": "/api/social/users/<id>/posts/?page_size=10"}]}
+
+The caller is authenticated once; each sub-request is then resolved against
+the URL configuration and its view called directly, without another pass
+through the middleware or token verification (BatchUserAuthentication hands
+the DRF views the batch's user). Skipping the middleware includes
+ReplicaPinMiddleware, which only pins after writes, and sub-requests are
+all GETs; the read-your-writes pin of an earlier write is still honoured,
+since ReplicaReadMixin checks it on the sub-request's user. Sub-requests are independent,
+so they run concurrently (at most BATCH_CONCURRENCY at a time, each on its
+own worker thread and database connection). The answer carries one entry
+per sub-request, in order, each with its own status.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest, JsonResponse, QueryDict
+from django.urls import Resolver404, resolve
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+# Headers of the outer request that sub-requests inherit
+INHERITED_META = ("SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR")
+
+
+class SubRequest(HttpRequest):
+    def __init__(self, parent, path, query, user):
+        super().__init__()
+        self.method = "GET"
+        self.path = self.path_info = path
+        self.META = {
+            **{key: value for key, value in parent.META.items() if key.startswith("HTTP_") or key in INHERITED_META},
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+        }
+        self.GET = QueryDict(query)
+        self.user = user
+        # Read by BatchUserAuthentication
+        self.batch_user = user
+        self._scheme = parent.scheme
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+class BatchUserAuthentication(BaseAuthentication):
+    """
+    Authenticate a batch's sub-requests as the user BatchView already
+    authenticated, instead of verifying the inherited token again. Other
+    requests are left to the next authenticator. Listed first in
+    DEFAULT_AUTHENTICATION_CLASSES.
+    """
+
+    def authenticate(self, request):
+        if not isinstance(request._request, SubRequest) or not request._request.batch_user.is_authenticated:
+            return None
+        return (request._request.batch_user, None)
+
+    def authenticate_header(self, request):
+        # DRF answers 401 (not 403) only if the first authenticator names a scheme
+        return JWTAuthentication().authenticate_header(request)
+
+
+class BatchView(View):
+    """
+    Run several GET requests in one round trip.
+
+    POST: {"requests": [{"id": ..., "path": "/api/..."}]} -> {"responses": [{"id", "status", "body"}]}
+    Authentication: as for the sub-requests ("Authorization: Bearer <token>", optional)
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated, like the DRF views it dispatches to
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
+        try:
+            requests = json.loads(request.body)["requests"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": 'Body must be {"requests": [...]}'}, status=400)
+        if not isinstance(requests, list) or not requests:
+            return JsonResponse({"error": "requests must be a non-empty list"}, status=400)
+        if len(requests) > settings.BATCH_MAX_REQUESTS:
+            return JsonResponse({"error": f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"}, status=400)
+
+        try:
+            user = await sync_to_async(self._authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+            return JsonResponse(detail, status=401)
+
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def run(index, item):
+            async with semaphore:
+                # Not thread sensitive: each sub-request gets a thread of its own
+                return await sync_to_async(self._dispatch, thread_sensitive=False)(request, index, item, user)
+
+        responses = await asyncio.gather(*(run(index, item) for index, item in enumerate(requests)))
+        return JsonResponse({"responses": responses})
+
+    def _authenticate(self, request):
+        result = JWTAuthentication().authenticate(request)
+        return result[0] if result else AnonymousUser()
+
+    def _dispatch(self, request, index, item, user):
+        if isinstance(item, str):
+            item = {"path": item}
+        entry_id = item.get("id", index) if isinstance(item, dict) else index
+        path = item.get("path") if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith("/api/") or path.startswith("/api/batch/"):
+            return {"id": entry_id, "status": 400, "body": {"error": "path must be an /api/ URL"}}
+
+        path, _, query = path.partition("?")
+        close_old_connections()
+        try:
+            match = resolve(path)
+            if iscoroutinefunction(match.func):
+                return {"id": entry_id, "status": 400, "body": {"error": "Streaming endpoints cannot be batched"}}
+            response = match.func(SubRequest(request, path, query, user), *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            if response.streaming:
+                return {"id": entry_id, "status": 400, "body": {"error": "Streaming endpoints cannot be batched"}}
+            return {"id": entry_id, "status": response.status_code, "body": _body(response)}
+        except (Resolver404, Http404):
+            return {"id": entry_id, "status": 404, "body": {"detail": "Not found."}}
+        except Exception:
+            logger.exception("Batched request to %s failed", path)
+            return {"id": entry_id, "status": 500, "body": {"error": "Internal server error"}}
+        finally:
+            close_old_connections()
+
+
+def _body(response):
+    if not response.content:
+        return None
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(response.content)
+    return response.content.decode(response.charset, errors="replace")
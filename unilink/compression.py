@@ -0,0 +1,149 @@
+"""
+Response compression codecs.
+
+gzip is always available; brotli (``br``) and zstd are used when the
+``brotli`` and ``zstandard`` packages are installed. Every codec can compress
+a whole body at once or incrementally, for streaming responses: a stream's
+compress() may hold data back, sync() emits everything given so far as
+decodable output, flush() ends the stream.
+"""
+import zlib
+
+
+class Gzip:
+    name = "gzip"
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressobj(self):
+        # wbits=31: gzip container rather than raw zlib
+        return _ZlibStream(zlib.compressobj(self.level, zlib.DEFLATED, 31))
+
+    def compress(self, data):
+        stream = self.compressobj()
+        return stream.compress(data) + stream.flush()
+
+
+class _ZlibStream:
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def sync(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class Brotli:
+    name = "br"
+
+    def __init__(self, level):
+        import brotli
+
+        self.brotli = brotli
+        self.level = level
+
+    def compressobj(self):
+        return _BrotliStream(self.brotli.Compressor(quality=self.level))
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.level)
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def sync(self):
+        return self.compressor.flush()
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+class Zstd:
+    name = "zstd"
+
+    def __init__(self, level):
+        import zstandard
+
+        self.zstandard = zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compressobj(self):
+        return _ZstdStream(self.compressor.compressobj(), self.zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+
+class _ZstdStream:
+    def __init__(self, compressor, block):
+        self.compressor = compressor
+        self.block = block
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def sync(self):
+        return self.compressor.flush(self.block)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+CODECS = {"br": Brotli, "zstd": Zstd, "gzip": Gzip}
+
+
+def load_codecs(encodings, levels):
+    """{name: codec} for the configured encodings whose library is installed, in preference order."""
+    codecs = {}
+    for name in encodings:
+        try:
+            codecs[name] = CODECS[name](levels[name])
+        except ImportError:
+            continue
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, codecs):
+    """The codec to use for a request's Accept-Encoding, or None for identity."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    # Ties go to the server's preference order (the order of `codecs`)
+    for name, codec in codecs.items():
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = codec, q
+    return best
@@ -0,0 +1,115 @@
+"""
+Read-replica routing.
+
+Writes always go to ``default``. Reads go to ``default`` too, unless a DRF
+view mixes in ReplicaReadMixin and the request is a safe method; then one of
+the healthy aliases listed in settings.DATABASE_REPLICAS is used for the
+duration of that request.
+
+A user who just wrote is pinned to the primary for REPLICA_PIN_SECONDS
+(see unilink.middleware.ReplicaPinMiddleware), so they always read their
+own writes. Pins live in the Django cache; use a shared cache backend when
+running more than one worker.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+_lag_checks = {}
+_lag_lock = threading.Lock()
+
+PIN_KEY = "replica-pin:{}"
+
+
+class ReplicaRouter:
+    """Send reads to the replica chosen for the current request, if any."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 for non-PostgreSQL aliases)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE"
+            " WHEN NOT pg_is_in_recovery() THEN 0"
+            " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+            " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            " END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    """True if the replica answered its last lag check within REPLICA_MAX_LAG."""
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+
+    with _lag_lock:
+        try:
+            healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+        except Exception:
+            logger.warning("Replica %s is unreachable, reading from the primary", alias, exc_info=True)
+            healthy = False
+        _lag_checks[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Pick a healthy replica alias, or None to read from the primary."""
+    healthy = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+def pin_to_primary(user):
+    cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(PIN_KEY.format(user.pk)) is not None
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: serve GET/HEAD/OPTIONS from a replica unless the requesting
+    user recently wrote something. Falls back to the primary when no replica
+    is configured or healthy.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            alias = choose_replica()
+            if alias is not None:
+                self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
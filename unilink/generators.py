@@ -0,0 +1,31 @@
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.utils import swagger_auto_schema
+
+
+api_info = openapi.Info(
+    title="Unilink API",
+    default_version='v1',
+    description="API documentation for Unilink social app - A comprehensive social media platform with posts, comments, reactions, and user interactions",
+    contact=openapi.Contact(email="contact@unilink.com"),
+    license=openapi.License(name="MIT License"),
+)
+
+
+class LazySchemaGenerator(OpenAPISchemaGenerator):
+    """
+    Schema generator that also understands unilink.apidoc.swagger_schema:
+    the stored factory is evaluated here, so openapi objects are only built
+    while a schema is being generated.
+    """
+
+    def get_overrides(self, view, method):
+        action = getattr(view, "action", method.lower())
+        factory = getattr(getattr(view, action, None), "_swagger_schema_factory", None)
+        if factory is None:
+            return super().get_overrides(view, method)
+
+        def placeholder():
+            pass
+        swagger_auto_schema(**factory(openapi))(placeholder)
+        return placeholder._swagger_auto_schema
@@ -0,0 +1,154 @@
+"""
+Read cache for hot keys.
+
+A post that is being shared is read by many clients at once. With plain
+cache-aside, every request that finds the entry missing or expired runs the
+same queries at the same moment. Two things prevent that here:
+
+- Single flight: concurrent misses for the same key in one process wait for
+  a single computation and share its result.
+- Probabilistic early refresh ("XFetch", Vattani et al., VLDB 2015): each
+  read may decide to recompute before the entry expires, with a probability
+  that rises as expiry approaches and with how long the value took to
+  compute. One reader usually refreshes the entry while everyone else is
+  still served from it, so entries of hot keys do not expire all at once.
+
+Entries are stored as (value, compute seconds, expiry) for HOT_CACHE_TTL
+seconds. ``invalidate`` bumps a per-object version that is part of every key,
+so all cached variants of an object (e.g. different ?fields=) go stale
+together. The Django cache is per process unless a shared backend is
+configured; single flight is always per process.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .db_router import is_pinned
+
+VERSION_KEY = "hot:version:{}:{}"
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers get its result (or exception)."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.value = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def busy(self, key):
+        return key in self._calls
+
+
+_flight = SingleFlight()
+
+
+def version(namespace, object_id):
+    return cache.get(VERSION_KEY.format(namespace, object_id), 0)
+
+
+def invalidate(namespace, object_id):
+    """Make every cached entry of the object stale."""
+    key = VERSION_KEY.format(namespace, object_id)
+    # A timestamp rather than a counter, so an evicted version key never repeats an old one
+    cache.set(key, time.time_ns(), None)
+
+
+def _expired_early(delta, expiry, beta):
+    # 1 - random() is in (0, 1], so the log is finite and <= 0
+    return time.time() - delta * beta * math.log(1 - random.random()) >= expiry
+
+
+def get_or_compute(key, compute, ttl=None, beta=None):
+    """The cached value for `key`, computed by `compute()` on a miss or an early refresh."""
+    ttl = settings.HOT_CACHE_TTL if ttl is None else ttl
+    beta = settings.HOT_CACHE_BETA if beta is None else beta
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        # While another request is already refreshing it, the entry is still good enough
+        if not _expired_early(delta, expiry, beta) or _flight.busy(key):
+            return value
+
+    def refresh():
+        started = time.time()
+        value = compute()
+        finished = time.time()
+        cache.set(key, (value, finished - started, finished + ttl), ttl)
+        return value
+
+    if not settings.HOT_CACHE_SINGLE_FLIGHT:
+        return refresh()
+    return _flight.do(key, refresh)
+
+
+class HotCacheMixin:
+    """
+    DRF retrieve view mixin: serve the serialized object through
+    get_or_compute. The cached data must be the same for every reader: the
+    serializer sees shared=True in its context and leaves out what depends
+    on the requester, which ``personalize`` then adds per request. Readers
+    pinned to the primary after a write (see unilink.db_router) bypass the
+    cache, so they read their own writes.
+    """
+    hot_cache_namespace = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["shared"] = getattr(self, "_shared", False)
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.HOT_CACHE_TTL or is_pinned(request.user):
+            return super().retrieve(request, *args, **kwargs)
+        object_id = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        # ?fields= / ?expand= change the payload, so they are part of the key
+        query = hashlib.md5(repr(sorted(request.query_params.lists())).encode()).hexdigest()
+        key = f"hot:{self.hot_cache_namespace}:{object_id}:{version(self.hot_cache_namespace, object_id)}:{query}"
+        data = get_or_compute(key, self._shared_data)
+        return Response(self.personalize(request, data))
+
+    def _shared_data(self):
+        self._shared = True
+        try:
+            return self.get_serializer(self.get_object()).data
+        finally:
+            self._shared = False
+
+    def personalize(self, request, data):
+        """Add the requester's view of the object to the shared data (without modifying it)."""
+        return data
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from .compression import load_codecs, negotiate
+from .db_router import pin_to_primary
+from .streaming import iterate_async
+
+
+class ReplicaPinMiddleware:
+    """
+    After a successful write by an authenticated user, pin that user's reads
+    to the primary database for a short window (read-your-writes).
+
+    DRF copies the authenticated user onto the Django request, so this also
+    sees users authenticated with JWT.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts (brotli,
+    zstd or gzip, see unilink.compression).
+
+    Bodies smaller than COMPRESSION_MIN_SIZE and content types outside
+    COMPRESSION_CONTENT_TYPES are sent as is. Streaming responses are
+    compressed as they are produced, with output flushed every
+    COMPRESSION_STREAM_FLUSH_SIZE bytes of input (under ASGI, sync streams
+    are handed on as async iterators); server-sent events, which
+    must reach the client one event at a time, are not compressed. A view opts out with a
+    ``compress_response = False`` attribute (on the view class, or on the
+    function for function views).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.codecs = load_codecs(settings.COMPRESSION_ENCODINGS, settings.COMPRESSION_LEVELS)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(request, response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codec = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.codecs)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async(codec, response.streaming_content)
+            else:
+                chunks = self.compress_stream(codec, response.streaming_content)
+                # Under ASGI a sync stream would be read whole before sending (see unilink.streaming)
+                response.streaming_content = iterate_async(chunks) if isinstance(request, ASGIRequest) else chunks
+            # Length unknown until the stream ends
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The representation changed, so a strong ETag no longer matches it
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codec.name
+        return response
+
+    def should_compress(self, request, response):
+        if not getattr(request, "compress_response", True) or not getattr(response, "compress_response", True):
+            return False
+        if response.has_header("Content-Encoding") or response.status_code in (204, 304):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type == "text/event-stream":
+            return False
+        return any(content_type.startswith(prefix) for prefix in settings.COMPRESSION_CONTENT_TYPES)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        if not getattr(view_func, "compress_response", getattr(view_class, "compress_response", True)):
+            request.compress_response = False
+
+    @staticmethod
+    def compress_chunk(stream, chunk, state):
+        # Emit output every COMPRESSION_STREAM_FLUSH_SIZE input bytes: flushing
+        # every small chunk would cost most of the ratio, never flushing would
+        # hold the whole body back
+        data = stream.compress(chunk)
+        state[0] += len(chunk)
+        if state[0] >= settings.COMPRESSION_STREAM_FLUSH_SIZE:
+            state[0] = 0
+            data += stream.sync()
+        return data
+
+    def compress_stream(self, codec, chunks):
+        stream, state = codec.compressobj(), [0]
+        for chunk in chunks:
+            data = self.compress_chunk(stream, chunk, state)
+            if data:
+                yield data
+        yield stream.flush()
+
+    async def compress_async(self, codec, chunks):
+        stream, state = codec.compressobj(), [0]
+        async for chunk in chunks:
+            data = self.compress_chunk(stream, chunk, state)
+            if data:
+                yield data
+        yield stream.flush()
@@ -0,0 +1,208 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and its swagger_auto_schema
+declarations, which is too slow to repeat per request. The JSON and YAML
+documents are rendered once into settings.SCHEMA_ARTIFACT_DIR (by
+``manage.py generate_schema`` at deploy time, or on the first request) and
+served from memory with strong ETags. The artifact is rebuilt only when its
+fingerprint changes: SCHEMA_BUILD_ID when a deploy sets one, otherwise a hash
+of the routes, the source of every project module that shapes the schema
+(views and their base classes, serializers and the serializers nested in
+them, pagination classes, the apidoc helpers and the generator) and the
+schema settings. Files are written to a temporary name and renamed into
+place, so a worker never reads a half-written document.
+"""
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from importlib.metadata import version
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.cache import get_conditional_response
+from django.views import View
+
+MANIFEST_NAME = "manifest.json"
+FORMATS = {
+    "json": ("swagger.json", "application/json"),
+    "yaml": ("swagger.yaml", "application/yaml"),
+}
+
+
+@dataclass
+class SchemaDocument:
+    content: bytes
+    content_type: str
+    etag: str
+
+
+def _patterns(patterns, prefix=""):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern
+
+
+def _classes(callback):
+    """The view class behind a URL callback and the classes that shape its schema."""
+    view = getattr(callback, "view_class", None) or getattr(callback, "cls", None)
+    if view is None:
+        return [callback]
+    classes = [view]
+    for name in ("serializer_class", "pagination_class"):
+        cls = getattr(view, name, None)
+        if inspect.isclass(cls):
+            classes.append(cls)
+            # Nested serializers, e.g. the author inside a post
+            for field in getattr(cls, "_declared_fields", {}).values():
+                classes.append(type(getattr(field, "child", field)))
+    return classes
+
+
+def _source(module_name):
+    # find_spec locates the file without importing it (unilink.generators pulls in drf_yasg)
+    spec = importlib.util.find_spec(module_name)
+    path = spec.origin if spec else None
+    if path and path.startswith(str(settings.BASE_DIR)):
+        return Path(path).read_bytes()
+    return b""
+
+
+def urlconf_fingerprint():
+    """SCHEMA_BUILD_ID, or a hash of every route, its view and the source and settings that shape the schema."""
+    if settings.SCHEMA_BUILD_ID:
+        return f"build:{settings.SCHEMA_BUILD_ID}"
+    digest = hashlib.sha256(version("drf-yasg").encode())
+    modules = {"unilink.apidoc", "unilink.generators"}
+    for route, pattern in sorted(_patterns(get_resolver().url_patterns), key=lambda item: item[0]):
+        digest.update(f"{route}\0{pattern.lookup_str}\n".encode())
+        for cls in _classes(pattern.callback):
+            modules.update(base.__module__ for base in getattr(cls, "__mro__", [cls]))
+
+    for name in sorted(modules):
+        digest.update(_source(name))
+    for name in ("REST_FRAMEWORK", "SWAGGER_SETTINGS"):
+        digest.update(repr(getattr(settings, name, None)).encode())
+    return digest.hexdigest()
+
+
+def render_schema():
+    """Run the schema generator once and encode the result in every format."""
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+    from . import urls
+    from .apidoc import get_api_info
+    from .generators import LazySchemaGenerator
+
+    generator = LazySchemaGenerator(info=get_api_info(), patterns=urls.api_patterns)
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        "json": OpenAPICodecJson(validators=[]).encode(schema),
+        "yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def write_artifact(force=False):
+    """
+    Render the schema into SCHEMA_ARTIFACT_DIR unless the stored artifact
+    already matches the current URL configuration. Returns True if it was
+    (re)generated.
+    """
+    directory = Path(settings.SCHEMA_ARTIFACT_DIR)
+    fingerprint = urlconf_fingerprint()
+    manifest_path = directory / MANIFEST_NAME
+
+    if not force and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("fingerprint") == fingerprint and all(
+            (directory / filename).exists() for filename, _ in FORMATS.values()
+        ):
+            return False
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for fmt, content in render_schema().items():
+        filename, _ = FORMATS[fmt]
+        _write_atomic(directory / filename, content)
+    # Manifest last, so an interrupted write is regenerated on the next load
+    _write_atomic(manifest_path, json.dumps({"fingerprint": fingerprint}).encode())
+    return True
+
+
+def _umask():
+    # Only readable by setting it; done once, at import
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# Mode of newly created artifacts, as open() would give them
+NEW_FILE_MODE = 0o666 & ~_umask()
+
+
+def _write_atomic(path, content):
+    """
+    Write to a temporary file next to `path` and rename it over `path`. The
+    file gets the usual mode for new files: mkstemp creates it 0600, which
+    e.g. a web server serving the directory could not read.
+    """
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(temporary, NEW_FILE_MODE)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+
+def _etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+_documents = None
+_documents_lock = threading.Lock()
+
+
+def get_documents():
+    """Load (generating if needed) the schema documents, once per process."""
+    global _documents
+    if _documents is None:
+        with _documents_lock:
+            if _documents is None:
+                write_artifact()
+                directory = Path(settings.SCHEMA_ARTIFACT_DIR)
+                documents = {}
+                for fmt, (filename, content_type) in FORMATS.items():
+                    # The ETag is derived from the bytes actually read, even if another worker replaced the file since
+                    content = (directory / filename).read_bytes()
+                    documents[fmt] = SchemaDocument(content=content, content_type=content_type, etag=_etag(content))
+                _documents = documents
+    return _documents
+
+
+class PrecomputedSchemaView(View):
+    """
+    Serve the precomputed schema document. Clients revalidate with
+    If-None-Match and get a 304 while the schema is unchanged.
+    """
+    format = "json"
+
+    def get(self, request):
+        document = get_documents()[self.format]
+        response = get_conditional_response(request, etag=document.etag)
+        if response is None:
+            response = HttpResponse(document.content, content_type=document.content_type)
+        response["ETag"] = document.etag
+        response["Cache-Control"] = "public, no-cache"
+        return response
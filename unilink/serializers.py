@@ -0,0 +1,184 @@
+"""
+Sparse fieldsets.
+
+Clients choose what a response carries with two query parameters:
+
+    ?fields=id,text,user.username,user.profile_photo
+    ?expand=user
+
+``fields`` lists the fields to return, with dots reaching into nested objects
+(a bare ``user`` keeps all of the user's fields). ``expand`` lists the
+nested relations to embed; when it is given, every relation a serializer
+declares in ``Meta.expandable_fields`` but that is not listed collapses to
+its primary key (or is left out, for lists). Without either parameter the
+response is unchanged.
+
+SparseFieldsMixin trims the serializer; SparseQuerysetMixin makes the view's
+queryset load only what the trimmed serializer reads (``only()``,
+``select_related()`` and ``prefetch_related()`` for expanded relations only),
+so unrequested relations are never queried.
+"""
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}; None if the parameter is absent."""
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for part in filter(None, path.strip().split(".")):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def subtree(tree, path):
+    """Selection for the serializer at `path`: a dict of names, or None for "everything"."""
+    node = tree
+    for part in path:
+        if not node:
+            return None
+        node = node.get(part)
+        if node is None:
+            return None
+    return node or None
+
+
+def is_sparse(request):
+    return request is not None and ("fields" in request.query_params or "expand" in request.query_params)
+
+
+def sparse_options(request):
+    if request is None:
+        return None, None
+    return parse_paths(request.query_params.get("fields")), parse_paths(request.query_params.get("expand"))
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin honouring ?fields= and ?expand= (read from the request in
+    the serializer context), including when nested inside another serializer.
+
+    Meta.expandable_fields: names of nested relations that ?expand= controls.
+    Meta.sparse_sources: {field name: [model fields it reads]} for fields that
+    aren't plain model fields (SerializerMethodFields, values the serializer
+    loads itself), so the queryset can be narrowed around them.
+    """
+
+    def _path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return list(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields_tree, expand_tree = sparse_options(self.context.get("request"))
+        if fields_tree is None and expand_tree is None:
+            return fields
+        return select_fields(self.__class__, fields, self._path(), fields_tree, expand_tree)
+
+
+def select_fields(serializer_class, fields, path, fields_tree, expand_tree):
+    selected = subtree(fields_tree, path) if fields_tree is not None else None
+    if selected is not None:
+        fields = {name: field for name, field in fields.items() if name in selected}
+
+    if expand_tree is not None:
+        expanded = subtree(expand_tree, path) or {}
+        for name in getattr(serializer_class.Meta, "expandable_fields", ()):
+            if name not in fields or name in expanded:
+                continue
+            field = fields[name]
+            if isinstance(field, serializers.ListSerializer):
+                del fields[name]
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(source=field.source, read_only=True)
+    return fields
+
+
+# ------------------- Queryset narrowing -------------------
+
+def _concrete_names(model):
+    return [field.name for field in model._meta.concrete_fields]
+
+
+def plan_loading(serializer_class, model, path, fields_tree, expand_tree, prefix=""):
+    """
+    Work out what `serializer_class` at `path` reads from `model`. Returns
+    (only, select_related, prefetch_related); `only` is None when the whole
+    row is needed.
+    """
+    fields = select_fields(serializer_class, serializer_class().get_fields(), path, fields_tree, expand_tree)
+    declared_sources = getattr(serializer_class.Meta, "sparse_sources", {})
+    only, select, prefetch = [prefix + model._meta.pk.attname], [], []
+
+    for name, field in fields.items():
+        source = field.source or name  # unbound fields default to their name
+        if name in declared_sources:
+            if only is not None:
+                only.extend(prefix + source for source in declared_sources[name])
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            only = None  # unknown requirements: load the whole row
+            continue
+        if source == "*" or "." in source:
+            only = None
+            continue
+
+        model_field = model._meta.get_field(source)
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.ModelSerializer):
+            related = model_field.related_model
+            if model_field.many_to_one or model_field.one_to_one:
+                if only is not None and model_field.concrete:
+                    only.append(prefix + model_field.name)
+                nested_only, nested_select, nested_prefetch = plan_loading(
+                    nested.__class__, related, path + [name], fields_tree, expand_tree, prefix + source + "__"
+                )
+                select.append(prefix + source)
+                select.extend(nested_select)
+                prefetch.extend(nested_prefetch)
+                if only is not None:
+                    only.extend(nested_only or [prefix + source + "__" + name for name in _concrete_names(related)])
+            else:
+                _, nested_select, nested_prefetch = plan_loading(
+                    nested.__class__, related, path + [name], fields_tree, expand_tree
+                )
+                prefetch.append(prefix + source)
+                prefetch.extend(prefix + source + "__" + lookup for lookup in nested_select + nested_prefetch)
+        elif only is not None and getattr(model_field, "concrete", False):
+            only.append(prefix + model_field.name)
+
+    return only, select, prefetch
+
+
+def narrow_queryset(queryset, serializer_class, request):
+    if not is_sparse(request):
+        return queryset
+    fields_tree, expand_tree = sparse_options(request)
+    only, select, prefetch = plan_loading(serializer_class, queryset.model, [], fields_tree, expand_tree)
+    # Relations the full response would load but this one doesn't need
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """View mixin: narrow the queryset of safe requests to what ?fields=/?expand= need."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Views that post-process into a list (e.g. the feed's gender mix) keep their rows as loaded
+        if self.request.method in ("GET", "HEAD") and isinstance(queryset, QuerySet):
+            queryset = narrow_queryset(queryset, self.get_serializer_class(), self.request)
+        return queryset
@@ -48,12 +48,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'unilink.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'unilink.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'unilink.urls'
@@ -90,6 +92,17 @@ DATABASES = {
     }
 }
 
+# Read replicas: add their aliases to DATABASES and list them here. Safe requests
+# to views using unilink.db_router.ReplicaReadMixin read from a healthy replica.
+# Example:
+# DATABASES["replica"] = {**DATABASES["default"], "HOST": "replica-host", "TEST": {"MIRROR": "default"}}
+# DATABASE_REPLICAS = ["replica"]
+DATABASE_ROUTERS = ["unilink.db_router.ReplicaRouter"]
+DATABASE_REPLICAS = []
+REPLICA_MAX_LAG = 5               # seconds of replication lag before falling back to the primary
+REPLICA_LAG_CHECK_INTERVAL = 10   # seconds between lag checks per replica
+REPLICA_PIN_SECONDS = 15          # read-your-writes window after a user writes
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,6 +160,7 @@ DEFAULT_FROM_EMAIL = "Unilink <contactus.unilink@gmail.com>"
 # DRF configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
+        "unilink.batch.BatchUserAuthentication",  # sub-requests of /api/batch/ (see module)
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -169,3 +183,113 @@ APPWRITE_PROJECT_ID = "68dd64330036984d70ce"
 APPWRITE_BUCKET_ID = "68dd64ea00069ab481c3"
 APPWRITE_API_KEY = "standard_330be7a52d4c60d450a92c147ecb0684ca63dbb7e1d876bba61442e78d1e282cde48435a7884fc515eea3be66113e023575648e8b636f4a27e83d263e84d07c5c445f544b8a8889c5934bafc439ead8d28342752d8e2b395a3708f560fa6c022215642055e3e4e38bbea31f71bd83c3b7489cba61d4c6657806d3536a8c2b9b0"
 APPWRITE_ENDPOINT = "https://cloud.appwrite.io/v1"
+
+
+# Live feed stream (Server-Sent Events, served by the ASGI application)
+FEED_STREAM_BROKER = "social.realtime.LocalBroker"  # swap for a cross-process broker when running several workers
+FEED_STREAM_QUEUE_SIZE = 50   # events buffered per connection before a slow client only gets counts
+FEED_STREAM_HEARTBEAT = 15    # seconds between keepalive comments on idle streams
+FEED_STREAM_DISPATCH_QUEUE_SIZE = 10000  # published posts waiting for the hub's dispatch thread
+FEED_STREAM_TOKEN_LIFETIME = 60  # seconds a stream token from /feed/stream/token/ can open a stream
+
+
+# Notifications (written in batches by a background flusher; 0 writes on every event)
+NOTIFICATIONS_FLUSH_INTERVAL = 1.0  # seconds
+NOTIFICATIONS_BATCH_SIZE = 500      # pending groups that trigger an early flush
+
+
+# API schema: rendered once into SCHEMA_ARTIFACT_DIR (manage.py generate_schema, or the
+# first request) and regenerated only when the views, serializers or routes change
+SCHEMA_ARTIFACT_DIR = BASE_DIR / "schema"
+SCHEMA_BUILD_ID = None  # e.g. the deployed commit; when set, the artifact is regenerated exactly when it changes
+SWAGGER_SETTINGS = {
+    "SPEC_URL": "schema-json",
+    "DEFAULT_GENERATOR_CLASS": "unilink.generators.LazySchemaGenerator",
+    "DEFAULT_INFO": "unilink.generators.api_info",
+}
+REDOC_SETTINGS = {"SPEC_URL": "schema-json"}
+
+
+# Trending posts (see social.trending)
+TRENDING_WEIGHTS = {"like": 1.0, "comment": 3.0}  # score added per reaction type / comment
+TRENDING_HALF_LIFE_HOURS = 12
+TRENDING_TOP_K = 500
+TRENDING_REFRESH_INTERVAL = 60  # seconds the cached top-K is served before being recomputed
+TRENDING_MIN_SCORE = 0.01       # scores that decayed below this are pruned by manage.py refresh_trending
+
+
+# Explore feed (see social.explore; rebuilt per institute by manage.py refresh_explore)
+EXPLORE_SIZE = 300               # posts kept per segment
+EXPLORE_MIX = [("institute", 2), ("trending", 2), ("recent", 1)]  # posts taken from each source per round
+EXPLORE_WINDOW_DAYS = 7          # how far back recent and institute posts are taken from
+EXPLORE_REFRESH_INTERVAL = 300   # seconds a segment's list is served before being rebuilt
+
+
+# In-process follow graph (see social.graph): follow checks and follower lists served from memory
+FOLLOW_GRAPH_ENABLED = False
+FOLLOW_GRAPH_SYNC_INTERVAL = 1            # seconds between polls of the follow change log
+FOLLOW_GRAPH_CHANGE_RETENTION = 24 * 3600  # seconds of change log kept (manage.py prune_follow_changes)
+FOLLOW_GRAPH_GAP_TIMEOUT = 60              # seconds a skipped change id is waited for (longest follow transaction)
+
+
+# Registration availability checks (see users.availability)
+USER_BLOOM_CAPACITY = 100_000   # minimum number of values the Bloom filter is sized for
+USER_BLOOM_ERROR_RATE = 0.001   # false positive rate; positives are confirmed against the database
+USER_BLOOM_SYNC_INTERVAL = 5    # seconds between picking up users registered by other workers
+
+
+# Uploaded images (see users.media): resized in a process pool, only the variants are stored
+IMAGE_VARIANTS = {"avatar": 96, "feed": 1080, "full": 2048}  # name -> longest edge in pixels
+IMAGE_PRIMARY_VARIANT = "full"   # variant whose URL is returned as file_url
+IMAGE_VARIANT_FORMAT = "WEBP"    # or "JPEG"
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_PROCESS_WORKERS = 2        # processes decoding and resizing images
+IMAGE_PROCESS_TIMEOUT = 30       # seconds, including waiting for a free worker; then 503
+IMAGE_MAX_PIXELS = 40_000_000    # larger images are rejected (decompression bombs)
+MEDIA_UPLOAD_THREADS = 4         # threads sending post media to storage while the post is validated
+
+
+# Resumable uploads (see users.uploads): chunks are kept on local disk until the upload completes
+UPLOAD_SESSION_DIR = BASE_DIR / "uploads"
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024    # bytes per chunk
+UPLOAD_MAX_SIZE = 500 * 1024 * 1024    # largest file accepted
+UPLOAD_SESSION_TTL = 24 * 3600         # seconds before an incomplete session is purged (manage.py purge_upload_sessions)
+UPLOAD_COMPLETE_TIMEOUT = 3600         # seconds a completion may take before another request may take it over
+
+# Comment previews (see social.comments): posts embed this many of their newest top-level comments
+COMMENT_PREVIEW_SIZE = 3
+
+# Response compression (see unilink.middleware.CompressionMiddleware)
+COMPRESSION_ENCODINGS = ["br", "zstd", "gzip"]  # preference order; br and zstd need the brotli / zstandard packages
+COMPRESSION_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}  # see benchmarks/compression.py for the CPU/size tradeoff
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are sent uncompressed
+COMPRESSION_STREAM_FLUSH_SIZE = 64 * 1024  # streaming responses emit compressed output after this much input
+COMPRESSION_CONTENT_TYPES = ["application/json", "application/x-ndjson", "text/", "application/javascript"]
+
+# Batch endpoint (see unilink.batch)
+BATCH_MAX_REQUESTS = 20  # sub-requests accepted per batch
+BATCH_CONCURRENCY = 4    # sub-requests run at once, each holding a database connection
+
+# Personal data export (see social.export)
+EXPORT_CHUNK_SIZE = 2000       # rows fetched per server-side cursor round trip
+EXPORT_WRITE_SIZE = 64 * 1024  # bytes of NDJSON per chunk written to the response
+
+# Engagement analytics (see social.analytics; run manage.py rollup_engagement every few minutes)
+ANALYTICS_LAG = 60                # seconds a row must be old before it is counted
+ANALYTICS_MAX_WINDOW = 6 * 3600   # seconds of rows folded in per transaction
+
+# Partitioned post and comment tables (see social.partitions; run manage.py create_partitions daily)
+PARTITION_MONTHS_AHEAD = 3  # months of empty partitions kept ready beyond the current one
+
+# Post archive (see social.archive; run manage.py archive_posts daily)
+ARCHIVE_AFTER_DAYS = 365  # posts older than this move to the archive with their comments and reactions
+ARCHIVE_BATCH_SIZE = 500  # posts moved per transaction
+
+# Write-behind reactions (see social.reactions)
+REACTIONS_FLUSH_INTERVAL = 0.25  # seconds reactions wait in memory before being written; 0 writes them at once
+REACTIONS_BATCH_SIZE = 1000      # pending reactions that trigger an early flush
+
+# Hot-key read cache for post details and profiles (see unilink.hotcache)
+HOT_CACHE_TTL = 10            # seconds an entry is served; counts in it lag by up to this much; 0 disables
+HOT_CACHE_BETA = 1.0          # early refresh eagerness (XFetch); 0 refreshes only on expiry
+HOT_CACHE_SINGLE_FLIGHT = True  # concurrent misses of a key in a process share one computation
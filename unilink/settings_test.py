@@ -0,0 +1,21 @@
+"""
+Settings for the test suite: SQLite instead of the PostgreSQL server, with a
+second alias standing in for a read replica (a test mirror of ``default``).
+
+    python manage.py test --settings=unilink.settings_test
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_REPLICAS = ["replica"]
@@ -0,0 +1,24 @@
+"""
+Per-process warm-up, run once the application is loaded (see wsgi.py and
+asgi.py). In-memory indexes are built in a background thread so the worker
+starts serving immediately; a request that needs an index before it is ready
+waits for the same build instead of starting another one.
+"""
+import threading
+
+from django.db import connection
+
+
+def _warm():
+    from social.graph import warm as warm_follow_graph
+    from users.availability import warm as warm_availability
+
+    try:
+        warm_follow_graph()
+        warm_availability()
+    finally:
+        connection.close()
+
+
+def warm_indexes():
+    threading.Thread(target=_warm, name="warm-indexes", daemon=True).start()
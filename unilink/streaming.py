@@ -0,0 +1,29 @@
+"""
+Streaming sync generators from the ASGI server.
+
+Given a sync iterator, Django's StreamingHttpResponse under ASGI runs
+``list()`` over it in a worker thread before sending the first byte, so an
+export or a compressed stream would be built whole in memory. ``iterate_async``
+pulls one chunk at a time instead, each in the request's sync thread, which
+is also where the generator's database cursor lives.
+"""
+from asgiref.sync import sync_to_async
+
+_DONE = object()
+
+
+async def iterate_async(iterable):
+    """Async iterator over a sync iterable, advancing it with one sync_to_async call per item."""
+    iterator = iter(iterable)
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            item = await pull(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        # Close the generator (and its server-side cursor) in its own thread if the client went away
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
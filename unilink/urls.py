@@ -17,36 +17,29 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from .apidoc import schema_ui_view
+from .batch import BatchView
+from .schema import PrecomputedSchemaView
 
 
 # Schema / Swagger setup
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Unilink API",
-        default_version='v1',
-        description="API documentation for Unilink social app - A comprehensive social media platform with posts, comments, reactions, and user interactions",
-        contact=openapi.Contact(email="contact@unilink.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-    patterns=[
-        path("api/auth/", include("users.urls")),
-        path("api/social/", include("social.urls")),
-    ],
-)
+# Routes documented in the API schema (see unilink.schema)
+api_patterns = [
+    path("api/auth/", include("users.urls")),
+    path("api/social/", include("social.urls")),
+]
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("users.urls")),
     path("api/social/", include("social.urls")),
 
-    # Swagger documentation
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger.yaml', schema_view.without_ui(cache_timeout=0), name='schema-yaml'),
+    # Several GET requests in one round trip (see unilink.batch)
+    path("api/batch/", BatchView.as_view(), name="batch"),
+
+    # Swagger documentation (UI pages load the precomputed /swagger.json)
+    path('swagger/', schema_ui_view('swagger'), name='schema-swagger-ui'),
+    path('redoc/', schema_ui_view('redoc'), name='schema-redoc'),
+    path('swagger.json', PrecomputedSchemaView.as_view(format="json"), name='schema-json'),
+    path('swagger.yaml', PrecomputedSchemaView.as_view(format="yaml"), name='schema-yaml'),
 ]
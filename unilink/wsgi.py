@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'unilink.settings')
 
 application = get_wsgi_application()
+
+from unilink.startup import warm_indexes  # noqa: E402
+
+warm_indexes()
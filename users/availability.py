@@ -0,0 +1,145 @@
+"""
+Username, email and register number availability.
+
+Each process keeps a Bloom filter of every taken value. A value the filter
+has never seen is free without touching the database; a hit (which may be a
+false positive, USER_BLOOM_ERROR_RATE of the time) is confirmed with an
+indexed lookup. The filter is built from the users table on first use, has
+values added whenever a user is saved in this process, and picks up users
+registered by other workers every USER_BLOOM_SYNC_INTERVAL seconds.
+Deleted accounts stay in the filter until the next rebuild; the database
+check clears them.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models.signals import post_save
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("username", "email", "register_number")
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def normalize(field, value):
+    value = value.strip()
+    if field == "email":
+        value = User.objects.normalize_email(value)
+    return value
+
+
+def _key(field, value):
+    return f"{field}:{value}"
+
+
+class TakenValues:
+    def __init__(self):
+        expected = User.objects.count() * len(FIELDS)
+        self.filter = BloomFilter(
+            max(settings.USER_BLOOM_CAPACITY, expected * 2), settings.USER_BLOOM_ERROR_RATE
+        )
+        self.synced_at = time.monotonic()
+        self.watermark = timezone.now()
+        self.add_users(User.objects.values_list(*FIELDS).iterator(chunk_size=10000))
+
+    def add_users(self, rows):
+        for row in rows:
+            for field, value in zip(FIELDS, row):
+                self.filter.add(_key(field, value))
+
+    def sync(self):
+        """Add users registered since the last sync (by any worker)."""
+        if time.monotonic() - self.synced_at < settings.USER_BLOOM_SYNC_INTERVAL:
+            return
+        self.synced_at = time.monotonic()
+        since, self.watermark = self.watermark, timezone.now()
+        # Overlap the window so rows committed just after the last sync aren't missed
+        recent = User.objects.filter(date_joined__gte=since - timedelta(seconds=60))
+        self.add_users(recent.values_list(*FIELDS))
+
+    def might_be_taken(self, field, value):
+        return _key(field, value) in self.filter
+
+
+_taken = None
+_taken_lock = threading.Lock()
+
+
+def get_taken_values():
+    global _taken
+    if _taken is None:
+        with _taken_lock:
+            if _taken is None:
+                _taken = TakenValues()
+        return _taken
+    _taken.sync()
+    return _taken
+
+
+def warm():
+    """Build the filter at process startup instead of on the first check."""
+    try:
+        get_taken_values()
+    except DatabaseError:
+        # Not fatal: retried on first use
+        logger.warning("Could not build the availability filter at startup", exc_info=True)
+
+
+def is_taken(field, value):
+    value = normalize(field, value)
+    if not get_taken_values().might_be_taken(field, value):
+        return False
+    return User.objects.filter(**{field: value}).exists()
+
+
+def user_saved(sender, instance, **kwargs):
+    if _taken is not None:
+        _taken.add_users([[getattr(instance, field) for field in FIELDS]])
+
+
+def connect_signals():
+    post_save.connect(user_saved, sender=User, dispatch_uid="availability_user_saved")
+
+
+class AvailableValidator:
+    """
+    Unique check for registration fields that consults the Bloom filter
+    before the database (replaces DRF's UniqueValidator).
+    """
+    def __init__(self, field):
+        self.field = field
+
+    def __call__(self, value):
+        if is_taken(self.field, value):
+            label = User._meta.get_field(self.field).verbose_name
+            raise serializers.ValidationError(f"user with this {label} already exists.", code="unique")
@@ -0,0 +1,41 @@
+"""
+Pixel work for uploaded images.
+
+Runs inside the worker processes of users.media's process pool, so it
+imports nothing from Django and nothing heavier than Pillow.
+"""
+import io
+
+
+def render_variants(data, sizes, image_format, quality, max_pixels):
+    """
+    Decode `data` once and return {name: (encoded bytes, width, height)} with
+    one variant per entry of `sizes` ({name: longest edge in pixels}). Images
+    are never upscaled, EXIF orientation is applied, and no metadata is
+    copied to the variants.
+    """
+    from PIL import Image, ImageOps
+
+    # Pillow itself only warns up to twice MAX_IMAGE_PIXELS, so the size is checked here too
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(io.BytesIO(data)) as source:
+        width, height = source.size
+        if width * height > max_pixels:
+            raise Image.DecompressionBombError(f"Image size ({width * height} pixels) exceeds limit of {max_pixels} pixels")
+        source.load()
+        image = ImageOps.exif_transpose(source)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if image_format == "JPEG" or not has_alpha:
+        image = image.convert("RGB")
+    else:
+        image = image.convert("RGBA")
+
+    variants = {}
+    for name, edge in sizes.items():
+        variant = image.copy()
+        variant.thumbnail((edge, edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, format=image_format, quality=quality, optimize=True)
+        variants[name] = (buffer.getvalue(), variant.width, variant.height)
+    return variants
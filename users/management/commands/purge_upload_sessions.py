@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable upload sessions and their local chunk files"
+
+    def handle(self, *args, **options):
+        purged = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"{purged} upload sessions purged"))
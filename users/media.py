@@ -0,0 +1,265 @@
+"""
+Upload pipeline.
+
+Images are decoded and resized in a process pool (users.imaging), never in
+the request thread, into the variants listed in IMAGE_VARIANTS. Only the
+variants are stored: the original, with its EXIF and GPS metadata, is
+discarded. Every upload is recorded as a MediaAsset, so a post or profile
+that later references the returned URL picks up the variant map.
+
+Whether an upload is an image is decided from its header, not from the
+Content-Type the client declared, so an image sent as
+application/octet-stream is not published with its metadata.
+
+Uploads are content addressed: the SHA-256 of the uploaded bytes is computed
+while the request body is read, and a file that was already stored is
+answered with the existing MediaAsset without sending anything to storage.
+Two identical uploads at the same moment both reach storage, but only one
+MediaAsset per (sha256, size) can be saved (``save_asset``); the other's
+files are removed and the first one's asset is returned.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import PurePath
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .imaging import render_variants
+from .models import MediaAsset
+from .storage import delete_file, file_url, upload_bytes
+
+logger = logging.getLogger(__name__)
+
+# Animated formats would lose their frames; they are stored as uploaded
+PASSTHROUGH_TYPES = {"image/gif", "image/svg+xml"}
+PASSTHROUGH_FORMATS = {"GIF"}
+# Pillow formats recognised from a file's header whatever its declared type (JPEG includes MPO)
+SNIFFED_FORMATS = ["JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO"]
+
+_pool = None
+_upload_executor = None
+_pool_lock = threading.Lock()
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageProcessingUnavailable(APIException):
+    """The pool could not process the image right now; the client can retry."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Image processing is unavailable, try again later."
+    default_code = "image_processing_unavailable"
+
+
+class ImageProcessingTimeout(ImageProcessingUnavailable):
+    """The pool did not finish the image within IMAGE_PROCESS_TIMEOUT (it may be busy)."""
+    default_detail = "Image processing timed out, try again later."
+    default_code = "image_processing_timeout"
+
+
+class ImageProcessingFailed(ImageProcessingUnavailable):
+    """A worker process died while the image was queued or being processed."""
+    default_detail = "Image processing failed, try again later."
+    default_code = "image_processing_failed"
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the workers don't inherit this process's threads and connections
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESS_WORKERS, mp_context=get_context("spawn")
+                )
+    return _pool
+
+
+def _reset_pool(pool):
+    """Drop a broken pool so the next upload starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def is_image(data, content_type):
+    """
+    Whether an upload goes through the variant pipeline. `data` is the file's
+    bytes or path; only its header is read. The declared content type only
+    decides for files whose header isn't recognised.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data, formats=SNIFFED_FORMATS) as image:
+            return image.format not in PASSTHROUGH_FORMATS
+    except Image.DecompressionBombError:
+        # An image all the same; the pool rejects it against IMAGE_MAX_PIXELS
+        return True
+    except (UnidentifiedImageError, OSError):
+        pass
+    return bool(content_type) and content_type.startswith("image/") and content_type not in PASSTHROUGH_TYPES
+
+
+def process_image(data):
+    """Render the variants in the pool; the calling thread only waits."""
+    from PIL import Image, UnidentifiedImageError
+
+    pool = get_pool()
+    try:
+        future = pool.submit(
+            render_variants,
+            data,
+            settings.IMAGE_VARIANTS,
+            settings.IMAGE_VARIANT_FORMAT,
+            settings.IMAGE_VARIANT_QUALITY,
+            settings.IMAGE_MAX_PIXELS,
+        )
+        return future.result(timeout=settings.IMAGE_PROCESS_TIMEOUT)
+    except BrokenProcessPool as e:
+        # A worker died (e.g. killed for running out of memory), which breaks the whole pool
+        logger.error("Image processing pool is broken, starting a new one", exc_info=True)
+        _reset_pool(pool)
+        raise ImageProcessingFailed() from e
+    except TimeoutError as e:
+        # Drops it if it is still queued; a worker already on it finishes it and the result is discarded
+        future.cancel()
+        raise ImageProcessingTimeout() from e
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage(str(e)) from e
+
+
+def read_upload(uploaded_file):
+    """Read an UploadedFile chunk by chunk, hashing as it goes; returns (data, sha256 hex)."""
+    digest = hashlib.sha256()
+    chunks = []
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def find_duplicate(sha256, size=None):
+    """The stored MediaAsset with this content digest (and size, if given), or None."""
+    assets = MediaAsset.objects.filter(sha256=sha256)
+    if size is not None:
+        assets = assets.filter(size=size)
+    return assets.order_by("created_at").first()
+
+
+def upload_media(data, filename, content_type, sha256):
+    """
+    Send a file (or, for an image, its variants) to storage and return the
+    unsaved MediaAsset describing it. Does not touch the database, so it can
+    run on an upload thread.
+    """
+    if not is_image(data, content_type):
+        file_id = upload_bytes(data, filename)
+        return MediaAsset(
+            file_id=file_id, url=file_url(file_id), content_type=content_type or "", size=len(data), sha256=sha256
+        )
+
+    extension = settings.IMAGE_VARIANT_FORMAT.lower().replace("jpeg", "jpg")
+    stem = PurePath(filename).stem or "image"
+    variants = {}
+    try:
+        for name, (encoded, width, height) in process_image(data).items():
+            file_id = upload_bytes(encoded, f"{stem}-{name}.{extension}")
+            variants[name] = {"url": file_url(file_id), "width": width, "height": height, "file_id": file_id}
+    except Exception:
+        discard_files(variant["file_id"] for variant in variants.values())
+        raise
+
+    full = variants[settings.IMAGE_PRIMARY_VARIANT]
+    return MediaAsset(
+        file_id=full["file_id"],
+        url=full["url"],
+        content_type=f"image/{settings.IMAGE_VARIANT_FORMAT.lower()}",
+        size=len(data),
+        sha256=sha256,
+        variants=variants,
+    )
+
+
+def save_asset(asset):
+    """
+    Save a new MediaAsset; returns (MediaAsset, created). If the same content
+    was saved meanwhile, the files just stored are removed and that asset is
+    returned instead.
+    """
+    try:
+        with transaction.atomic():
+            asset.save(force_insert=True)
+    except IntegrityError:
+        existing = find_duplicate(asset.sha256, asset.size)
+        if existing is None:
+            raise
+        discard_media(asset)
+        return existing, False
+    return asset, True
+
+
+def store_upload(data, filename, content_type, sha256=None):
+    """
+    Store an uploaded file (as variants if it is an image) and return
+    (MediaAsset, created). Content already stored is not uploaded again.
+    """
+    sha256 = sha256 or hashlib.sha256(data).hexdigest()
+    existing = find_duplicate(sha256, len(data))
+    if existing is not None:
+        return existing, False
+
+    return save_asset(upload_media(data, filename, content_type, sha256))
+
+
+def get_upload_executor():
+    """Threads that send media to storage while the request carries on (e.g. validating a post)."""
+    global _upload_executor
+    if _upload_executor is None:
+        with _pool_lock:
+            if _upload_executor is None:
+                _upload_executor = ThreadPoolExecutor(
+                    max_workers=settings.MEDIA_UPLOAD_THREADS, thread_name_prefix="media-upload"
+                )
+    return _upload_executor
+
+
+def discard_files(file_ids):
+    """Best-effort removal of stored files that ended up unused."""
+    for file_id in set(file_ids):
+        try:
+            delete_file(file_id)
+        except Exception:
+            logger.warning("Could not delete orphaned file %s from storage", file_id, exc_info=True)
+
+
+def discard_media(asset):
+    """Remove an unsaved asset's files from storage."""
+    discard_files([asset.file_id, *(variant["file_id"] for variant in asset.variants.values())])
+
+
+def variants_for_url(url):
+    """Public variant map ({name: {url, width, height}}) of an uploaded file, or {}."""
+    if not url:
+        return {}
+    asset = MediaAsset.objects.filter(url=url).only("variants").first()
+    return public_variants(asset.variants) if asset else {}
+
+
+def public_variants(variants):
+    # Storage file ids stay internal
+    return {
+        name: {"url": variant["url"], "width": variant["width"], "height": variant["height"]}
+        for name, variant in variants.items()
+    }
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:02
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_alter_user_dept_course_alter_user_dob_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaAsset',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_id', models.CharField(max_length=100)),
+                ('url', models.URLField(db_index=True, max_length=500)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('variants', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_photo_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
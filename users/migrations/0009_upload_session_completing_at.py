@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='completing_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
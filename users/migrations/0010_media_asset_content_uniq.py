@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+# Concurrent uploads may already have stored the same content twice. The
+# oldest asset stays the one deduplicated against; the others keep their
+# files and URLs (posts and profiles point at them) but lose their digest,
+# like assets recorded before digests were kept.
+
+
+def clear_duplicate_digests(apps, schema_editor):
+    MediaAsset = apps.get_model("users", "MediaAsset")
+    duplicates = (
+        MediaAsset.objects.exclude(sha256="")
+        .values("sha256", "size")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        assets = MediaAsset.objects.filter(sha256=duplicate["sha256"], size=duplicate["size"]).order_by("created_at")
+        MediaAsset.objects.filter(pk__in=list(assets.values_list("pk", flat=True)[1:])).update(sha256="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_upload_session_completing_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_digests, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mediaasset',
+            constraint=models.UniqueConstraint(condition=models.Q(('sha256', ''), _negated=True), fields=('sha256', 'size'), name='media_asset_content_uniq'),
+        ),
+    ]
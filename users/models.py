@@ -62,6 +62,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     dept_course = models.CharField(max_length=200)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     register_number = models.CharField(max_length=50, unique=True)
+    profile_photo_variants = models.JSONField(default=dict, blank=True)  # resized copies of profile_photo, see users.media
 
     is_active = models.BooleanField(default=False)  # Must verify email first
     is_staff = models.BooleanField(default=False)
@@ -73,4 +74,44 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ["username", "full_name", "institute_name", "dob", "dept_course", "gender", "register_number"]
 
     def __str__(self):
-        return f"@{self.username}"
\ No newline at end of file
+        return f"@{self.username}"
+
+
+class MediaAsset(models.Model):
+    """A file stored through FileUploadView; for images, the resized variants."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_id = models.CharField(max_length=100)
+    url = models.URLField(max_length=500, db_index=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()  # bytes as uploaded
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)  # digest of the uploaded bytes, for deduplication
+    variants = models.JSONField(default=dict, blank=True)  # {name: {url, width, height, file_id}}
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # One asset per content; assets recorded before digests were kept have none
+            models.UniqueConstraint(fields=["sha256", "size"], condition=~models.Q(sha256=""), name="media_asset_content_uniq"),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+class UploadSession(models.Model):
+    """A resumable upload in progress; chunks are written to a local file (see users.uploads)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey("User", on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received = models.JSONField(default=list, blank=True)  # indexes of the chunks written so far
+    sha256 = models.CharField(max_length=64, blank=True)  # optional, checked when the upload completes
+    asset = models.ForeignKey(MediaAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    completing_at = models.DateTimeField(null=True, blank=True)  # set while a request stores the file
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({len(self.received)} chunks)"
@@ -1,12 +1,17 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import User
+from .media import variants_for_url
+from unilink.serializers import SparseFieldsMixin
+from .availability import AvailableValidator, FIELDS as AVAILABILITY_FIELDS
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["id", "email", "username", "full_name", "bio", "profile_photo", 
+        fields = ["id", "email", "username", "full_name", "bio", "profile_photo", "profile_photo_variants",
                  "institute_name", "dob", "dept_course", "gender", "register_number"]
+        read_only_fields = ["profile_photo_variants"]
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -16,9 +21,19 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ["email", "username", "full_name", "password", 
                  "institute_name", "dob", "dept_course", "gender", "register_number", "profile_photo"]
+        # Duplicates are rejected during validation, before the password is hashed
+        extra_kwargs = {
+            field: {"validators": [AvailableValidator(field)]} for field in AVAILABILITY_FIELDS
+        }
 
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)
+        validated_data["profile_photo_variants"] = variants_for_url(validated_data.get("profile_photo"))
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same value
+            raise serializers.ValidationError({"detail": "An account with these details already exists."})
 
 
 class UserListSerializer(serializers.ModelSerializer):
@@ -38,3 +53,8 @@ class UserUpdateSerializer(serializers.ModelSerializer):
             'institute_name': {'required': False},
             'dept_course': {'required': False},
         }
+
+    def update(self, instance, validated_data):
+        if "profile_photo" in validated_data:
+            validated_data["profile_photo_variants"] = variants_for_url(validated_data["profile_photo"])
+        return super().update(instance, validated_data)
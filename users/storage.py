@@ -0,0 +1,71 @@
+"""
+Appwrite file storage.
+
+The Appwrite SDK takes over half a second to import, so it is loaded on the
+first storage call rather than when the views module is imported.
+"""
+import threading
+
+from django.conf import settings
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return a configured Appwrite Storage service, importing the SDK on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                from appwrite.client import Client
+                from appwrite.services.storage import Storage
+
+                client = Client()
+                client.set_endpoint(settings.APPWRITE_ENDPOINT)
+                client.set_project(settings.APPWRITE_PROJECT_ID)
+                client.set_key(settings.APPWRITE_API_KEY)
+                _storage = Storage(client)
+    return _storage
+
+
+def new_file_id():
+    from appwrite.id import ID
+
+    return ID.unique()
+
+
+def file_url(file_id):
+    return f"{settings.APPWRITE_ENDPOINT}/storage/buckets/{settings.APPWRITE_BUCKET_ID}/files/{file_id}/view?project={settings.APPWRITE_PROJECT_ID}"
+
+
+def upload_bytes(data, filename, file_id=None):
+    """Store data in the bucket and return the file id."""
+    from appwrite.input_file import InputFile
+
+    file_id = file_id or new_file_id()
+    get_storage().create_file(
+        bucket_id=settings.APPWRITE_BUCKET_ID,
+        file_id=file_id,
+        file=InputFile.from_bytes(data, filename),
+    )
+    return file_id
+
+
+def upload_file(path, filename, file_id=None):
+    """Store a local file in the bucket (streamed in chunks by the SDK) and return the file id."""
+    from appwrite.input_file import InputFile
+
+    file_id = file_id or new_file_id()
+    input_file = InputFile.from_path(str(path))
+    input_file.filename = filename
+    get_storage().create_file(
+        bucket_id=settings.APPWRITE_BUCKET_ID,
+        file_id=file_id,
+        file=input_file,
+    )
+    return file_id
+
+
+def delete_file(file_id):
+    get_storage().delete_file(bucket_id=settings.APPWRITE_BUCKET_ID, file_id=file_id)
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from unilink import db_router
+
+from . import media
+from .models import MediaAsset, User
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Run with unilink.settings_test, where "replica" is a test mirror of
+    "default": both aliases reach the same SQLite database through separate
+    connections, so the queries each one captures show where a request read.
+    The replica connection only sees committed rows, hence TransactionTestCase.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        db_router._lag_checks.clear()
+        self.user = User.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            full_name="Replica Reader",
+            institute_name="Test Institute",
+            dob=datetime.date(2000, 1, 1),
+            dept_course="Computer Science",
+            gender="female",
+            register_number="REG-1",
+            password="password",
+            is_active=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+        db_router._lag_checks.clear()
+
+    def request(self, method, path, **kwargs):
+        """Make a request and return it with the number of queries each alias ran."""
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(path, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_safe_request_reads_from_replica(self):
+        response, primary, replica = self.request("get", "/api/auth/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+    def test_write_goes_to_primary_and_pins_user(self):
+        response, primary, replica = self.request("patch", "/api/auth/profile/edit/", data={"bio": "Hello"})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertTrue(db_router.is_pinned(self.user))
+
+        response, primary, replica = self.request("get", "/api/auth/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def batch(self):
+        """GET /api/auth/users/ through /api/batch/; returns the sub-response and whether a replica was chosen."""
+        # Sub-requests run on threads of their own, so the replica choice is watched instead of the connections
+        with mock.patch.object(db_router, "choose_replica", wraps=db_router.choose_replica) as choose:
+            response = self.client.post("/api/batch/", {"requests": ["/api/auth/users/"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["responses"][0], choose.called
+
+    def test_batched_read_is_authenticated_and_uses_replica(self):
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        validate = JWTAuthentication.get_validated_token
+        with mock.patch.object(JWTAuthentication, "get_validated_token", autospec=True, side_effect=validate) as checked:
+            entry, chose_replica = self.batch()
+        self.assertEqual(entry["status"], 200)
+        self.assertTrue(chose_replica)
+        # Only BatchView verified the token; the sub-request reused its user
+        self.assertEqual(checked.call_count, 1)
+
+    def test_unauthenticated_batched_read_is_401(self):
+        self.client.force_authenticate(None)
+        entry, _ = self.batch()
+        self.assertEqual(entry["status"], 401)
+
+    def test_batched_read_after_write_stays_on_primary(self):
+        self.client.patch("/api/auth/profile/edit/", data={"bio": "Hello"})
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        entry, chose_replica = self.batch()
+        self.assertEqual(entry["status"], 200)
+        self.assertFalse(chose_replica)
+
+    def test_write_during_replica_read_goes_to_primary(self):
+        token = db_router._read_alias.set("replica")
+        try:
+            self.assertEqual(User.objects.all().db, "replica")
+            self.user.save(update_fields=["full_name"])
+            self.assertEqual(self.user._state.db, "default")
+        finally:
+            db_router._read_alias.reset(token)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        with mock.patch.object(db_router, "replica_lag", side_effect=OperationalError("replica is down")), \
+                self.assertLogs("unilink.db_router", "WARNING"):
+            response, primary, replica = self.request("get", "/api/auth/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with self.settings(REPLICA_MAX_LAG=5), mock.patch.object(db_router, "replica_lag", return_value=60.0):
+            response, primary, replica = self.request("get", "/api/auth/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class MediaAssetDedupTests(TestCase):
+    def asset(self, file_id):
+        return MediaAsset(file_id=file_id, url=f"https://files.example.com/{file_id}", size=3, sha256="a" * 64)
+
+    def test_concurrent_duplicate_returns_the_saved_asset(self):
+        first, created = media.save_asset(self.asset("first"))
+        self.assertTrue(created)
+        # The second upload reached storage before the first was saved
+        with mock.patch.object(media, "delete_file") as delete_file:
+            asset, created = media.save_asset(self.asset("second"))
+        self.assertFalse(created)
+        self.assertEqual(asset.pk, first.pk)
+        delete_file.assert_called_once_with("second")
+        self.assertEqual(MediaAsset.objects.count(), 1)
+
+    def test_assets_without_digest_are_not_deduplicated(self):
+        for file_id in ("legacy-1", "legacy-2"):
+            MediaAsset.objects.create(file_id=file_id, url=f"https://files.example.com/{file_id}", size=3)
+        self.assertEqual(MediaAsset.objects.count(), 2)
+
+    def test_upload_check_requires_authentication(self):
+        media.save_asset(self.asset("first"))
+        response = APIClient().get("/api/auth/upload/check/", {"sha256": "a" * 64})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,222 @@
+"""
+Resumable chunked uploads.
+
+A client creates an UploadSession for a file of known size, sends the file as
+fixed-size chunks (PATCH with an Upload-Offset header, in any order and in
+parallel), and completes the session. Chunks are written straight into a
+preallocated file under UPLOAD_SESSION_DIR; only the list of received chunk
+indexes is kept in the database, so a client that lost its connection asks
+which chunks are missing and resends just those.
+
+Completing the session hashes the assembled file (deduplicating against
+existing uploads), streams it to storage from disk and deletes the local
+copy. That can take minutes, so no transaction or row lock is held
+meanwhile: the session is marked ``completing_at`` in a short transaction
+first, which turns away other completions and chunks until it finishes,
+fails or is older than UPLOAD_COMPLETE_TIMEOUT. A chunk is claimed the same
+way before it is written, and until it is written it counts as missing, which
+keeps the session from being completed meanwhile. Sessions that are never
+completed are removed by ``manage.py purge_upload_sessions`` once they expire.
+"""
+import hashlib
+import math
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .media import find_duplicate, is_image, save_asset, store_upload
+from .models import MediaAsset, UploadSession
+from .storage import file_url, upload_file
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+def session_path(session):
+    return Path(settings.UPLOAD_SESSION_DIR) / f"{session.id}.part"
+
+
+def chunk_count(session):
+    return math.ceil(session.size / session.chunk_size) if session.size else 0
+
+
+def missing_chunks(session):
+    received = set(session.received)
+    return [index for index in range(chunk_count(session)) if index not in received]
+
+
+def contiguous_offset(session):
+    """Bytes received without gaps from the start of the file."""
+    missing = missing_chunks(session)
+    if not missing:
+        return session.size
+    return missing[0] * session.chunk_size
+
+
+def create_session(user, filename, size, content_type="", sha256=""):
+    if size <= 0:
+        raise UploadError("size must be positive")
+    if size > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f"size exceeds the {settings.UPLOAD_MAX_SIZE} byte limit")
+
+    session = UploadSession.objects.create(
+        user=user,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        sha256=sha256.lower(),
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+    path = session_path(session)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Sparse file of the final size: parallel chunks write into their own ranges
+    with open(path, "wb") as f:
+        f.truncate(size)
+    return session
+
+
+def is_completing(session, now=None):
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.UPLOAD_COMPLETE_TIMEOUT)
+    return session.completing_at is not None and session.completing_at > cutoff
+
+
+def _locked(session):
+    try:
+        return UploadSession.objects.select_for_update().get(pk=session.pk)
+    except UploadSession.DoesNotExist:
+        raise UploadError("upload session not found")
+
+
+def write_chunk(session, offset, stream, length):
+    """Write one chunk read from `stream` at `offset`; returns the updated session."""
+    if offset % session.chunk_size or not 0 <= offset < session.size:
+        raise UploadError(f"Upload-Offset must be a multiple of {session.chunk_size} below {session.size}")
+    expected = min(session.chunk_size, session.size - offset)
+    if length != expected:
+        raise UploadError(f"chunk at offset {offset} must be {expected} bytes")
+
+    index = offset // session.chunk_size
+    with transaction.atomic():
+        # Checked on the locked row: completion claims the session on it. The
+        # chunk counts as missing until written, so the session can't be
+        # completed (and its file hashed or removed) while these bytes change.
+        session = _locked(session)
+        if session.asset_id:
+            raise UploadError("upload already completed")
+        if is_completing(session):
+            raise UploadError("upload is being completed")
+        if session.expires_at < timezone.now():
+            raise UploadError("upload session expired")
+        if index in session.received:
+            session.received = [received for received in session.received if received != index]
+            session.save(update_fields=["received"])
+
+    written = 0
+    try:
+        with open(session_path(session), "r+b") as f:
+            f.seek(offset)
+            while written < expected:
+                data = stream.read(min(READ_SIZE, expected - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+    except FileNotFoundError:
+        # Deleted (or purged) since the claim
+        raise UploadError("upload session not found")
+    if written != expected:
+        raise UploadError(f"chunk at offset {offset} was cut short ({written} of {expected} bytes)")
+
+    with transaction.atomic():
+        session = _locked(session)
+        if index not in session.received:
+            session.received = sorted([*session.received, index])
+            session.save(update_fields=["received"])
+    return session
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(1024 * 1024):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def complete_session(session):
+    """Assemble, verify and store the upload; returns (MediaAsset, created)."""
+    with transaction.atomic():
+        # Claim the session, so a repeated request can't store the file twice
+        try:
+            session = UploadSession.objects.select_for_update(nowait=True).get(pk=session.pk)
+        except DatabaseError:
+            raise UploadError("upload is already being completed")
+        if session.asset_id:
+            return session.asset, False
+        if is_completing(session):
+            raise UploadError("upload is already being completed")
+        missing = missing_chunks(session)
+        if missing:
+            raise UploadError(f"{len(missing)} chunks missing, first at offset {missing[0] * session.chunk_size}")
+        session.completing_at = timezone.now()
+        session.save(update_fields=["completing_at"])
+
+    # Hashing and uploading run outside any transaction
+    sessions = UploadSession.objects.filter(pk=session.pk)
+    path = session_path(session)
+    try:
+        sha256 = _file_sha256(path)
+        if session.sha256 and session.sha256 != sha256:
+            # The stored bytes are unusable; the client has to send every chunk again
+            sessions.update(received=[], completing_at=None)
+            raise UploadError("sha256 of the uploaded file does not match the one given when the session was created")
+        asset, created = _store(session, path, sha256)
+    except Exception:
+        sessions.update(completing_at=None)
+        raise
+
+    with transaction.atomic():
+        sessions.update(asset=asset, completing_at=None)
+        transaction.on_commit(lambda: path.unlink(missing_ok=True))
+    return asset, created
+
+
+def _store(session, path, sha256):
+    if is_image(path, session.content_type):
+        # Images go through the variant pipeline, which needs the whole file in memory anyway
+        return store_upload(path.read_bytes(), session.filename, session.content_type, sha256)
+
+    asset = find_duplicate(sha256, session.size)
+    if asset is not None:
+        return asset, False
+    file_id = upload_file(path, session.filename)
+    return save_asset(MediaAsset(
+        file_id=file_id,
+        url=file_url(file_id),
+        content_type=session.content_type,
+        size=session.size,
+        sha256=sha256,
+    ))
+
+
+def purge_expired(now=None):
+    """Delete expired sessions and their local files; returns how many were removed."""
+    expired = UploadSession.objects.filter(expires_at__lt=now or timezone.now())
+    count = 0
+    for session in expired.iterator():
+        session_path(session).unlink(missing_ok=True)
+        session.delete()
+        count += 1
+    return count
+
+
+def delete_session(session):
+    session_path(session).unlink(missing_ok=True)
+    session.delete()
@@ -1,12 +1,20 @@
 from django.urls import path
-from .views import RegisterView, LoginView, DeleteAccountView, VerifyEmailView, FileUploadView, UserListView, UserProfileEditView
+from .views import (
+    RegisterView, AvailabilityView, LoginView, DeleteAccountView, VerifyEmailView, FileUploadView, FileUploadCheckView,
+    UploadSessionCreateView, UploadSessionView, UploadSessionCompleteView, UserListView, UserProfileEditView
+)
 
 urlpatterns = [
     path("signup/", RegisterView.as_view(), name="signup"),
+    path("availability/", AvailabilityView.as_view(), name="availability"),
     path("login/", LoginView.as_view(), name="login"),
     path("delete/", DeleteAccountView.as_view(), name="delete"),
     path("verify-email/", VerifyEmailView.as_view(), name="verify-email"),
     path("upload/", FileUploadView.as_view(), name="file-upload"),
+    path("upload/check/", FileUploadCheckView.as_view(), name="file-upload-check"),
+    path("uploads/", UploadSessionCreateView.as_view(), name="upload-session-create"),
+    path("uploads/<uuid:session_id>/", UploadSessionView.as_view(), name="upload-session"),
+    path("uploads/<uuid:session_id>/complete/", UploadSessionCompleteView.as_view(), name="upload-session-complete"),
     path("users/", UserListView.as_view(), name="user-list"),
     path("profile/edit/", UserProfileEditView.as_view(), name="profile-edit"),
 ]
\ No newline at end of file
@@ -3,25 +3,30 @@ from rest_framework.permissions import AllowAny
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.core.mail import send_mail
 from django.conf import settings
 import jwt
 from datetime import datetime, timedelta
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from appwrite.client import Client
-from appwrite.services.storage import Storage
-from appwrite.id import ID
-from appwrite.input_file import InputFile
+from unilink.apidoc import swagger_schema
 import uuid
 import io
 
-from .models import User
+from .models import User, UploadSession
 from .serializers import UserSerializer, RegisterSerializer, UserUpdateSerializer, UserListSerializer
+from .availability import is_taken, FIELDS as AVAILABILITY_FIELDS
+from .uploads import (
+    UploadError, create_session, write_chunk, complete_session, delete_session,
+    contiguous_offset, missing_chunks,
+)
+from .media import read_upload, store_upload, find_duplicate, public_variants, InvalidImage, ImageProcessingUnavailable
 from social.models import Follower
+from social.graph import get_graph
 from social.pagination import StandardResultsSetPagination
+from unilink.db_router import ReplicaReadMixin
+from unilink.hotcache import invalidate
 
 # ------------------- Register -------------------
 class RegisterView(generics.CreateAPIView):
@@ -34,7 +39,7 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Register a new user account",
         request_body=RegisterSerializer,
         responses={
@@ -45,7 +50,7 @@ class RegisterView(generics.CreateAPIView):
                 'application/json': {'error': 'Validation errors'}
             })
         }
-    )
+    ))
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -73,6 +78,44 @@ class RegisterView(generics.CreateAPIView):
         return Response({"message": "User created. Check email for verification link."}, status=status.HTTP_201_CREATED)
 
 
+# ------------------- Availability -------------------
+class AvailabilityView(APIView):
+    """
+    Check whether a username, email or register number is still free.
+    
+    GET: Pass one or more of username, email, register_number as query parameters
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Check if a username, email or register number is available for registration",
+        manual_parameters=[
+            openapi.Parameter(field, openapi.IN_QUERY, type=openapi.TYPE_STRING)
+            for field in AVAILABILITY_FIELDS
+        ],
+        responses={
+            200: openapi.Response('Availability', examples={
+                'application/json': {'username': {'value': 'johndoe', 'available': False}}
+            }),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': 'Provide at least one of username, email, register_number'}
+            })
+        }
+    ))
+    def get(self, request):
+        result = {}
+        for field in AVAILABILITY_FIELDS:
+            value = request.query_params.get(field, "").strip()
+            if value:
+                result[field] = {"value": value, "available": not is_taken(field, value)}
+        if not result:
+            return Response(
+                {"error": f"Provide at least one of {', '.join(AVAILABILITY_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(result)
+
+
 # ------------------- User Profile Edit -------------------
 class UserProfileEditView(generics.UpdateAPIView):
     """
@@ -86,6 +129,10 @@ class UserProfileEditView(generics.UpdateAPIView):
     def get_object(self):
         return self.request.user
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate("user", self.request.user.pk)
+
 
 # ------------------- Login -------------------
 
@@ -97,7 +144,7 @@ class LoginView(APIView):
     """
     permission_classes = [AllowAny]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Login with email and password",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -127,7 +174,7 @@ class LoginView(APIView):
                 'application/json': {'error': 'Email not verified'}
             })
         }
-    )
+    ))
     def post(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
@@ -155,7 +202,7 @@ class DeleteAccountView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Delete the authenticated user's account",
         responses={
             200: openapi.Response('Account Deleted', examples={
@@ -165,10 +212,12 @@ class DeleteAccountView(APIView):
                 'application/json': {'detail': 'Authentication credentials were not provided.'}
             })
         }
-    )
+    ))
     def delete(self, request):
         user = request.user
+        user_id = user.pk
         user.delete()
+        invalidate("user", user_id)
         return Response({"status": "account deleted"})
 
 
@@ -180,7 +229,7 @@ class VerifyEmailView(APIView):
     GET: Verify user email using the token sent via email
     """
     permission_classes = [AllowAny]
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Verify user email with token",
         manual_parameters=[
             openapi.Parameter(
@@ -202,7 +251,7 @@ class VerifyEmailView(APIView):
                 'application/json': {'error': 'Invalid or expired token'}
             })
         }
-    )
+    ))
     def get(self, request):
         token = request.GET.get("token")
         if not token:
@@ -227,8 +276,9 @@ class FileUploadView(APIView):
     POST: Upload a file and get its URL
     """
     permission_classes = [AllowAny]
+    parser_classes = [MultiPartParser, FormParser]
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Upload a file to Appwrite storage (No authentication required)",
         manual_parameters=[
             openapi.Parameter(
@@ -244,6 +294,13 @@ class FileUploadView(APIView):
                 'application/json': {
                     'file_id': 'unique_file_id',
                     'file_url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/unique_file_id/view?project=68dd64330036984d70ce',
+                    'variants': {
+                        'avatar': {'url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/avatar_file_id/view?project=68dd64330036984d70ce', 'width': 96, 'height': 72},
+                        'feed': {'url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/feed_file_id/view?project=68dd64330036984d70ce', 'width': 1080, 'height': 810},
+                        'full': {'url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/unique_file_id/view?project=68dd64330036984d70ce', 'width': 2048, 'height': 1536}
+                    },
+                    'sha256': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08',
+                    'deduplicated': False,
                     'message': 'File uploaded successfully'
                 }
             }),
@@ -254,7 +311,7 @@ class FileUploadView(APIView):
                 'application/json': {'error': 'Upload failed', 'details': 'Error details'}
             })
         }
-    )
+    ))
     def post(self, request):
         if 'file' not in request.FILES:
             return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
@@ -262,49 +319,273 @@ class FileUploadView(APIView):
         uploaded_file = request.FILES['file']
         
         try:
-            # Initialize Appwrite client
-            client = Client()
-            client.set_endpoint(settings.APPWRITE_ENDPOINT)
-            client.set_project(settings.APPWRITE_PROJECT_ID)
-            client.set_key(settings.APPWRITE_API_KEY)
-            
-            # Initialize Storage service
-            storage = Storage(client)
-            
-            # Generate unique file ID
-            file_id = ID.unique()
-            
-            # Create InputFile for Appwrite
-            input_file = InputFile.from_bytes(
-                uploaded_file.read(),
-                uploaded_file.name
-            )
-            
-            # Upload file to Appwrite
-            result = storage.create_file(
-                bucket_id=settings.APPWRITE_BUCKET_ID,
-                file_id=file_id,
-                file=input_file
-            )
-            
-            # Construct file URL
-            file_url = f"{settings.APPWRITE_ENDPOINT}/storage/buckets/{settings.APPWRITE_BUCKET_ID}/files/{file_id}/view?project={settings.APPWRITE_PROJECT_ID}"
+            data, sha256 = read_upload(uploaded_file)
+            # Images are resized in the media process pool; only the variants are stored.
+            # Content that was uploaded before is not stored again.
+            asset, created = store_upload(data, uploaded_file.name, uploaded_file.content_type, sha256)
             
             return Response({
-                "file_id": file_id,
-                "file_url": file_url,
+                "file_id": asset.file_id,
+                "file_url": asset.url,
+                "variants": public_variants(asset.variants),
+                "sha256": sha256,
+                "deduplicated": not created,
                 "message": "File uploaded successfully"
             }, status=status.HTTP_200_OK)
             
+        except InvalidImage as e:
+            return Response({"error": "Invalid image", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ImageProcessingUnavailable as e:
+            return Response({"error": str(e.detail)}, status=e.status_code)
+        except Exception as e:
+            return Response({
+                "error": "Upload failed",
+                "details": str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class FileUploadCheckView(APIView):
+    """
+    Check whether a file was already uploaded, by content digest.
+    
+    GET: Look up a SHA-256 digest (and optionally size) computed by the client
+    (authenticated: a stored file's URL is only handed to signed-in users)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Check if a file with this SHA-256 digest is already stored, to skip uploading it again",
+        manual_parameters=[
+            openapi.Parameter('sha256', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description="Hex SHA-256 of the file bytes"),
+            openapi.Parameter('size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="File size in bytes"),
+        ],
+        responses={
+            200: openapi.Response('Lookup Result', examples={
+                'application/json': {
+                    'exists': True,
+                    'file_id': 'unique_file_id',
+                    'file_url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/unique_file_id/view?project=68dd64330036984d70ce',
+                    'variants': {}
+                }
+            }),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': 'sha256 must be a 64-character hex digest'}
+            }),
+            401: 'Authentication required'
+        }
+    ))
+    def get(self, request):
+        sha256 = request.query_params.get('sha256', '').lower()
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            return Response({"error": "sha256 must be a 64-character hex digest"}, status=status.HTTP_400_BAD_REQUEST)
+        size = request.query_params.get('size')
+        if size is not None and not size.isdigit():
+            return Response({"error": "size must be a number of bytes"}, status=status.HTTP_400_BAD_REQUEST)
+
+        asset = find_duplicate(sha256, int(size) if size is not None else None)
+        if asset is None:
+            return Response({"exists": False})
+        return Response({
+            "exists": True,
+            "file_id": asset.file_id,
+            "file_url": asset.url,
+            "variants": public_variants(asset.variants),
+        })
+
+
+# ------------------- Resumable Upload -------------------
+def upload_session_data(session):
+    return {
+        "id": str(session.id),
+        "filename": session.filename,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "offset": contiguous_offset(session),
+        "missing_chunks": missing_chunks(session),
+        "expires_at": session.expires_at,
+        "completed": session.asset_id is not None,
+    }
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a resumable upload.
+    
+    POST: Create an upload session for a file of known size, then send it in chunks
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Create a resumable upload session",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['filename', 'size'],
+            properties={
+                'filename': openapi.Schema(type=openapi.TYPE_STRING),
+                'size': openapi.Schema(type=openapi.TYPE_INTEGER, description="File size in bytes"),
+                'content_type': openapi.Schema(type=openapi.TYPE_STRING),
+                'sha256': openapi.Schema(type=openapi.TYPE_STRING, description="Optional, verified on completion"),
+            }
+        ),
+        responses={
+            201: openapi.Response('Session Created', examples={
+                'application/json': {
+                    'id': '123e4567-e89b-12d3-a456-426614174000',
+                    'filename': 'video.mp4',
+                    'size': 209715200,
+                    'chunk_size': 5242880,
+                    'offset': 0,
+                    'missing_chunks': [0, 1, 2],
+                    'expires_at': '2024-01-16T10:30:00Z',
+                    'completed': False
+                }
+            }),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': 'size must be positive'}
+            })
+        }
+    ))
+    def post(self, request):
+        filename = str(request.data.get('filename', '')).strip()
+        try:
+            size = int(request.data.get('size', 0))
+        except (TypeError, ValueError):
+            size = 0
+        if not filename:
+            return Response({"error": "filename is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = create_session(
+                request.user, filename[:255], size,
+                content_type=str(request.data.get('content_type', '')),
+                sha256=str(request.data.get('sha256', '')),
+            )
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """
+    Send chunks of a resumable upload and check its progress.
+    
+    GET: Session state, including the chunks still missing
+    PATCH: Write one chunk; the raw request body is the chunk and the
+           Upload-Offset header its position (a multiple of chunk_size)
+    DELETE: Cancel the upload
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_session(self, request, session_id):
+        return UploadSession.objects.filter(id=session_id, user=request.user).first()
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Get the state of a resumable upload",
+        responses={
+            200: openapi.Response('Session State'),
+            404: openapi.Response('Not Found', examples={'application/json': {'error': 'Upload session not found'}})
+        }
+    ))
+    def get(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(upload_session_data(session))
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Upload one chunk (raw body, position in the Upload-Offset header)",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, type=openapi.TYPE_INTEGER, required=True),
+        ],
+        responses={
+            200: openapi.Response('Chunk Stored'),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': 'chunk at offset 0 must be 5242880 bytes'}
+            }),
+            404: openapi.Response('Not Found', examples={'application/json': {'error': 'Upload session not found'}})
+        }
+    ))
+    def patch(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"error": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Read the body straight from the request stream, not through a parser
+            session = write_chunk(session, offset, request._request, length)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upload_session_data(session))
+
+    def delete(self, request, session_id):
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+        delete_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(APIView):
+    """
+    Finish a resumable upload.
+    
+    POST: Assemble the chunks, store the file and return its URL (same response as /upload/)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_schema(lambda openapi: dict(
+        operation_description="Complete a resumable upload once every chunk has been sent",
+        responses={
+            200: openapi.Response('File Uploaded', examples={
+                'application/json': {
+                    'file_id': 'unique_file_id',
+                    'file_url': 'https://cloud.appwrite.io/v1/storage/buckets/68dd64ea00069ab481c3/files/unique_file_id/view?project=68dd64330036984d70ce',
+                    'variants': {},
+                    'sha256': '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08',
+                    'deduplicated': False,
+                    'message': 'File uploaded successfully'
+                }
+            }),
+            400: openapi.Response('Bad Request', examples={
+                'application/json': {'error': '3 chunks missing, first at offset 10485760'}
+            }),
+            404: openapi.Response('Not Found', examples={'application/json': {'error': 'Upload session not found'}})
+        }
+    ))
+    def post(self, request, session_id):
+        session = UploadSession.objects.filter(id=session_id, user=request.user).first()
+        if session is None:
+            return Response({"error": "Upload session not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            asset, created = complete_session(session)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidImage as e:
+            return Response({"error": "Invalid image", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ImageProcessingUnavailable as e:
+            return Response({"error": str(e.detail)}, status=e.status_code)
         except Exception as e:
             return Response({
                 "error": "Upload failed",
                 "details": str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            "file_id": asset.file_id,
+            "file_url": asset.url,
+            "variants": public_variants(asset.variants),
+            "sha256": asset.sha256,
+            "deduplicated": not created,
+            "message": "File uploaded successfully"
+        })
 
 
 # ------------------- User List -------------------
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, generics.ListAPIView):
     """
     Get a paginated list of users excluding current user and already followed users.
     
@@ -314,7 +595,7 @@ class UserListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
 
-    @swagger_auto_schema(
+    @swagger_schema(lambda openapi: dict(
         operation_description="Get paginated list of users (excluding current user and already followed users)",
         responses={
             200: openapi.Response('Users List', examples={
@@ -340,7 +621,7 @@ class UserListView(generics.ListAPIView):
                 'application/json': {'detail': 'Authentication credentials were not provided.'}
             })
         }
-    )
+    ))
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -348,7 +629,11 @@ class UserListView(generics.ListAPIView):
         current_user = self.request.user
         
         # Get IDs of users that the current user is already following
-        following_ids = Follower.objects.filter(follower=current_user).values_list('user_id', flat=True)
+        graph = get_graph()
+        if graph:
+            following_ids = graph.following(current_user.id)
+        else:
+            following_ids = Follower.objects.filter(follower=current_user).values_list('user_id', flat=True)
         
         # Exclude current user and already followed users
         queryset = User.objects.exclude(